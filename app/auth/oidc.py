@@ -1,7 +1,7 @@
 # app/auth/oidc.py
 import time
-import httpx
 from jose import jwt, exceptions as jose_errors
+from app.services.linkedin_api import get_async_client
 
 # Known LinkedIn issuer variants seen in the wild
 LINKEDIN_ISS_ALLOWLIST = {
@@ -20,11 +20,10 @@ _jwks_cached_at = 0
 async def _get_jwks():
     global _jwks_cache, _jwks_cached_at
     if (not _jwks_cache) or (time.time() - _jwks_cached_at > 3600):
-        async with httpx.AsyncClient(timeout=10) as client:
-            r = await client.get(LINKEDIN_JWKS)
-            r.raise_for_status()
-            _jwks_cache = r.json()
-            _jwks_cached_at = time.time()
+        r = await get_async_client().client.get(LINKEDIN_JWKS, timeout=10)
+        r.raise_for_status()
+        _jwks_cache = r.json()
+        _jwks_cached_at = time.time()
     return _jwks_cache
 
 def _select_jwk_for_token(id_token: str, jwks: dict) -> dict:
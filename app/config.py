@@ -5,8 +5,51 @@ load_dotenv()
 
 class Settings:
     hf_api_token: str = os.getenv("HF_API_TOKEN", "")
-    summarizer_model: str = os.getenv("SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-12-6")
+    summarizer_model: str = os.getenv("SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-12-6")  # or local:textrank
+    summarizer_fallback: str = os.getenv("SUMMARIZER_FALLBACK", "")  # e.g. local:textrank when HF fails
     rewriter_model: str = os.getenv("REWRITER_MODEL", "")
+    # Shared HF inference connection pool
+    hf_timeout: float = float(os.getenv("HF_TIMEOUT", "60"))
+    hf_max_connections: int = int(os.getenv("HF_MAX_CONNECTIONS", "20"))
+    hf_max_keepalive: int = int(os.getenv("HF_MAX_KEEPALIVE", "10"))
+    hf_keepalive_expiry: float = float(os.getenv("HF_KEEPALIVE_EXPIRY", "30"))
+    hf_http2: bool = os.getenv("HF_HTTP2", "false").lower() in ("1", "true", "yes")  # needs httpx[http2]
+    # Loading (503) / rate limit (429) handling and client-side quota per model
+    hf_max_wait: float = float(os.getenv("HF_MAX_WAIT", "60"))  # total seconds one call may wait
+    hf_rate_per_minute: float = float(os.getenv("HF_RATE_PER_MINUTE", "120"))  # 0 disables the bucket
+    hf_burst: float = float(os.getenv("HF_BURST", "20"))
+    hf_warmup_models: str = os.getenv("HF_WARMUP_MODELS", "")  # comma-separated, warmed at startup
+    # Content-addressed generation cache (memory LRU + SQLite file)
+    gen_cache_enabled: bool = os.getenv("GEN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    gen_cache_path: str = os.getenv("GEN_CACHE_PATH", "./gen_cache.db")
+    gen_cache_ttl: float = float(os.getenv("GEN_CACHE_TTL", str(7 * 24 * 3600)))
+    gen_cache_memory_items: int = int(os.getenv("GEN_CACHE_MEMORY_ITEMS", "512"))
+    gen_cache_max_rows: int = int(os.getenv("GEN_CACHE_MAX_ROWS", "20000"))
+    # Micro-batching of concurrent summarize calls (same model + params)
+    hf_batch_enabled: bool = os.getenv("HF_BATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+    hf_batch_window_ms: float = float(os.getenv("HF_BATCH_WINDOW_MS", "20"))
+    hf_batch_max_items: int = int(os.getenv("HF_BATCH_MAX_ITEMS", "8"))
+    # Rewrite model health: latency EWMA weight, circuit breaker threshold/cooldown,
+    # and how long a half-open probe may stay unanswered before another is let through
+    model_latency_alpha: float = float(os.getenv("MODEL_LATENCY_ALPHA", "0.3"))
+    model_failure_threshold: int = int(os.getenv("MODEL_FAILURE_THRESHOLD", "3"))
+    model_cooldown: float = float(os.getenv("MODEL_COOLDOWN", "60"))
+    model_probe_timeout: float = float(os.getenv("MODEL_PROBE_TIMEOUT", "120"))
+    # Hedged rewrite requests: fire the next candidate once the primary passes
+    # this percentile of its recent latency; budget caps hedges per rewrite call
+    rewrite_hedge_enabled: bool = os.getenv("REWRITE_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+    rewrite_hedge_percentile: float = float(os.getenv("REWRITE_HEDGE_PERCENTILE", "0.9"))
+    rewrite_hedge_default_delay: float = float(os.getenv("REWRITE_HEDGE_DEFAULT_DELAY", "5"))
+    rewrite_hedge_budget: float = float(os.getenv("REWRITE_HEDGE_BUDGET", "0.1"))
+    # Background pipeline jobs (/pipeline/jobs)
+    pipeline_job_workers: int = int(os.getenv("PIPELINE_JOB_WORKERS", "4"))
+    pipeline_job_max_pending: int = int(os.getenv("PIPELINE_JOB_MAX_PENDING", "200"))
+    # Map-reduce summarization of inputs longer than the model's budget
+    summarize_chunked: bool = os.getenv("SUMMARIZE_CHUNKED", "true").lower() in ("1", "true", "yes")
+    summarizer_max_input_chars: int = int(os.getenv("SUMMARIZER_MAX_INPUT_CHARS", "3000"))
+    summarize_chunk_concurrency: int = int(os.getenv("SUMMARIZE_CHUNK_CONCURRENCY", "4"))
+    # Concurrent summarize/rewrite workers per /pipeline/batch request
+    pipeline_batch_concurrency: int = int(os.getenv("PIPELINE_BATCH_CONCURRENCY", "8"))
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
     linkedin_client_id: str = os.getenv("LINKEDIN_CLIENT_ID", "")
     linkedin_client_secret: str = os.getenv("LINKEDIN_CLIENT_SECRET", "")
@@ -14,8 +57,40 @@ class Settings:
     # Use OpenID scopes (no r_liteprofile). The app will persist the OpenID sub as member_id
     # and use it to post as the token owner.
     linkedin_scopes: str = os.getenv("LINKEDIN_SCOPES", "openid profile email w_member_social")
+    # Shared LinkedIn HTTP pool
+    linkedin_timeout: float = float(os.getenv("LINKEDIN_TIMEOUT", "60"))
+    linkedin_max_connections: int = int(os.getenv("LINKEDIN_MAX_CONNECTIONS", "20"))
+    # LinkedIn retries (jittered exponential backoff, Retry-After honoured) and
+    # client-side call budgets per app and per member; a rate of 0 disables a bucket
+    linkedin_retry_attempts: int = int(os.getenv("LINKEDIN_RETRY_ATTEMPTS", "4"))
+    linkedin_retry_base: float = float(os.getenv("LINKEDIN_RETRY_BASE", "0.5"))  # seconds, doubled per attempt
+    linkedin_retry_cap: float = float(os.getenv("LINKEDIN_RETRY_CAP", "8"))
+    linkedin_max_wait: float = float(os.getenv("LINKEDIN_MAX_WAIT", "30"))  # total seconds one call may wait
+    linkedin_app_rate_per_minute: float = float(os.getenv("LINKEDIN_APP_RATE_PER_MINUTE", "300"))
+    linkedin_app_burst: float = float(os.getenv("LINKEDIN_APP_BURST", "50"))
+    linkedin_member_rate_per_minute: float = float(os.getenv("LINKEDIN_MEMBER_RATE_PER_MINUTE", "60"))
+    linkedin_member_burst: float = float(os.getenv("LINKEDIN_MEMBER_BURST", "40"))  # a 9-image post is ~20 calls
+    # Image uploads are piped to LinkedIn in chunks; larger images are rejected (413)
+    linkedin_image_max_bytes: int = int(os.getenv("LINKEDIN_IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))
+    linkedin_upload_chunk_size: int = int(os.getenv("LINKEDIN_UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+    # Reuse an uploaded asset when the same author posts identical image bytes (seconds; 0 disables)
+    linkedin_asset_ttl: float = float(os.getenv("LINKEDIN_ASSET_TTL", str(30 * 24 * 3600)))
+    # Multi-image posts: uploads in flight per request, and how long to wait for assets to be READY
+    linkedin_upload_concurrency: int = int(os.getenv("LINKEDIN_UPLOAD_CONCURRENCY", "4"))
+    linkedin_asset_ready_timeout: float = float(os.getenv("LINKEDIN_ASSET_READY_TIMEOUT", "60"))
     fernet_key: str = os.getenv("FERNET_KEY", "")
     # Toggle to enable dev-only endpoints (like callback_no_state). Default is False in prod.
     enable_dev_endpoints: bool = os.getenv("ENABLE_DEV_ENDPOINTS", "false").lower() in ("1", "true", "yes")
+    # RSS fetch engine: max feeds downloaded at once, and per-feed timeout (seconds)
+    rss_fetch_concurrency: int = int(os.getenv("RSS_FETCH_CONCURRENCY", "8"))
+    rss_fetch_timeout: float = float(os.getenv("RSS_FETCH_TIMEOUT", "15"))
+    # Near-duplicate detection: estimated Jaccard similarity (0-1) of title + lede words
+    # at which two articles count as the same story.
+    near_dup_threshold: float = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+    # Feed subscriptions: poller tick and the bounds for each feed's adaptive interval (seconds)
+    feed_poll_tick: int = int(os.getenv("FEED_POLL_TICK", "60"))
+    feed_min_interval: int = int(os.getenv("FEED_MIN_INTERVAL", "300"))
+    feed_max_interval: int = int(os.getenv("FEED_MAX_INTERVAL", "86400"))
+    feed_default_interval: int = int(os.getenv("FEED_DEFAULT_INTERVAL", "1800"))
 
 settings = Settings()
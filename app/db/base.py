@@ -1,4 +1,6 @@
-﻿from sqlalchemy import create_engine
+﻿from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
 
@@ -11,3 +13,9 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+def utc_naive(dt: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC for comparisons: SQLite hands back naive datetimes, Postgres aware ones."""
+    if dt is not None and dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
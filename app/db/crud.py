@@ -1,7 +1,13 @@
-﻿from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
+﻿import base64
+import json
+from sqlalchemy import String, and_, or_, type_coerce
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Optional, List, Dict, Any, Tuple, Sequence
 from app.db import models
 
+BULK_CHUNK = 500  # rows per INSERT statement (keeps SQLite under its bind-parameter limit)
+
 def get_article_by_url(db: Session, url: str) -> Optional[models.Article]:
     return db.query(models.Article).filter(models.Article.url == url).first()
 
@@ -12,8 +18,51 @@ def create_article(db: Session, data: Dict[str, Any]) -> models.Article:
     db.refresh(obj)
     return obj
 
-def list_articles(db: Session, limit: int = 20) -> List[models.Article]:
-    return db.query(models.Article).order_by(models.Article.id.desc()).limit(limit).all()
+def _dialect_insert(db: Session):
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        return postgresql.insert
+    if name == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"bulk upsert is not supported on {name}")
+
+def bulk_upsert_articles(db: Session, rows: List[Dict[str, Any]], commit: bool = True) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Insert many articles in one transaction, ignoring urls that already exist.
+
+    Uses INSERT ... ON CONFLICT (url) DO NOTHING RETURNING (SQLite >= 3.35 and Postgres),
+    so rows that lose a race with a concurrent writer are reported as existing.
+    Returns ({url: id} of new rows, {url: id} of rows that were already there).
+    commit=False leaves the transaction open for the caller (rolled back on error).
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        unique.setdefault(r["url"], r)
+    if not unique:
+        return {}, {}
+    insert = _dialect_insert(db)
+    table = models.Article.__table__
+    created: Dict[str, int] = {}
+    batch = list(unique.values())
+    try:
+        for i in range(0, len(batch), BULK_CHUNK):
+            stmt = (
+                insert(table)
+                .values(batch[i:i + BULK_CHUNK])
+                .on_conflict_do_nothing(index_elements=["url"])
+                .returning(table.c.id, table.c.url)
+            )
+            created.update({url: id_ for id_, url in db.execute(stmt)})
+        missing = [u for u in unique if u not in created]
+        existing: Dict[str, int] = {}
+        for i in range(0, len(missing), BULK_CHUNK):
+            q = db.query(models.Article.id, models.Article.url).filter(models.Article.url.in_(missing[i:i + BULK_CHUNK]))
+            existing.update({url: id_ for id_, url in q})
+        if commit:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return created, existing
 
 def create_post(db: Session, draft: str, tone: str = "professional", article_url: Optional[str] = None) -> models.Post:
     obj = models.Post(draft=draft, tone=tone, article_url=article_url)
@@ -22,5 +71,98 @@ def create_post(db: Session, draft: str, tone: str = "professional", article_url
     db.refresh(obj)
     return obj
 
-def list_posts(db: Session, limit: int = 20) -> List[models.Post]:
-    return db.query(models.Post).order_by(models.Post.id.desc()).limit(limit).all()
+def bulk_create_posts(db: Session, rows: List[Dict[str, Any]], commit: bool = True) -> List[int]:
+    """Insert many posts (draft, tone, article_url) with one statement per chunk; returns ids in order."""
+    if not rows:
+        return []
+    table = models.Post.__table__
+    ids: List[int] = []
+    try:
+        for i in range(0, len(rows), BULK_CHUNK):
+            # executemany + RETURNING is batched by SQLAlchemy ("insertmanyvalues")
+            stmt = table.insert().returning(table.c.id, sort_by_parameter_order=True)
+            ids.extend(db.execute(stmt, rows[i:i + BULK_CHUNK]).scalars().all())
+        if commit:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return ids
+
+def existing_article_urls(db: Session, urls: List[str]) -> set:
+    found = set()
+    for i in range(0, len(urls), BULK_CHUNK):
+        q = db.query(models.Article.url).filter(models.Article.url.in_(urls[i:i + BULK_CHUNK]))
+        found.update(u for (u,) in q)
+    return found
+
+ARTICLE_FIELDS = ("id", "title", "url", "published", "source", "summary", "created_at")
+POST_FIELDS = ("id", "tone", "article_url", "draft", "created_at", "sent_at", "platform_status")
+
+def encode_cursor(created_raw: str, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_raw, row_id]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        created_raw, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(created_raw), int(row_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+def _keyset_page(
+    db: Session,
+    model,
+    fields: Sequence[str],
+    limit: int,
+    cursor: Optional[str],
+    filters: Sequence[Any],
+    since: Optional[str],
+    until: Optional[str],
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # created_at is compared as the raw stored value: SQLite keeps CURRENT_TIMESTAMP
+    # text without microseconds, so a bound datetime would never compare equal to it
+    created = type_coerce(model.created_at, String)
+    cols = [getattr(model, f) for f in fields if f not in ("id", "created_at")]
+    q = db.query(model.id, created.label("_created_raw"), *cols).filter(*filters)
+    if since:
+        q = q.filter(created >= since)
+    if until:
+        q = q.filter(created < until)
+    if cursor:
+        c_created, c_id = decode_cursor(cursor)
+        q = q.filter(or_(created < c_created, and_(created == c_created, model.id < c_id)))
+    rows = q.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+
+    out: List[Dict[str, Any]] = []
+    for r in rows[:limit]:
+        m = r._mapping
+        out.append({f: str(m["_created_raw"]) if f == "created_at" else m[f] for f in fields})
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]._mapping
+        next_cursor = encode_cursor(str(last["_created_raw"]), last["id"])
+    return out, next_cursor
+
+def page_articles(
+    db: Session,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Sequence[str] = ARTICLE_FIELDS,
+    source: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Keyset page of articles, newest first on (created_at, id); only `fields` are loaded."""
+    filters = [models.Article.source == source] if source else []
+    return _keyset_page(db, models.Article, fields, limit, cursor, filters, since, until)
+
+def page_posts(
+    db: Session,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Sequence[str] = POST_FIELDS,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Keyset page of posts, newest first on (created_at, id); only `fields` are loaded."""
+    return _keyset_page(db, models.Post, fields, limit, cursor, [], since, until)
@@ -0,0 +1,51 @@
+# app/db/crud_assets.py
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.db.base import utc_naive
+from app.db.models import LinkedInAsset
+
+def _find(db: Session, author_urn: str, sha256: str) -> Optional[LinkedInAsset]:
+    return db.query(LinkedInAsset).filter(LinkedInAsset.author_urn == author_urn, LinkedInAsset.sha256 == sha256).first()
+
+def get_asset(db: Session, author_urn: str, sha256: str) -> Optional[LinkedInAsset]:
+    """Cached asset for (author, image hash); expired rows are dropped and count as a miss."""
+    row = _find(db, author_urn, sha256)
+    if row is None:
+        return None
+    now = datetime.utcnow()
+    expires_at = utc_naive(row.expires_at)
+    if expires_at is not None and expires_at <= now:
+        db.delete(row)
+        db.commit()
+        return None
+    row.last_used_at = now
+    db.commit()
+    return row
+
+def save_asset(db: Session, author_urn: str, sha256: str, asset_urn: str, ttl: float) -> Optional[LinkedInAsset]:
+    """Upsert the asset for (author, image hash).
+
+    Returns the stored row, or None if it could not be written (the cache is
+    best-effort; the caller already has its asset).
+    """
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+    for _ in range(2):
+        row = _find(db, author_urn, sha256)
+        if row is None:
+            row = LinkedInAsset(author_urn=author_urn, sha256=sha256)
+            db.add(row)
+        row.asset_urn = asset_urn
+        row.expires_at = expires_at
+        try:
+            db.commit()
+            return row
+        except IntegrityError:
+            db.rollback()  # a concurrent upload of the same image saved first; update that row
+    print(f"[assets] could not save {asset_urn} for {author_urn}", flush=True)
+    return _find(db, author_urn, sha256)
+
+def delete_asset(db: Session, author_urn: str, sha256: str) -> None:
+    db.query(LinkedInAsset).filter(LinkedInAsset.author_urn == author_urn, LinkedInAsset.sha256 == sha256).delete()
+    db.commit()
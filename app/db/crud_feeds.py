@@ -0,0 +1,106 @@
+# app/db/crud_feeds.py
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Iterable, Optional
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.db.crud import _dialect_insert
+from app.db.models import FeedState, FeedSubscription
+
+def _as_dict(row: FeedState) -> Dict[str, Any]:
+    return {
+        "url": row.url,
+        "etag": row.etag,
+        "last_modified": row.last_modified,
+        "body_hash": row.body_hash,
+        "entries": json.loads(row.entries_json) if row.entries_json else [],
+    }
+
+def get_feed_states(db: Session, urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    urls = list(set(urls))
+    if not urls:
+        return {}
+    rows = db.query(FeedState).filter(FeedState.url.in_(urls)).all()
+    return {r.url: _as_dict(r) for r in rows}
+
+def save_feed_states(db: Session, states: List[Dict[str, Any]]) -> None:
+    """Insert or update one row per feed url in a single commit.
+
+    INSERT ... ON CONFLICT (url) DO UPDATE, so two fetches of the same new feed
+    racing each other both succeed (last write wins).
+    """
+    rows = {
+        s["url"]: {
+            "url": s["url"],
+            "etag": s.get("etag"),
+            "last_modified": s.get("last_modified"),
+            "body_hash": s.get("body_hash"),
+            "entries_json": json.dumps(s.get("entries") or []),
+        }
+        for s in states
+    }  # one row per url: a statement may not update the same row twice
+    if not rows:
+        return
+    stmt = _dialect_insert(db)(FeedState.__table__).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["url"],
+        set_={
+            "etag": stmt.excluded.etag,
+            "last_modified": stmt.excluded.last_modified,
+            "body_hash": stmt.excluded.body_hash,
+            "entries_json": stmt.excluded.entries_json,
+            "fetched_at": func.now(),
+        },
+    )
+    try:
+        db.execute(stmt)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def create_subscription(
+    db: Session,
+    url: str,
+    interval_seconds: int,
+    owner_user_id: Optional[int] = None,
+    keywords: Optional[List[str]] = None,
+) -> FeedSubscription:
+    row = FeedSubscription(
+        url=url,
+        owner_user_id=owner_user_id,
+        keywords_json=json.dumps(keywords) if keywords else None,
+        interval_seconds=interval_seconds,
+        active=True,
+    )
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return row
+
+def list_subscriptions(db: Session, owner_user_id: Optional[int] = None) -> List[FeedSubscription]:
+    q = db.query(FeedSubscription)
+    if owner_user_id is not None:
+        q = q.filter(FeedSubscription.owner_user_id == owner_user_id)
+    return q.order_by(FeedSubscription.id).all()
+
+def delete_subscription(db: Session, sub_id: int) -> bool:
+    row = db.query(FeedSubscription).filter(FeedSubscription.id == sub_id).first()
+    if not row:
+        return False
+    db.delete(row)
+    db.commit()
+    return True
+
+def due_subscriptions(db: Session, now: datetime, limit: int = 100) -> List[FeedSubscription]:
+    return (
+        db.query(FeedSubscription)
+        .filter(FeedSubscription.active.is_(True))
+        .filter(or_(FeedSubscription.next_poll_at.is_(None), FeedSubscription.next_poll_at <= now))
+        .order_by(FeedSubscription.next_poll_at.asc().nulls_first())
+        .limit(limit)
+        .all()
+    )
+
+def subscription_keywords(row: FeedSubscription) -> List[str]:
+    return json.loads(row.keywords_json) if row.keywords_json else []
@@ -0,0 +1,54 @@
+# app/db/crud_jobs.py
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.db.models import PipelineJob
+
+ACTIVE = ("queued", "summarizing", "rewriting", "saving")
+
+def job_to_dict(row: PipelineJob) -> Dict[str, Any]:
+    return {
+        "job_id": row.id,
+        "status": row.status,
+        "request": json.loads(row.request_json),
+        "result": json.loads(row.result_json) if row.result_json else None,
+        "error": row.error,
+        "stage_ms": json.loads(row.stage_ms_json) if row.stage_ms_json else {},
+        "cancel_requested": bool(row.cancel_requested),
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "finished_at": row.finished_at.isoformat() if row.finished_at else None,
+    }
+
+def create_job(db: Session, request: Dict[str, Any]) -> PipelineJob:
+    row = PipelineJob(id=uuid.uuid4().hex, status="queued", request_json=json.dumps(request))
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return row
+
+def get_job(db: Session, job_id: str) -> Optional[PipelineJob]:
+    return db.get(PipelineJob, job_id)
+
+def update_job(db: Session, job_id: str, **fields: Any) -> Optional[PipelineJob]:
+    row = db.get(PipelineJob, job_id)
+    if row is None:
+        return None
+    for key in ("result", "stage_ms"):
+        if key in fields:
+            value = fields.pop(key)
+            setattr(row, f"{key}_json", json.dumps(value) if value is not None else None)
+    for k, v in fields.items():
+        setattr(row, k, v)
+    db.commit()
+    return row
+
+def fail_interrupted_jobs(db: Session) -> List[str]:
+    """Mark jobs left active by a previous process as failed."""
+    rows = db.query(PipelineJob).filter(PipelineJob.status.in_(ACTIVE)).all()
+    for r in rows:
+        r.status = "failed"
+        r.error = "interrupted by restart"
+    db.commit()
+    return [r.id for r in rows]
@@ -14,3 +14,9 @@ def migrate(engine: Engine) -> None:
             conn.execute(text("ALTER TABLE posts ADD COLUMN sent_at TEXT"))
         if not column_exists(engine, "posts", "platform_status"):
             conn.execute(text("ALTER TABLE posts ADD COLUMN platform_status TEXT"))
+
+    # keyset pagination indexes (create_all only adds indexes for new tables)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_articles_created_at_id ON articles (created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_articles_source_created_at_id ON articles (source, created_at, id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_created_at_id ON posts (created_at, id)"))
@@ -1,5 +1,5 @@
 ﻿# app/db/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Boolean, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from app.db.base import Base
 
@@ -12,6 +12,11 @@ class Article(Base):
     published = Column(String(64), nullable=True)  # ISO datetime string
     source = Column(String(256), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # keyset pagination (newest first), optionally per source
+    __table_args__ = (
+        Index("ix_articles_created_at_id", "created_at", "id"),
+        Index("ix_articles_source_created_at_id", "source", "created_at", "id"),
+    )
 
 class Post(Base):
     __tablename__ = "posts"
@@ -23,6 +28,7 @@ class Post(Base):
     # new fields for scheduling/state
     sent_at = Column(DateTime(timezone=True), nullable=True)
     platform_status = Column(String(128), nullable=True)  # e.g., 'queued','posted','failed:...'
+    __table_args__ = (Index("ix_posts_created_at_id", "created_at", "id"),)
 
 class User(Base):
     __tablename__ = "users"
@@ -41,3 +47,55 @@ class LinkedInToken(Base):
     id_token_encrypted = Column(Text, nullable=True)            # ← ADD THIS
     expires_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class LinkedInAsset(Base):
+    """Uploaded LinkedIn image asset, reused when the same author posts the same bytes again."""
+    __tablename__ = "linkedin_assets"
+    id = Column(Integer, primary_key=True, index=True)
+    author_urn = Column(String(128), nullable=False)
+    sha256 = Column(String(64), nullable=False)  # of the image bytes
+    asset_urn = Column(String(128), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (UniqueConstraint("author_urn", "sha256", name="uq_linkedin_assets_author_sha256"),)
+
+class FeedState(Base):
+    __tablename__ = "feed_states"
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(1024), unique=True, index=True)
+    etag = Column(String(256), nullable=True)
+    last_modified = Column(String(64), nullable=True)  # raw Last-Modified header
+    body_hash = Column(String(64), nullable=True)      # sha256 of the last feed body
+    entries_json = Column(Text, nullable=True)         # parsed entries (JSON list)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class FeedSubscription(Base):
+    __tablename__ = "feeds"
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(1024), index=True)
+    owner_user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    keywords_json = Column(Text, nullable=True)  # JSON list, same syntax as /rss keywords
+    active = Column(Boolean, default=True)
+    # adaptive polling state
+    interval_seconds = Column(Integer, nullable=False)
+    new_per_hour = Column(Float, default=0.0)  # EWMA of new entries per hour
+    next_poll_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    last_polled_at = Column(DateTime(timezone=True), nullable=True)
+    last_seen_published = Column(String(64), nullable=True)  # newest entry 'published' seen so far
+    seen_urls_json = Column(Text, nullable=True)  # JSON list of entry urls from the last poll
+    last_status = Column(String(128), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PipelineJob(Base):
+    __tablename__ = "pipeline_jobs"
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    status = Column(String(32), nullable=False, index=True)  # queued|summarizing|rewriting|saving|saved|skipped|failed|cancelled
+    request_json = Column(Text, nullable=False)
+    result_json = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    stage_ms_json = Column(Text, nullable=True)  # {"queued": ms, "summarizing": ms, ...}
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,8 +1,9 @@
 ﻿from fastapi import FastAPI
 from app.deps import init_db
+from app.services import hf_client, linkedin_api, pipeline_jobs, rewrite
 
 # Routers
-from app.routers import generate, content, storage, storage_pipeline, scheduler_api
+from app.routers import generate, content, storage, storage_pipeline, scheduler_api, feeds
 from app.routers import auth_linkedin, linkedin_publish
 
 app = FastAPI(title="LinkedIn SaaS API", version="0.5.0")
@@ -10,6 +11,15 @@ app = FastAPI(title="LinkedIn SaaS API", version="0.5.0")
 @app.on_event("startup")
 def _startup():
     init_db()
+    pipeline_jobs.recover_jobs()
+    hf_client.start_warmup()
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await hf_client.close_http_clients()
+    await rewrite.close_hedge_client()
+    linkedin_api.close_client()
+    await linkedin_api.close_async_client()
 
 @app.get("/")
 def root():
@@ -21,5 +31,6 @@ app.include_router(content.router)            # /generate/*
 app.include_router(storage.router)            # /storage/*
 app.include_router(storage_pipeline.router)   # /pipeline/*
 app.include_router(scheduler_api.router)      # /scheduler/*
+app.include_router(feeds.router)              # /feeds/*
 app.include_router(auth_linkedin.router)      # /auth/linkedin/*
 app.include_router(linkedin_publish.router)   # /linkedin/*
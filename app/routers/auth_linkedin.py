@@ -1,4 +1,5 @@
 ﻿# app/routers/auth_linkedin.py
+import asyncio
 import secrets
 from typing import Optional
 
@@ -15,7 +16,6 @@ from app.db.models import User
 
 # NEW: decode helper
 from app.auth.oidc import decode_linkedin_id_token
-import anyio
 
 router = APIRouter(prefix="/auth/linkedin", tags=["linkedin-auth"])
 STATE_STORE: set[str] = set()
@@ -117,8 +117,9 @@ def callback(
 
 # Debug helper: show decoded id_token.sub instead of userinfo
 @router.get("/debug/whoami")
-def whoami(user_id: int = Query(...), db: Session = Depends(get_db)):
-    tok = crud_tokens.get_latest_token(db, user_id=user_id)
+async def whoami(user_id: int = Query(...), db: Session = Depends(get_db)):
+    # async for the JWKS fetch; the sync DB lookups run in a worker thread
+    tok = await asyncio.to_thread(crud_tokens.get_latest_token, db, user_id=user_id)
     if not tok:
         return {"status": "no_token"}
 
@@ -127,12 +128,12 @@ def whoami(user_id: int = Query(...), db: Session = Depends(get_db)):
     if getattr(tok, "id_token_encrypted", None):
         try:
             id_token = token_crypto.decrypt_token(tok.id_token_encrypted)
-            decoded = anyio.run(lambda: decode_linkedin_id_token(id_token))
+            decoded = await decode_linkedin_id_token(id_token)
             token_sub = decoded.get("sub")
         except Exception:
             token_sub = None
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await asyncio.to_thread(lambda: db.query(User).filter(User.id == user_id).first())
     db_member_id = user.member_id if user else None
     db_person_id = user.person_id if user else None
 
@@ -1,8 +1,14 @@
-﻿from fastapi import APIRouter
+﻿import json
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 from app.services.summarize import summarize_text
-from app.services.rewrite import rewrite_linkedin
+from app.services.rewrite import rewrite_linkedin, stream_rewrite, hedge_stats, _candidates_from_env
+from app.services.model_health import rewrite_health
+from app.services.hf_client import pool_stats
+from app.services.gen_cache import get_cache
+from app.services.batcher import get_batcher
 
 router = APIRouter(prefix="/generate", tags=["generate"])
 
@@ -10,17 +16,61 @@ class SummaryIn(BaseModel):
     text: str
     max_length: Optional[int] = 180
     min_length: Optional[int] = 60
+    no_cache: bool = False  # skip the generation cache lookup (result is still stored)
+    chunked: Optional[bool] = None  # map-reduce long input; None: SUMMARIZE_CHUNKED
+    backend: Optional[str] = None  # HF model id or local:textrank; None: SUMMARIZER_MODEL
 
 class RewriteIn(BaseModel):
     text: str
     tone: Optional[str] = "professional"
+    no_cache: bool = False
+    hedge: Optional[bool] = None  # None: REWRITE_HEDGE_ENABLED
 
 @router.post("/summary")
 def generate_summary(body: SummaryIn):
-    summary = summarize_text(body.text, max_length=body.max_length, min_length=body.min_length)
+    try:
+        summary = summarize_text(
+            body.text, max_length=body.max_length, min_length=body.min_length,
+            use_cache=not body.no_cache, chunked=body.chunked, backend=body.backend,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     return {"summary": summary}
 
 @router.post("/post")
 def generate_linkedin_post(body: RewriteIn):
-    post = rewrite_linkedin(body.text, tone=body.tone or "professional")
+    post = rewrite_linkedin(body.text, tone=body.tone or "professional", use_cache=not body.no_cache, hedge=body.hedge)
     return {"post": post}
+
+@router.post("/post/stream")
+async def stream_linkedin_post(body: RewriteIn):
+    """Server-Sent Events: 'token' events as text arrives, then 'done' (or 'error')."""
+    async def events():
+        async for event in stream_rewrite(body.text, tone=body.tone or "professional", use_cache=not body.no_cache):
+            kind = event.pop("type")
+            yield f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/stats")
+def generation_stats():
+    cache = get_cache()
+    return {
+        "hf_pool": pool_stats(),
+        "cache": cache.stats() if cache else {"enabled": False},
+        "batcher": get_batcher().stats(),
+    }
+
+@router.get("/models/health")
+def models_health():
+    models = rewrite_health.snapshot(_candidates_from_env())
+    serving = max(
+        (m for m in models if m["state"] != "open" and m["last_success_at"]),
+        key=lambda m: m["last_success_at"], default=None,
+    )
+    return {
+        "serving": serving["model"] if serving else None,
+        "order": rewrite_health.order(_candidates_from_env()),
+        "models": models,
+        "hedging": hedge_stats(),
+    }
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, HttpUrl, Field
+from typing import Optional, List, Dict, Any
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.deps import get_db
+from app.db import crud_feeds
+from app.services.feed_poller import poll_due_feeds
+
+router = APIRouter(prefix="/feeds", tags=["feeds"])
+
+class FeedIn(BaseModel):
+    url: HttpUrl
+    owner_user_id: Optional[int] = None
+    keywords: Optional[List[str]] = None
+    interval_seconds: Optional[int] = Field(None, ge=60)
+
+def _feed_out(r) -> Dict[str, Any]:
+    return {
+        "id": r.id, "url": r.url, "owner_user_id": r.owner_user_id,
+        "keywords": crud_feeds.subscription_keywords(r), "active": r.active,
+        "interval_seconds": r.interval_seconds, "new_per_hour": round(r.new_per_hour or 0.0, 3),
+        "next_poll_at": str(r.next_poll_at) if r.next_poll_at else None,
+        "last_polled_at": str(r.last_polled_at) if r.last_polled_at else None,
+        "last_status": r.last_status,
+    }
+
+@router.post("")
+def subscribe(body: FeedIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    row = crud_feeds.create_subscription(
+        db, str(body.url),
+        interval_seconds=body.interval_seconds or settings.feed_default_interval,
+        owner_user_id=body.owner_user_id,
+        keywords=body.keywords,
+    )
+    return _feed_out(row)
+
+@router.get("")
+def list_feeds(owner_user_id: Optional[int] = None, db: Session = Depends(get_db)) -> List[Dict[str, Any]]:
+    return [_feed_out(r) for r in crud_feeds.list_subscriptions(db, owner_user_id=owner_user_id)]
+
+@router.delete("/{feed_id}")
+def unsubscribe(feed_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    if not crud_feeds.delete_subscription(db, feed_id):
+        raise HTTPException(404, "Feed not found")
+    return {"status": "deleted", "id": feed_id}
+
+@router.post("/poll")
+def poll_now() -> Dict[str, Any]:
+    # sync route: runs in the threadpool, where the poller may start its own event loop
+    return poll_due_feeds()
@@ -1,27 +1,55 @@
-﻿from fastapi import APIRouter, Query
-from typing import List, Optional, Dict, Any
-from app.services.rss_fetcher import fetch_rss
+﻿import asyncio
+import json
+from itertools import islice
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, Union, Literal
+from app.services.rss_fetcher import fetch_rss, fetch_feeds, stream_feeds, merge_newest_first
+from app.services.dedup import annotate_items
 
 router = APIRouter(prefix="/rss", tags=["rss"])
 
+NearDupMode = Literal["off", "flag", "skip"]
+
 @router.get("/test")
 def rss_test(
     url: str = Query(..., description="RSS feed URL, e.g. https://techcrunch.com/feed/"),
-    keywords: Optional[List[str]] = Query(None, description="Optional keyword filters"),
-    limit: int = Query(10, ge=1, le=50)
+    keywords: Optional[List[str]] = Query(None, description="Optional keyword filters; prefix with '-' to exclude"),
+    limit: int = Query(10, ge=1, le=50),
+    whole_words: bool = Query(False, description="Match keywords on word boundaries only (default: substring)"),
+    near_duplicates: NearDupMode = Query("flag", description="Flag or skip near-duplicate stories ('off' disables)"),
 ) -> Dict[str, Any]:
-    items = fetch_rss(url, keywords=keywords, limit=limit)
+    items = fetch_rss(url, keywords=keywords, limit=limit, whole_words=whole_words)
+    items = list(annotate_items(items, near_duplicates))
     return {"count": len(items), "items": items}
 
-@router.post("/fetch")
-def rss_fetch(
+@router.post("/fetch", response_model=None)
+async def rss_fetch(
     urls: List[str],
     keywords: Optional[List[str]] = None,
-    limit: int = 10
-) -> Dict[str, Any]:
-    all_items: List[Dict[str, Any]] = []
-    for u in urls:
-        all_items.extend(fetch_rss(u, keywords=keywords, limit=limit))
-    # sort newest first if published available
-    all_items.sort(key=lambda x: x.get("published") or "", reverse=True)
-    return {"count": len(all_items), "items": all_items}
+    limit: int = 10,
+    concurrency: Optional[int] = Query(None, ge=1, le=64, description="Max feeds downloaded at once"),
+    timeout: Optional[float] = Query(None, gt=0, le=120, description="Per-feed timeout in seconds"),
+    whole_words: bool = Query(False, description="Match keywords on word boundaries only (default: substring)"),
+    total_limit: Optional[int] = Query(None, ge=1, description="Global cap on merged items across all feeds"),
+    stream: bool = Query(False, description="Stream NDJSON events: each feed's status and items as soon as it finishes (feed completion order, not merged newest first)"),
+    near_duplicates: NearDupMode = Query("flag", description="Flag or skip near-duplicate stories ('off' disables)"),
+) -> Union[Dict[str, Any], StreamingResponse]:
+    opts = dict(keywords=keywords, limit=limit, concurrency=concurrency, timeout=timeout, whole_words=whole_words)
+    if stream:
+        async def ndjson():
+            async for event in stream_feeds(urls, total_limit=total_limit, near_duplicates=near_duplicates, **opts):
+                yield json.dumps(event) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    results = await fetch_feeds(urls, **opts)
+    per_feed: List[List[Dict[str, Any]]] = []
+    feeds: List[Dict[str, Any]] = []
+    for res in results:
+        per_feed.append(res.pop("items"))
+        feeds.append(res)
+    # newest first if published available
+    merged = annotate_items(merge_newest_first(per_feed), near_duplicates)
+    # dedup may load its index from the DB on first use
+    all_items = await asyncio.to_thread(list, islice(merged, total_limit) if total_limit else merged)
+    return {"count": len(all_items), "items": all_items, "feeds": feeds}
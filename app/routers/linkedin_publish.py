@@ -1,18 +1,27 @@
 ﻿# app/routers/linkedin_publish.py
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+import asyncio
+import base64
+import hashlib
+import httpx
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, AsyncIterator, Awaitable, Callable, Tuple
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.deps import get_db
+from app.db import crud_assets
 from app.db import crud_tokens
 from app.db import token_crypto
 from app.services import linkedin_api
 from app.auth.oidc import decode_linkedin_id_token
-import anyio
+from app.db.models import User
 
 router = APIRouter(prefix="/linkedin", tags=["linkedin"])
 
+# The routes here are async; SQLAlchemy is sync, so every DB call is pushed to a
+# worker thread with asyncio.to_thread instead of blocking the event loop.
+
 class PublishIn(BaseModel):
     user_id: int
     text: str
@@ -30,14 +39,30 @@ class ImageShareIn(BaseModel):
     text: str = ""
     member_id: Optional[str] = None
 
+# LinkedIn shows at most this many images in one post
+MAX_IMAGES = 9
+
+class ImageIn(BaseModel):
+    image_base64: Optional[str] = None
+    image_url: Optional[str] = None
+
+class MultiImageShareIn(BaseModel):
+    user_id: int
+    images: List[ImageIn] = Field(..., min_length=1, max_length=MAX_IMAGES)
+    text: str = ""
+    member_id: Optional[str] = None
+
 class DebugPostIn(BaseModel):
     user_id: int
     text: str
     member_id: Optional[str] = None
     person_id: Optional[str] = None
 
-def _resolve_author_from_token(db: Session, user_id: int, access_token: str, provided_member_id: Optional[str], context: str) -> str:
-    tok = crud_tokens.get_latest_token(db, user_id=user_id)
+def _get_user(db: Session, user_id: int) -> Optional[User]:
+    return db.query(User).filter(User.id == user_id).first()
+
+async def _resolve_author_from_token(db: Session, user_id: int, access_token: str, provided_member_id: Optional[str], context: str) -> str:
+    tok = await asyncio.to_thread(crud_tokens.get_latest_token, db, user_id=user_id)
     if not tok:
         raise HTTPException(400, "No LinkedIn token on file; visit /auth/linkedin/login first.")
 
@@ -51,7 +76,7 @@ def _resolve_author_from_token(db: Session, user_id: int, access_token: str, pro
 
     try:
         # DEV-friendly: verify signature/issuer but ignore 'exp'
-        decoded = anyio.run(lambda: decode_linkedin_id_token(id_token, allow_expired=True, allow_issuer_any=True))
+        decoded = await decode_linkedin_id_token(id_token, allow_expired=True, allow_issuer_any=True)
     except Exception:
         raise HTTPException(401, "Could not decode id_token; please re-login.")
 
@@ -59,8 +84,7 @@ def _resolve_author_from_token(db: Session, user_id: int, access_token: str, pro
     if not token_member_id:
         raise HTTPException(401, "id_token missing 'sub'; please re-login.")
 
-    from app.db.models import User
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await asyncio.to_thread(_get_user, db, user_id)
     db_member_id = user.member_id if user and user.member_id else None
     if db_member_id and db_member_id != token_member_id:
         raise HTTPException(
@@ -73,24 +97,24 @@ def _resolve_author_from_token(db: Session, user_id: int, access_token: str, pro
     print(f"[{context}] author={author_urn} (source=id_token.sub)", flush=True)
     return author_urn
 
-def _get_fresh_access_token(db: Session, user_id: int) -> str:
-    tok = crud_tokens.get_latest_token(db, user_id=user_id)
+async def _get_fresh_access_token(db: Session, user_id: int) -> str:
+    tok = await asyncio.to_thread(crud_tokens.get_latest_token, db, user_id=user_id)
     if not tok:
         raise HTTPException(400, "No LinkedIn token on file for this user_id. Visit /auth/linkedin/login first.")
 
     # refresh if expiring
     if crud_tokens.is_token_expiring(tok):
-        refresh_token_enc = crud_tokens.get_latest_refresh_token(db, user_id)
+        refresh_token_enc = await asyncio.to_thread(crud_tokens.get_latest_refresh_token, db, user_id)
         if refresh_token_enc:
             try:
                 from app.db.token_crypto import decrypt_token as dec
                 plain_refresh = dec(refresh_token_enc)
-                resp = linkedin_api.exchange_refresh_for_token(plain_refresh)
+                resp = await linkedin_api.exchange_refresh_for_token_async(plain_refresh)
                 access_token_new = resp.get("access_token")
                 expires_in_new = resp.get("expires_in", 3600)
                 if access_token_new:
-                    crud_tokens.update_access_token_only(db, user_id, access_token_new, expires_in_new)
-                    tok = crud_tokens.get_latest_token(db, user_id=user_id)
+                    await asyncio.to_thread(crud_tokens.update_access_token_only, db, user_id, access_token_new, expires_in_new)
+                    tok = await asyncio.to_thread(crud_tokens.get_latest_token, db, user_id=user_id)
                 else:
                     raise Exception("No access_token in refresh response")
             except Exception:
@@ -99,13 +123,13 @@ def _get_fresh_access_token(db: Session, user_id: int) -> str:
     return token_crypto.decrypt_token(tok.access_token_encrypted)
 
 @router.post("/post")
-def publish(body: PublishIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    access_token = _get_fresh_access_token(db, body.user_id)
+async def publish(body: PublishIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    access_token = await _get_fresh_access_token(db, body.user_id)
 
     # Always derive author from the token owner and validate against stored DB member_id
-    author_urn = _resolve_author_from_token(db, body.user_id, access_token, provided_member_id=None, context="post")
+    author_urn = await _resolve_author_from_token(db, body.user_id, access_token, provided_member_id=None, context="post")
 
-    ok, ref = linkedin_api.post_text(access_token, author_urn, body.text)
+    ok, ref = await linkedin_api.post_text_async(access_token, author_urn, body.text)
     if ok:
         try:
             ref_text = getattr(ref, "text", ref)
@@ -119,20 +143,19 @@ def publish(body: PublishIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
     raise HTTPException(status or 400, f"LinkedIn API error ({status}) [{code}]: {message}")
 
 @router.get("/check")
-def check(user_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def check(user_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Dry-run: resolve access token, member_id/person_id and return the author URN the server would use."""
-    access_token = _get_fresh_access_token(db, user_id)
-    from app.db.models import User
+    access_token = await _get_fresh_access_token(db, user_id)
 
     # Look up stored DB values
-    user_db = db.query(User).filter(User.id == user_id).first()
+    user_db = await asyncio.to_thread(_get_user, db, user_id)
     db_member_id = user_db.member_id if user_db else None
     db_person_id = user_db.person_id if user_db else None
 
     # Decode id_token to extract sub (LinkedIn member_id)
     token_sub = None
     decode_error = None
-    tok = crud_tokens.get_latest_token(db, user_id=user_id)
+    tok = await asyncio.to_thread(crud_tokens.get_latest_token, db, user_id=user_id)
     if tok:
         enc = getattr(tok, "id_token_encrypted", None)
         plain = getattr(tok, "id_token", None)
@@ -140,7 +163,7 @@ def check(user_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
             id_token = token_crypto.decrypt_token(enc) if enc else plain
             try:
                 # DEV-friendly: verify signature/issuer but ignore 'exp'
-                decoded = anyio.run(lambda: decode_linkedin_id_token(id_token, allow_expired=True, allow_issuer_any=True))
+                decoded = await decode_linkedin_id_token(id_token, allow_expired=True, allow_issuer_any=True)
                 token_sub = decoded.get("sub")
                 iss_claim = decoded.get("iss")
             except Exception as e:
@@ -169,50 +192,214 @@ def check(user_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
     }
 
 @router.post("/post/link")
-def post_link(body: LinkShareIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    access_token = _get_fresh_access_token(db, body.user_id)
-    author_urn = _resolve_author_from_token(db, body.user_id, access_token, body.member_id, context="post_link")
-    ok, resp = linkedin_api.post_article_share(access_token, author_urn, body.url, body.text)
+async def post_link(body: LinkShareIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    access_token = await _get_fresh_access_token(db, body.user_id)
+    author_urn = await _resolve_author_from_token(db, body.user_id, access_token, body.member_id, context="post_link")
+    ok, resp = await linkedin_api.post_article_share_async(access_token, author_urn, body.url, body.text)
     if ok:
         return {"status": "posted", "ref": resp.text}
     raise HTTPException(502, f"LinkedIn article share failed: {resp.text}")
 
-@router.post("/post/image")
-def post_image(body: ImageShareIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    import base64, httpx
-    access_token = _get_fresh_access_token(db, body.user_id)
-    author_urn = _resolve_author_from_token(db, body.user_id, access_token, body.member_id, context="post_image")
+async def _share_image(access_token: str, author_urn: str, asset_urn: str, text: str, cached: bool = False) -> Dict[str, Any]:
+    ok, resp = await linkedin_api.post_image_share_async(access_token, author_urn, asset_urn, text)
+    if ok:
+        return {"status": "posted", "ref": resp.text, "asset": asset_urn, "asset_cached": cached}
+    raise HTTPException(502, f"LinkedIn image share failed: {resp.text}")
 
-    reg = linkedin_api.register_image_upload(access_token, author_urn)
-    upload_url = reg["value"]["uploadMechanism"]["com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"]["uploadUrl"]
-    asset_urn = reg["value"]["asset"]
+async def _bytes_chunks(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+async def _file_chunks(upload: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await upload.read(settings.linkedin_upload_chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+async def _file_digest(upload: UploadFile) -> str:
+    h = hashlib.sha256()
+    async for chunk in _file_chunks(upload):
+        h.update(chunk)
+    await upload.seek(0)
+    return h.hexdigest()
+
+async def _checked_upload(upload: Awaitable[str]) -> str:
+    """Await an image upload (returns the asset URN), mapping size/transfer failures to HTTP errors."""
+    try:
+        return await upload
+    except linkedin_api.ImageTooLarge as e:
+        raise HTTPException(413, str(e))
+    except linkedin_api.ImageDownloadError as e:
+        raise HTTPException(400, f"Could not download image_url: {e}")
+    except httpx.HTTPError as e:
+        raise HTTPException(502, f"LinkedIn image upload failed: {e}")
+
+async def _remember_asset(db: Session, author_urn: str, digest: str, asset_urn: str) -> None:
+    if settings.linkedin_asset_ttl > 0:
+        await asyncio.to_thread(crud_assets.save_asset, db, author_urn, digest, asset_urn, settings.linkedin_asset_ttl)
+
+async def _asset_available(access_token: str, author_urn: str, asset_urn: str) -> bool:
+    """Whether LinkedIn still serves a cached asset; anything but AVAILABLE (or no answer) counts as stale."""
+    try:
+        return await linkedin_api.asset_status_async(access_token, asset_urn, author_urn) == "AVAILABLE"
+    except httpx.HTTPError:
+        return False
+
+async def _share_known_image(
+    db: Session, access_token: str, author_urn: str, text: str, digest: str, upload: Callable[[], Awaitable[str]],
+) -> Dict[str, Any]:
+    """Share an image whose hash is known up front, reusing the author's asset for those bytes if cached.
+
+    A cached asset LinkedIn no longer serves is dropped and the image uploaded
+    again through `upload`.
+    """
+    cached = await asyncio.to_thread(crud_assets.get_asset, db, author_urn, digest) if settings.linkedin_asset_ttl > 0 else None
+    if cached is not None:
+        if await _asset_available(access_token, author_urn, cached.asset_urn):
+            return await _share_image(access_token, author_urn, cached.asset_urn, text, cached=True)
+        print(f"[post_image] cached asset {cached.asset_urn} is stale; uploading again", flush=True)
+        await asyncio.to_thread(crud_assets.delete_asset, db, author_urn, digest)
+    asset_urn = await _checked_upload(upload())
+    await _remember_asset(db, author_urn, digest, asset_urn)
+    return await _share_image(access_token, author_urn, asset_urn, text)
+
+@router.post("/post/image")
+async def post_image(body: ImageShareIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    access_token = await _get_fresh_access_token(db, body.user_id)
+    author_urn = await _resolve_author_from_token(db, body.user_id, access_token, body.member_id, context="post_image")
 
     if body.image_base64:
         image_bytes = base64.b64decode(body.image_base64)
-    elif body.image_url:
-        with httpx.Client(timeout=60) as c:
-            r = c.get(body.image_url)
-            r.raise_for_status()
-            image_bytes = r.content
-    else:
-        raise HTTPException(400, "Provide image_base64 or image_url.")
-
-    success = linkedin_api.upload_image_asset(upload_url, image_bytes)
-    if not success:
-        raise HTTPException(502, "LinkedIn image upload failed.")
-
-    ok, resp = linkedin_api.post_image_share(access_token, author_urn, asset_urn, body.text)
+        return await _share_known_image(
+            db, access_token, author_urn, body.text, hashlib.sha256(image_bytes).hexdigest(),
+            lambda: linkedin_api.upload_image_stream_async(access_token, author_urn, _bytes_chunks(image_bytes), len(image_bytes)),
+        )
+    if body.image_url:
+        # streamed: download chunks go straight to LinkedIn, registration overlaps the download.
+        # The hash is only known once the bytes went by, so this fills the asset cache but can't hit it.
+        hasher = hashlib.sha256()
+        asset_urn = await _checked_upload(linkedin_api.upload_image_from_url_async(
+            access_token, author_urn, body.image_url, on_chunk=hasher.update))
+        await _remember_asset(db, author_urn, hasher.hexdigest(), asset_urn)
+        return await _share_image(access_token, author_urn, asset_urn, body.text)
+    raise HTTPException(400, "Provide image_base64 or image_url.")
+
+@router.post("/post/image/upload")
+async def post_image_upload(
+    user_id: int = Form(...),
+    text: str = Form(""),
+    member_id: Optional[str] = Form(None),
+    image: UploadFile = File(...),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """Multipart variant of /post/image: the file is streamed to LinkedIn in chunks, never held in memory whole."""
+    access_token = await _get_fresh_access_token(db, user_id)
+    author_urn = await _resolve_author_from_token(db, user_id, access_token, member_id, context="post_image_upload")
+    digest = await _file_digest(image)  # one local pass over the spooled file; saves the upload on a hit
+
+    async def upload() -> str:
+        await image.seek(0)
+        return await linkedin_api.upload_image_stream_async(access_token, author_urn, _file_chunks(image), image.size)
+
+    return await _share_known_image(db, access_token, author_urn, text, digest, upload)
+
+# upload(on_chunk) -> asset URN; on_chunk sees every byte sent, so the image can be hashed in flight
+Uploader = Callable[[Callable[[bytes], None]], Awaitable[str]]
+
+async def _multi_image_asset(
+    db: Session, db_lock: asyncio.Lock, access_token: str, author_urn: str, digest: Optional[str], upload: Uploader,
+    sem: asyncio.Semaphore,
+) -> str:
+    """Asset for one image of a multi-image post, returned once LinkedIn reports it AVAILABLE.
+
+    A cached asset (when the hash is known up front) is checked first; one that
+    LinkedIn no longer serves is dropped and the image uploaded again. The images
+    share the request's Session, which is not thread-safe, so DB calls hold `db_lock`.
+    """
+    if digest and settings.linkedin_asset_ttl > 0:
+        async with db_lock:
+            cached = await asyncio.to_thread(crud_assets.get_asset, db, author_urn, digest)
+        if cached is not None:
+            if await _asset_available(access_token, author_urn, cached.asset_urn):
+                return cached.asset_urn
+            async with db_lock:
+                await asyncio.to_thread(crud_assets.delete_asset, db, author_urn, digest)
+    hasher = hashlib.sha256()
+    async with sem:
+        asset_urn = await _checked_upload(upload(hasher.update))
+    async with db_lock:
+        await _remember_asset(db, author_urn, hasher.hexdigest(), asset_urn)
+    try:
+        await linkedin_api.wait_asset_ready_async(access_token, asset_urn, settings.linkedin_asset_ready_timeout, author_urn)
+    except (linkedin_api.AssetNotReady, httpx.HTTPError) as e:
+        raise HTTPException(502, f"LinkedIn image processing failed: {e}")
+    return asset_urn
+
+async def _post_images(
+    db: Session, access_token: str, author_urn: str, text: str, sources: List[Tuple[Optional[str], Uploader]],
+) -> Dict[str, Any]:
+    """Upload all images concurrently (at most LINKEDIN_UPLOAD_CONCURRENCY at once), then make one post."""
+    sem = asyncio.Semaphore(max(1, settings.linkedin_upload_concurrency))
+    db_lock = asyncio.Lock()
+    tasks = [asyncio.ensure_future(_multi_image_asset(db, db_lock, access_token, author_urn, d, up, sem)) for d, up in sources]
+    try:
+        assets = await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+    ok, resp = await linkedin_api.post_images_share_async(access_token, author_urn, list(assets), text)
     if ok:
-        return {"status": "posted", "ref": resp.text}
+        return {"status": "posted", "ref": resp.text, "assets": list(assets)}
     raise HTTPException(502, f"LinkedIn image share failed: {resp.text}")
 
+def _json_image_source(access_token: str, author_urn: str, img: ImageIn) -> Tuple[Optional[str], Uploader]:
+    if img.image_base64:
+        data = base64.b64decode(img.image_base64)
+        return hashlib.sha256(data).hexdigest(), lambda on_chunk: linkedin_api.upload_image_stream_async(
+            access_token, author_urn, _bytes_chunks(data), len(data), on_chunk=on_chunk)
+    if img.image_url:
+        return None, lambda on_chunk: linkedin_api.upload_image_from_url_async(
+            access_token, author_urn, img.image_url, on_chunk=on_chunk)
+    raise HTTPException(400, "Each image needs image_base64 or image_url.")
+
+def _file_image_source(access_token: str, author_urn: str, image: UploadFile) -> Uploader:
+    async def upload(on_chunk: Callable[[bytes], None]) -> str:
+        await image.seek(0)
+        return await linkedin_api.upload_image_stream_async(
+            access_token, author_urn, _file_chunks(image), image.size, on_chunk=on_chunk)
+    return upload
+
+@router.post("/post/images")
+async def post_images(body: MultiImageShareIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """One post with up to MAX_IMAGES images (base64 and/or URLs, in order)."""
+    access_token = await _get_fresh_access_token(db, body.user_id)
+    author_urn = await _resolve_author_from_token(db, body.user_id, access_token, body.member_id, context="post_images")
+    sources = [_json_image_source(access_token, author_urn, img) for img in body.images]
+    return await _post_images(db, access_token, author_urn, body.text, sources)
+
+@router.post("/post/images/upload")
+async def post_images_upload(
+    user_id: int = Form(...),
+    text: str = Form(""),
+    member_id: Optional[str] = Form(None),
+    images: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """Multipart variant of /post/images."""
+    if len(images) > MAX_IMAGES:
+        raise HTTPException(400, f"At most {MAX_IMAGES} images per post.")
+    access_token = await _get_fresh_access_token(db, user_id)
+    author_urn = await _resolve_author_from_token(db, user_id, access_token, member_id, context="post_images_upload")
+    sources = [(await _file_digest(img), _file_image_source(access_token, author_urn, img)) for img in images]
+    return await _post_images(db, access_token, author_urn, text, sources)
+
 @router.post("/debug/post")
-def debug_post(body: DebugPostIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def debug_post(body: DebugPostIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Dev-only: attempt a post using the provided member_id or person_id (no persistence) and return raw response for debugging."""
-    access_token = _get_fresh_access_token(db, body.user_id)
+    access_token = await _get_fresh_access_token(db, body.user_id)
 
-    from app.db.models import User
-    user_db = db.query(User).filter(User.id == body.user_id).first()
+    user_db = await asyncio.to_thread(_get_user, db, body.user_id)
     db_member_id = user_db.member_id if user_db else None
 
     chosen_person = body.person_id
@@ -224,12 +411,12 @@ def debug_post(body: DebugPostIn, db: Session = Depends(get_db)) -> Dict[str, An
         author = f"urn:li:member:{chosen_member}"
     else:
         # fallback to token identity (userinfo may fail; dev-only)
-        ts = linkedin_api.userinfo_sub(access_token)
+        ts = await linkedin_api.userinfo_sub_async(access_token)
         if not ts:
             raise HTTPException(401, "Couldn't resolve any member/person id to test with")
         author = f"urn:li:member:{ts}"
 
-    ok, ref = linkedin_api.post_text(access_token, author, body.text)
+    ok, ref = await linkedin_api.post_text_async(access_token, author, body.text)
 
     if ok:
         try:
@@ -1,13 +1,24 @@
 ﻿from fastapi import APIRouter
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from typing import Optional, Dict, Any
+from app.config import settings
 from app.services.scheduler import run_once
+from app.services.feed_poller import poll_due_feeds
 
 router = APIRouter(prefix="/scheduler", tags=["scheduler"])
 
 scheduler: Optional[BackgroundScheduler] = None
 
+def _get_scheduler() -> BackgroundScheduler:
+    # one BackgroundScheduler hosts both the daily post job and the feed poller
+    global scheduler
+    if not (scheduler and scheduler.running):
+        scheduler = BackgroundScheduler(timezone="UTC")
+        scheduler.start()
+    return scheduler
+
 @router.post("/run")
 def run_now() -> Dict[str, Any]:
     return run_once()
@@ -15,16 +26,30 @@ def run_now() -> Dict[str, Any]:
 @router.post("/start")
 def start(cron: str = "0 9 * * *") -> Dict[str, Any]:
     # default: 9:00 every day (server time). Use standard 5-field cron: m h dom mon dow
-    global scheduler
-    if scheduler and scheduler.running:
+    if scheduler and scheduler.running and scheduler.get_job("daily_post"):
         return {"status": "already-running"}
 
-    scheduler = BackgroundScheduler(timezone="UTC")
     trigger = CronTrigger.from_crontab(cron)
-    scheduler.add_job(run_once, trigger, id="daily_post", replace_existing=True, max_instances=1, coalesce=True)
-    scheduler.start()
+    _get_scheduler().add_job(run_once, trigger, id="daily_post", replace_existing=True, max_instances=1, coalesce=True)
     return {"status": "started", "cron": cron}
 
+@router.post("/feeds/start")
+def start_feed_poller(every_seconds: Optional[int] = None) -> Dict[str, Any]:
+    # the tick only checks which feeds are due; each feed keeps its own adaptive interval
+    seconds = every_seconds or settings.feed_poll_tick
+    _get_scheduler().add_job(
+        poll_due_feeds, IntervalTrigger(seconds=seconds), id="feed_poller",
+        replace_existing=True, max_instances=1, coalesce=True,
+    )
+    return {"status": "started", "every_seconds": seconds}
+
+@router.post("/feeds/stop")
+def stop_feed_poller() -> Dict[str, Any]:
+    if scheduler and scheduler.running and scheduler.get_job("feed_poller"):
+        scheduler.remove_job("feed_poller")
+        return {"status": "stopped"}
+    return {"status": "not-running"}
+
 @router.post("/stop")
 def stop() -> Dict[str, Any]:
     global scheduler
@@ -36,4 +61,5 @@ def stop() -> Dict[str, Any]:
 @router.get("/status")
 def status() -> Dict[str, Any]:
     global scheduler
-    return {"running": bool(scheduler and scheduler.running)}
+    running = bool(scheduler and scheduler.running)
+    return {"running": running, "jobs": [j.id for j in scheduler.get_jobs()] if running else []}
@@ -1,12 +1,38 @@
-﻿from fastapi import APIRouter, Depends
-from pydantic import BaseModel, HttpUrl
-from typing import Optional, List, Any, Dict
+﻿from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Optional, List, Any, Dict, Literal, Tuple
 from sqlalchemy.orm import Session
 from app.deps import get_db
 from app.db import crud
+from app.services import dedup
 
 router = APIRouter(prefix="/storage", tags=["storage"])
 
+ARTICLE_DEFAULT_FIELDS = ("id", "title", "url", "published", "source", "summary")
+POST_DEFAULT_FIELDS = ("id", "tone", "article_url", "draft", "created_at")
+
+def _parse_fields(fields: Optional[str], allowed: Tuple[str, ...], default: Tuple[str, ...]) -> Tuple[str, ...]:
+    if not fields:
+        return default
+    cols = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in cols if f not in allowed]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields {unknown}; allowed: {list(allowed)}")
+    return cols
+
+def _db_time(value: Optional[str]) -> Optional[str]:
+    # created_at is compared in the DB's own 'YYYY-MM-DD HH:MM:SS' (UTC) text form
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(400, f"Invalid ISO date/datetime: {value}")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
 class ArticleIn(BaseModel):
     title: str
     summary: str
@@ -14,29 +40,96 @@ class ArticleIn(BaseModel):
     published: Optional[str] = None
     source: Optional[str] = None
 
+class ArticlesBulkIn(BaseModel):
+    articles: List[ArticleIn] = Field(..., max_length=5000)
+
 class PostIn(BaseModel):
     draft: str
     tone: Optional[str] = "professional"
     article_url: Optional[HttpUrl] = None
 
 @router.post("/article")
-def save_article(body: ArticleIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
+def save_article(
+    body: ArticleIn,
+    near_duplicates: Literal["flag", "skip"] = Query("flag", description="Flag or skip near-duplicate stories"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
     existing = crud.get_article_by_url(db, str(body.url))
     if existing:
         return {"status": "exists", "id": existing.id}
+    dup = dedup.check_article(str(body.url), body.title, body.summary)
+    if dup and near_duplicates == "skip":
+        return {"status": "near_duplicate", **dup}
     a = crud.create_article(db, {
         "title": body.title, "summary": body.summary, "url": str(body.url),
         "published": body.published, "source": body.source,
     })
-    return {"status": "saved", "id": a.id}
+    dedup.remember_article(a.url, body.title, body.summary)
+    return {"status": "saved", "id": a.id, **(dup or {})}
+
+@router.post("/articles/bulk")
+def save_articles_bulk(
+    body: ArticlesBulkIn,
+    near_duplicates: Literal["flag", "skip"] = Query("flag", description="Flag or skip near-duplicate stories"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """Upsert a batch of articles in a single transaction; reports which rows were new."""
+    items: List[Dict[str, Any]] = []
+    rows: List[Dict[str, Any]] = []
+    deduper = dedup.BatchDeduper()
+    for a in body.articles:
+        item: Dict[str, Any] = {"url": str(a.url)}
+        dup = deduper.check({"url": item["url"], "title": a.title, "summary": a.summary})
+        if dup:
+            item.update(dup)
+        items.append(item)
+        if dup and near_duplicates == "skip":
+            item["status"] = "near_duplicate"
+            continue
+        rows.append({
+            "title": a.title, "summary": a.summary, "url": item["url"],
+            "published": a.published, "source": a.source,
+        })
+    created, existing = crud.bulk_upsert_articles(db, rows)
+    reported = set()
+    for a, item in zip(body.articles, items):
+        if item.get("status"):
+            continue
+        url = item["url"]
+        if url in created and url not in reported:
+            item.update(status="saved", id=created[url])
+            dedup.remember_article(url, a.title, a.summary)
+        else:
+            # repeated urls inside the batch land here after their first copy
+            item.update(status="exists", id=created.get(url) or existing.get(url))
+        reported.add(url)
+    counts: Dict[str, int] = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    return {"counts": counts, "items": items}
 
 @router.get("/articles")
-def list_articles(limit: int = 20, db: Session = Depends(get_db)) -> List[Dict[str, Any]]:
-    rows = crud.list_articles(db, limit=limit)
-    return [
-        {"id": r.id, "title": r.title, "url": r.url, "published": r.published, "source": r.source, "summary": r.summary}
-        for r in rows
-    ]
+def list_articles(
+    response: Response,
+    limit: int = Query(20, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns, e.g. id,title,url (skips summary)"),
+    source: Optional[str] = None,
+    since: Optional[str] = Query(None, description="ISO date/datetime (UTC), inclusive"),
+    until: Optional[str] = Query(None, description="ISO date/datetime (UTC), exclusive"),
+    db: Session = Depends(get_db),
+) -> List[Dict[str, Any]]:
+    cols = _parse_fields(fields, crud.ARTICLE_FIELDS, ARTICLE_DEFAULT_FIELDS)
+    try:
+        rows, next_cursor = crud.page_articles(
+            db, limit=limit, cursor=cursor, fields=cols, source=source,
+            since=_db_time(since), until=_db_time(until),
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 @router.post("/post")
 def save_post(body: PostIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
@@ -44,9 +137,22 @@ def save_post(body: PostIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
     return {"status": "saved", "id": p.id}
 
 @router.get("/posts")
-def list_posts(limit: int = 20, db: Session = Depends(get_db)) -> List[Dict[str, Any]]:
-    rows = crud.list_posts(db, limit=limit)
-    return [
-        {"id": r.id, "tone": r.tone, "article_url": r.article_url, "draft": r.draft, "created_at": str(r.created_at)}
-        for r in rows
-    ]
+def list_posts(
+    response: Response,
+    limit: int = Query(20, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns, e.g. id,tone,created_at (skips draft)"),
+    since: Optional[str] = Query(None, description="ISO date/datetime (UTC), inclusive"),
+    until: Optional[str] = Query(None, description="ISO date/datetime (UTC), exclusive"),
+    db: Session = Depends(get_db),
+) -> List[Dict[str, Any]]:
+    cols = _parse_fields(fields, crud.POST_FIELDS, POST_DEFAULT_FIELDS)
+    try:
+        rows, next_cursor = crud.page_posts(
+            db, limit=limit, cursor=cursor, fields=cols, since=_db_time(since), until=_db_time(until),
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
@@ -1,11 +1,14 @@
-﻿from fastapi import APIRouter, Depends
-from pydantic import BaseModel, HttpUrl
-from typing import Optional, Dict, Any
+﻿import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Optional, Dict, Any, List, Literal, Union
 from sqlalchemy.orm import Session
-from app.services.summarize import summarize_text
-from app.services.rewrite import rewrite_linkedin
+from app.db.base import SessionLocal
+from app.services.pipeline import iter_batch, run_post_and_save
+from app.services.pipeline_jobs import QueueFull, get_runner
 from app.deps import get_db
-from app.db import crud
+from app.db import crud_jobs
 
 router = APIRouter(prefix="/pipeline", tags=["pipeline"])
 
@@ -19,17 +22,61 @@ class PipelineIn(BaseModel):
     max_length: Optional[int] = 160
     min_length: Optional[int] = 60
 
+class PipelineBatchIn(BaseModel):
+    articles: List[PipelineIn] = Field(..., min_length=1, max_length=500)
+
 @router.post("/post_and_save")
-def post_and_save(body: PipelineIn, db: Session = Depends(get_db)) -> Dict[str, Any]:
-    # summarize
-    summary = summarize_text(body.text, max_length=body.max_length or 160, min_length=body.min_length or 60)
-    # rewrite
-    post = rewrite_linkedin(summary, tone=body.tone or "professional")
-    # save article (idempotent by url)
-    crud.get_article_by_url(db, str(body.url)) or crud.create_article(db, {
-        "title": body.title, "summary": summary, "url": str(body.url),
-        "published": body.published, "source": body.source,
-    })
-    # save post
-    p = crud.create_post(db, draft=post, tone=body.tone or "professional", article_url=str(body.url))
-    return {"summary": summary, "post": post, "post_id": p.id}
+def post_and_save(
+    body: PipelineIn,
+    near_duplicates: Literal["flag", "skip"] = Query("flag", description="Flag or skip (before any inference) near-duplicate stories"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    return run_post_and_save(db, body.model_dump(mode="json"), near_duplicates)
+
+@router.post("/batch", response_model=None)
+def pipeline_batch(
+    body: PipelineBatchIn,
+    near_duplicates: Literal["flag", "skip"] = Query("flag"),
+    concurrency: Optional[int] = Query(None, ge=1, le=32, description="Concurrent summarize/rewrite workers"),
+    stream: bool = Query(False, description="Stream NDJSON progress events"),
+) -> Union[Dict[str, Any], StreamingResponse]:
+    items = [a.model_dump(mode="json") for a in body.articles]
+
+    def events():
+        # own session: a Depends(get_db) session is closed before a streamed body finishes
+        db = SessionLocal()
+        try:
+            yield from iter_batch(db, items, near_duplicates, concurrency)
+        finally:
+            db.close()
+
+    if stream:
+        return StreamingResponse((json.dumps(e) + "\n" for e in events()), media_type="application/x-ndjson")
+    done = list(events())[-1]
+    done.pop("type")
+    return done
+
+@router.post("/jobs", status_code=202)
+def submit_job(
+    body: PipelineIn,
+    near_duplicates: Literal["flag", "skip"] = Query("flag"),
+) -> Dict[str, Any]:
+    """Queue post_and_save in the background; poll GET /pipeline/jobs/{job_id}."""
+    try:
+        return get_runner().submit(body.model_dump(mode="json"), near_duplicates)
+    except QueueFull as e:
+        raise HTTPException(503, f"Job queue is full ({e})")
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    job = crud_jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return crud_jobs.job_to_dict(job)
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str) -> Dict[str, Any]:
+    job = get_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job
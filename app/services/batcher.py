@@ -0,0 +1,92 @@
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import settings
+
+BatchFn = Callable[[str, List[str], Optional[Dict[str, Any]]], List[str]]
+
+class _Batch:
+    def __init__(self):
+        self.inputs: List[str] = []
+        self.futures: List[Future] = []
+        self.full = threading.Event()
+
+class MicroBatcher:
+    """Coalesces concurrent generations for the same (model, params) into one call.
+
+    The first caller for a key opens a batch and waits up to `window` seconds (or
+    until `max_items` callers have joined), then sends every input in one request
+    and hands each caller its own result. No background thread: the caller that
+    opened the batch runs it.
+    """
+
+    def __init__(self, call: BatchFn, window: float = 0.02, max_items: int = 8):
+        self.call = call
+        self.window = window
+        self.max_items = max(1, max_items)
+        self._open: Dict[Tuple[str, str], _Batch] = {}
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "items": 0, "largest": 0}
+
+    def submit(self, model: str, inputs: str, params: Optional[Dict[str, Any]] = None) -> str:
+        key = (model, json.dumps(params or {}, sort_keys=True))
+        fut: Future = Future()
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            batch.inputs.append(inputs)
+            batch.futures.append(fut)
+            if len(batch.inputs) >= self.max_items:
+                # closed to newcomers; the leader runs it right away
+                del self._open[key]
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            self._run(model, params, batch)
+        return fut.result()
+
+    def _run(self, model: str, params: Optional[Dict[str, Any]], batch: _Batch) -> None:
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += len(batch.inputs)
+            self._stats["largest"] = max(self._stats["largest"], len(batch.inputs))
+        try:
+            outputs = self.call(model, batch.inputs, params)
+        except Exception as e:
+            for f in batch.futures:
+                f.set_exception(e)
+            return
+        for f, out in zip(batch.futures, outputs):
+            f.set_result(out)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+        out["avg_batch"] = round(out["items"] / out["batches"], 2) if out["batches"] else None
+        return out
+
+_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+def _hf_batch(model: str, inputs: List[str], params: Optional[Dict[str, Any]]) -> List[str]:
+    from app.services.hf_client import HFClient
+    # callers already checked the cache; still store the fresh results
+    return HFClient().text_generation_batch(model, inputs, params, use_cache=False)
+
+def get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    _hf_batch,
+                    window=settings.hf_batch_window_ms / 1000.0,
+                    max_items=settings.hf_batch_max_items,
+                )
+    return _batcher
@@ -0,0 +1,167 @@
+import hashlib
+import random
+import re
+import threading
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.config import settings
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_BODY_WORDS = 60  # only the lede: RSS summaries and full article text share it
+NUM_PERM = 64
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)  # fixed seed: signatures must be stable across processes
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+def _features(title: str, body: str) -> List[str]:
+    text = f"{title or ''} {' '.join((body or '').split()[:_BODY_WORDS])}".lower()
+    return _WORD.findall(text)
+
+@lru_cache(maxsize=65536)
+def _permuted(feat: str) -> Tuple[int, ...]:
+    h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "big")
+    return tuple((a * h + b) % _PRIME for a, b in _PERMS)
+
+def signature(title: str, body: str = "") -> array:
+    """MinHash signature of an article's title and the first words of its summary/text."""
+    feats = set(_features(title, body))
+    if not feats:
+        return array("Q", [_PRIME] * NUM_PERM)
+    return array("Q", map(min, zip(*(_permuted(f) for f in feats))))
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of the two word sets."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+def _banding(threshold: float) -> Tuple[int, int]:
+    # Pick rows-per-band so the LSH candidate curve (1/b)^(1/r) sits a little
+    # below the threshold: near-duplicates collide in some band, others rarely do
+    best = (NUM_PERM, 1)
+    for rows in range(1, NUM_PERM + 1):
+        bands = NUM_PERM // rows
+        if (1 / bands) ** (1 / rows) <= threshold - 0.1:
+            best = (bands, rows)
+    return best
+
+class NearDupIndex:
+    """MinHash LSH index answering 'is a stored article at least `threshold` similar?'.
+
+    Each signature is cut into bands that are hashed into per-band buckets, so a
+    lookup is one dict probe per band plus a check of the few colliding entries.
+    """
+
+    def __init__(self, threshold: float = 0.7):
+        self.threshold = threshold
+        self._bands, self._rows = _banding(threshold)
+        self._buckets: List[Dict[int, List[int]]] = [dict() for _ in range(self._bands)]
+        self._keys: List[str] = []
+        self._key_set = set()
+        self._sigs: List[array] = []
+        self._lock = threading.Lock()
+
+    def _band_keys(self, sig: array) -> Iterable[Tuple[int, int]]:
+        r = self._rows
+        for i in range(self._bands):
+            yield i, hash(tuple(sig[i * r:(i + 1) * r]))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_set
+
+    def add(self, key: str, sig: array) -> None:
+        with self._lock:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._key_set.add(key)
+            self._sigs.append(sig)
+            for i, k in self._band_keys(sig):
+                self._buckets[i].setdefault(k, []).append(slot)
+
+    def find(self, sig: array) -> Optional[Tuple[str, float]]:
+        """Return (key, similarity) of the most similar stored entry at or above the threshold."""
+        best: Optional[Tuple[str, float]] = None
+        with self._lock:
+            seen = set()
+            for i, k in self._band_keys(sig):
+                for slot in self._buckets[i].get(k, ()):
+                    if slot in seen:
+                        continue
+                    seen.add(slot)
+                    s = similarity(sig, self._sigs[slot])
+                    if s >= self.threshold and (best is None or s > best[1]):
+                        best = (self._keys[slot], s)
+        return best
+
+_index: Optional[NearDupIndex] = None
+_index_lock = threading.Lock()
+
+def get_index() -> NearDupIndex:
+    """Process-wide index over stored articles, built from the DB on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from app.db.base import SessionLocal
+                from app.db import models
+                idx = NearDupIndex(settings.near_dup_threshold)
+                db = SessionLocal()
+                try:
+                    q = db.query(models.Article.url, models.Article.title, models.Article.summary)
+                    for url, title, summary in q.yield_per(1000):
+                        idx.add(url, signature(title or "", summary or ""))
+                finally:
+                    db.close()
+                _index = idx
+    return _index
+
+def check_article(url: str, title: str, body: str) -> Optional[Dict[str, Any]]:
+    """Return {'near_duplicate_of', 'similarity'} if a different stored article is near-identical."""
+    index = get_index()
+    if url in index:
+        return None  # exact url match: the caller's url dedup handles it
+    hit = index.find(signature(title, body))
+    if hit and hit[0] != url:
+        return {"near_duplicate_of": hit[0], "similarity": round(hit[1], 3)}
+    return None
+
+def remember_article(url: str, title: str, body: str) -> None:
+    get_index().add(url, signature(title, body))
+
+class BatchDeduper:
+    """Checks a stream of feed items against stored articles and against each other."""
+
+    def __init__(self):
+        self.stored = get_index()
+        self.local = NearDupIndex(self.stored.threshold)
+
+    def check(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        url = str(item.get("url") or "")
+        if url in self.stored:
+            return None
+        sig = signature(str(item.get("title") or ""), str(item.get("summary") or ""))
+        hit = self.stored.find(sig) or self.local.find(sig)
+        self.local.add(url, sig)
+        if hit and hit[0] != url:
+            return {"near_duplicate_of": hit[0], "similarity": round(hit[1], 3)}
+        return None
+
+def annotate_items(
+    items: Iterable[Dict[str, Any]], mode: str = "flag", deduper: Optional[BatchDeduper] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Flag ('flag') or drop ('skip') items that duplicate a stored article or an earlier item.
+
+    Pass the same `deduper` to several calls to compare items across them.
+    """
+    if mode == "off":
+        yield from items
+        return
+    deduper = deduper or BatchDeduper()
+    for item in items:
+        dup = deduper.check(item)
+        if dup is None:
+            yield item
+        elif mode != "skip":
+            yield {**item, **dup}
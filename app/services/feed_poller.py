@@ -0,0 +1,110 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.db.base import SessionLocal, utc_naive
+from app.db import crud, crud_feeds
+from app.services import dedup
+from app.services.keyword_match import get_matcher
+from app.services.rss_fetcher import fetch_feeds
+
+POLL_ENTRY_LIMIT = 100  # entries read per feed per poll
+RATE_ALPHA = 0.3        # EWMA weight of the latest poll
+
+def next_interval(interval: int, new_per_hour: float, new_count: int, elapsed_seconds: float) -> Tuple[int, float]:
+    """Return (next interval, updated EWMA rate) for a feed after one poll.
+
+    Aims at roughly one new entry per poll: busy feeds converge to short intervals,
+    quiet feeds back off. The interval changes by at most 2x per poll and stays
+    within FEED_MIN_INTERVAL..FEED_MAX_INTERVAL.
+    """
+    observed = new_count / (max(elapsed_seconds, 1.0) / 3600)
+    # seed the average with the first real observation instead of decaying up from zero
+    rate = RATE_ALPHA * observed + (1 - RATE_ALPHA) * new_per_hour if new_per_hour else observed
+    target = 3600 / rate if rate > 0 else interval * 2
+    target = min(max(target, interval / 2), interval * 2)
+    return int(min(max(target, settings.feed_min_interval), settings.feed_max_interval)), rate
+
+def count_new(items: List[Dict[str, Any]], seen_urls: Optional[List[str]], last_seen_published: Optional[str]) -> int:
+    """Entries that were not in the previous poll.
+
+    Compared by url, so feeds without dates count too; subscriptions polled before
+    urls were recorded fall back to comparing 'published' strings.
+    """
+    if seen_urls is not None:
+        seen = set(seen_urls)
+        return sum(1 for i in items if i.get("url") and i["url"] not in seen)
+    newest = last_seen_published or ""
+    return sum(1 for i in items if (i.get("published") or "") > newest)
+
+async def _poll(now: datetime, limit: int) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        subs = crud_feeds.due_subscriptions(db, now, limit=limit)
+        if not subs:
+            return {"status": "idle", "polled": 0, "created": 0, "feeds": []}
+
+        # several owners may follow one url: fetch it once
+        urls = sorted({s.url for s in subs})
+        results = {r["url"]: r for r in await fetch_feeds(urls, limit=POLL_ENTRY_LIMIT)}
+
+        rows: List[Dict[str, Any]] = []
+        report: List[Dict[str, Any]] = []
+        for sub in subs:
+            res = results[sub.url]
+            new_count = 0
+            if res["status"] == "ok":
+                items = res["items"]
+                if sub.last_polled_at is not None:
+                    # the first poll only establishes the baseline
+                    seen_urls = json.loads(sub.seen_urls_json) if sub.seen_urls_json else None
+                    new_count = count_new(items, seen_urls, sub.last_seen_published)
+                sub.seen_urls_json = json.dumps([i["url"] for i in items if i.get("url")])
+                newest = max((i.get("published") or "" for i in items), default="")
+                if newest > (sub.last_seen_published or ""):
+                    sub.last_seen_published = newest
+                matcher = get_matcher(crud_feeds.subscription_keywords(sub))
+                for i in items:
+                    if i.get("url") and (matcher is None or matcher.match(f"{i['title']} {i['summary']}") is not None):
+                        rows.append(i)
+                sub.last_status = f"ok:{res['cache']}"
+            else:
+                sub.last_status = f"{res['status']}:{res['error']}"[:128]
+
+            last = utc_naive(sub.last_polled_at)
+            if last is not None:
+                sub.interval_seconds, sub.new_per_hour = next_interval(
+                    sub.interval_seconds, sub.new_per_hour or 0.0, new_count, (now - last).total_seconds()
+                )
+            sub.last_polled_at = now
+            sub.next_poll_at = now + timedelta(seconds=sub.interval_seconds)
+            db.add(sub)
+            report.append({
+                "id": sub.id, "url": sub.url, "status": sub.last_status,
+                "new": new_count, "interval_seconds": sub.interval_seconds,
+            })
+        db.commit()
+
+        # skip stories we already hold under another url, then one bulk insert
+        fresh = list(dedup.annotate_items(rows, "skip"))
+        created, _ = crud.bulk_upsert_articles(db, [
+            {"title": i["title"], "summary": i["summary"], "url": i["url"],
+             "published": i.get("published"), "source": i.get("source")}
+            for i in fresh
+        ])
+        for i in fresh:
+            if i["url"] in created:
+                dedup.remember_article(i["url"], i["title"], i["summary"])
+        return {"status": "ok", "polled": len(subs), "created": len(created), "feeds": report}
+    finally:
+        db.close()
+
+def poll_due_feeds(now: Optional[datetime] = None, limit: int = 100) -> Dict[str, Any]:
+    """Poll every subscription whose next_poll_at has passed and store new entries.
+
+    Runs its own event loop, so call it from a worker thread (APScheduler job or
+    a sync route), never from inside a running loop.
+    """
+    now = utc_naive(now) or datetime.utcnow()
+    return asyncio.run(_poll(now, limit))
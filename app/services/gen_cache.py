@@ -0,0 +1,120 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.config import settings
+
+def cache_key(model: str, inputs: Any, params: Optional[Dict[str, Any]]) -> str:
+    """Content address of one generation: sha256 over (model, prompt, params)."""
+    blob = json.dumps({"model": model, "inputs": inputs, "params": params or {}}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class GenerationCache:
+    """Two-tier cache for HF generations: in-memory LRU in front of a SQLite table.
+
+    Entries expire after ttl seconds in both tiers. The SQLite tier is trimmed to
+    max_rows by least-recent access; the memory tier holds at most memory_items.
+    """
+
+    def __init__(self, path: str, ttl: float, memory_items: int, max_rows: int):
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.max_rows = max_rows
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_generations_accessed ON generations (accessed_at)")
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._mem[key] = (value, expires_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_items:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit and hit[1] > now:
+                self._mem.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return hit[0]
+            if hit:
+                del self._mem[key]
+            row = self._db.execute("SELECT value, expires_at FROM generations WHERE key = ?", (key,)).fetchone()
+            if row and row[1] > now:
+                self._db.execute("UPDATE generations SET accessed_at = ? WHERE key = ?", (now, key))
+                self._remember(key, row[0], row[1])
+                self._stats["disk_hits"] += 1
+                return row[0]
+            if row:
+                self._db.execute("DELETE FROM generations WHERE key = ?", (key,))
+                self._stats["evictions"] += 1
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._db.execute(
+                "INSERT OR REPLACE INTO generations (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            self._stats["writes"] += 1
+            # amortised trim: only every 100 writes
+            if self._stats["writes"] % 100 == 0:
+                self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        expired = self._db.execute("DELETE FROM generations WHERE expires_at <= ?", (now,)).rowcount
+        over = self._db.execute("SELECT COUNT(*) FROM generations").fetchone()[0] - self.max_rows
+        if over > 0:
+            self._db.execute(
+                "DELETE FROM generations WHERE key IN (SELECT key FROM generations ORDER BY accessed_at LIMIT ?)",
+                (over,),
+            )
+        self._stats["evictions"] += max(expired, 0) + max(over, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._db.execute("DELETE FROM generations")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["memory_items"] = len(self._mem)
+            out["disk_rows"] = self._db.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["hit_ratio"] = round((out["memory_hits"] + out["disk_hits"]) / lookups, 3) if lookups else None
+        return out
+
+_cache: Optional[GenerationCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[GenerationCache]:
+    """Process-wide cache, or None when GEN_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.gen_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GenerationCache(
+                    settings.gen_cache_path,
+                    ttl=settings.gen_cache_ttl,
+                    memory_items=settings.gen_cache_memory_items,
+                    max_rows=settings.gen_cache_max_rows,
+                )
+    return _cache
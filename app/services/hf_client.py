@@ -1,37 +1,339 @@
-﻿import httpx
-from typing import Optional, Dict, Any
+﻿import asyncio
+import json
+import threading
+import time
+import httpx
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, AsyncIterator
 from app.config import settings
+from app.services.gen_cache import cache_key, get_cache
+from app.services.rate_limit import BucketRegistry, retry_after_seconds
+
+HF_API_BASE = "https://api-inference.huggingface.co/models"
+
+# --- shared connection pools -------------------------------------------------
+# One sync and one async httpx client per process, so every generation reuses
+# keep-alive (and optionally HTTP/2) connections instead of a fresh TLS handshake.
+
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_pool_lock = threading.Lock()
+_stats: Dict[str, int] = {"requests": 0, "connections_opened": 0, "loading_waits": 0, "rate_limited": 0, "throttled": 0}
+_stats_lock = threading.Lock()
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+def _trace(event: str, info: Dict[str, Any]) -> None:
+    # httpcore trace hook: fires once per new TCP connection
+    if event == "connection.connect_tcp.complete":
+        _count("connections_opened")
+
+async def _atrace(event: str, info: Dict[str, Any]) -> None:
+    _trace(event, info)
+
+@lru_cache(maxsize=1)
+def _http2_enabled() -> bool:
+    if not settings.hf_http2:
+        return False
+    try:
+        import h2  # noqa: F401  (optional: pip install httpx[http2])
+        return True
+    except ImportError:
+        print("[hf_client] HF_HTTP2 set but 'h2' is not installed; using HTTP/1.1", flush=True)
+        return False
+
+def _client_kwargs() -> Dict[str, Any]:
+    return {
+        "timeout": httpx.Timeout(settings.hf_timeout, connect=10.0),
+        "limits": httpx.Limits(
+            max_connections=settings.hf_max_connections,
+            max_keepalive_connections=settings.hf_max_keepalive,
+            keepalive_expiry=settings.hf_keepalive_expiry,
+        ),
+        "http2": _http2_enabled(),
+    }
+
+def get_http_client() -> httpx.Client:
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        with _pool_lock:
+            if _sync_client is None or _sync_client.is_closed:
+                _sync_client = httpx.Client(**_client_kwargs())
+    return _sync_client
+
+def get_async_http_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        with _pool_lock:
+            if _async_client is None or _async_client.is_closed:
+                _async_client = httpx.AsyncClient(**_client_kwargs())
+    return _async_client
+
+def new_async_http_client() -> httpx.AsyncClient:
+    """A separate async pool for an event loop other than the app's (connections are loop-bound)."""
+    return httpx.AsyncClient(**_client_kwargs())
+
+async def close_http_clients() -> None:
+    """Close both shared pools (called from the app's shutdown hook)."""
+    global _sync_client, _async_client
+    with _pool_lock:
+        sync_c, async_c = _sync_client, _async_client
+        _sync_client = _async_client = None
+    if sync_c is not None:
+        sync_c.close()
+    if async_c is not None:
+        await async_c.aclose()
+
+def pool_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        out: Dict[str, Any] = dict(_stats)
+    reused = out["requests"] - out["connections_opened"]
+    out["reused_requests"] = max(reused, 0)
+    out["reuse_ratio"] = round(out["reused_requests"] / out["requests"], 3) if out["requests"] else None
+    out["http2"] = _http2_enabled()
+    return out
+
+# --- clients -------------------------------------------------------------------
+
+def _parse_generation(data: Any) -> str:
+    # Handle common response shapes
+    if isinstance(data, list) and data:
+        if isinstance(data[0], dict):
+            if "generated_text" in data[0]:
+                return data[0]["generated_text"]
+            if "summary_text" in data[0]:
+                return data[0]["summary_text"]
+    if isinstance(data, dict):
+        if "generated_text" in data:
+            return data["generated_text"]
+        if "summary_text" in data:
+            return data["summary_text"]
+    return str(data)
+
+def _parse_batch(data: Any, n: int) -> List[str]:
+    # list inputs come back as one entry per input (a dict, or a list of dicts)
+    if not isinstance(data, list) or len(data) != n:
+        raise RuntimeError(f"HuggingFace API returned {type(data).__name__} for a batch of {n} inputs")
+    return [_parse_generation(d) for d in data]
+
+def _auth_headers(api_token: Optional[str]) -> Dict[str, str]:
+    token = api_token or settings.hf_api_token
+    if not token:
+        raise RuntimeError("HF_API_TOKEN is not set. Put it in .env or set it in the environment.")
+    return {"Authorization": f"Bearer {token}"}
+
+def _payload(inputs: Any, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {"inputs": inputs}
+    if params:
+        payload.update({"parameters": params})
+    return payload
+
+# --- loading / rate limits ------------------------------------------------------
+# Client-side token bucket per model keeps us under quota; 503 "model is loading"
+# and 429 answers are retried after the server's estimate (bounded by HF_MAX_WAIT).
+
+_buckets = BucketRegistry(settings.hf_rate_per_minute / 60.0, settings.hf_burst)
+
+def _throttle_wait(model: str) -> float:
+    wait = _buckets.get(model).reserve()
+    if wait > 0:
+        _count("throttled")
+    return wait
+
+def _retry_delay(r: httpx.Response, model: str, attempt: int, waited: float) -> Optional[float]:
+    """Seconds to wait before retrying a loading (503) or rate-limited (429) answer; None to give up."""
+    if r.status_code == 503:
+        try:
+            body = r.json()
+        except ValueError:
+            return None
+        if not isinstance(body, dict) or ("estimated_time" not in body and "loading" not in str(body.get("error", "")).lower()):
+            return None
+        delay = float(body.get("estimated_time") or 5.0)
+        kind = "loading_waits"
+    elif r.status_code == 429:
+        delay = retry_after_seconds(r.headers)
+        if delay is None:
+            delay = min(2.0 ** attempt, 30.0)
+        _buckets.get(model).penalize(delay)  # slow down every caller of this model
+        kind = "rate_limited"
+    else:
+        return None
+    remaining = settings.hf_max_wait - waited
+    if remaining <= 0:
+        return None
+    _count(kind)
+    return max(0.1, min(delay, remaining))
+
+def _raise_for_status(r: httpx.Response) -> None:
+    try:
+        r.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        detail = r.text[:500]
+        raise RuntimeError(f"HuggingFace API error {r.status_code}: {detail}") from e
 
 class HFClient:
-    def __init__(self, api_token: Optional[str] = None, timeout: float = 60.0):
-        self.api_token = api_token or settings.hf_api_token
-        if not self.api_token:
-            raise RuntimeError("HF_API_TOKEN is not set. Put it in .env or set it in the environment.")
-        self.headers = {"Authorization": f"Bearer {self.api_token}"}
-        self.client = httpx.Client(timeout=timeout)
-
-    def text_generation(self, model: str, inputs: str, params: Optional[Dict[str, Any]] = None) -> str:
-        url = f"https://api-inference.huggingface.co/models/{model}"
-        payload = {"inputs": inputs}
-        if params:
-            payload.update({"parameters": params})
-        r = self.client.post(url, headers=self.headers, json=payload)
+    def __init__(self, api_token: Optional[str] = None, timeout: Optional[float] = None, client: Optional[httpx.Client] = None):
+        self.headers = _auth_headers(api_token)
+        # per-instance timeout override; the connection pool itself is shared
+        self.timeout = timeout
+        self.client = client or get_http_client()
+
+    def text_generation(
+        self, model: str, inputs: str, params: Optional[Dict[str, Any]] = None, use_cache: bool = True,
+    ) -> str:
+        """Run one generation. use_cache=False skips the cache lookup but still stores the fresh result."""
+        cache = get_cache()
+        key = cache_key(model, inputs, params)
+        if cache is not None and use_cache:
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        out = _parse_generation(self._post(model, inputs, params))
+        if cache is not None:
+            cache.set(key, out)
+        return out
+
+    def text_generation_batch(
+        self, model: str, inputs: List[str], params: Optional[Dict[str, Any]] = None, use_cache: bool = True,
+    ) -> List[str]:
+        """Run several inputs with the same params as one request (HF accepts a list of inputs)."""
+        cache = get_cache()
+        keys = [cache_key(model, i, params) for i in inputs]
+        results: List[Optional[str]] = [None] * len(inputs)
+        if cache is not None and use_cache:
+            results = [cache.get(k) for k in keys]
+        todo = [i for i, r in enumerate(results) if r is None]
+        if len(todo) == 1:
+            fresh = [_parse_generation(self._post(model, inputs[todo[0]], params))]
+        elif todo:
+            fresh = _parse_batch(self._post(model, [inputs[i] for i in todo], params), len(todo))
+        else:
+            fresh = []
+        for i, out in zip(todo, fresh):
+            results[i] = out
+            if cache is not None:
+                cache.set(keys[i], out)
+        return results  # type: ignore[return-value]
+
+    def _post(self, model: str, inputs: Any, params: Optional[Dict[str, Any]]) -> Any:
+        url = f"{HF_API_BASE}/{model}"
+        waited, attempt = 0.0, 0
+        while True:
+            time.sleep(_throttle_wait(model))
+            _count("requests")
+            r = self.client.post(
+                url, headers=self.headers, json=_payload(inputs, params),
+                timeout=self.timeout or httpx.USE_CLIENT_DEFAULT, extensions={"trace": _trace},
+            )
+            delay = _retry_delay(r, model, attempt, waited)
+            if delay is None:
+                break
+            time.sleep(delay)
+            waited, attempt = waited + delay, attempt + 1
+        _raise_for_status(r)
+        return r.json()
+
+class AsyncHFClient:
+    def __init__(self, api_token: Optional[str] = None, timeout: Optional[float] = None, client: Optional[httpx.AsyncClient] = None):
+        self.headers = _auth_headers(api_token)
+        self.timeout = timeout
+        self.client = client or get_async_http_client()
+
+    async def text_generation(
+        self, model: str, inputs: str, params: Optional[Dict[str, Any]] = None, use_cache: bool = True,
+    ) -> str:
+        # cache tiers are local (memory / SQLite file): cheap enough to call inline
+        cache = get_cache()
+        key = cache_key(model, inputs, params)
+        if cache is not None and use_cache:
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        out = _parse_generation(await self._post(model, inputs, params))
+        if cache is not None:
+            cache.set(key, out)
+        return out
+
+    async def _post(self, model: str, inputs: Any, params: Optional[Dict[str, Any]]) -> Any:
+        url = f"{HF_API_BASE}/{model}"
+        waited, attempt = 0.0, 0
+        while True:
+            await asyncio.sleep(_throttle_wait(model))
+            _count("requests")
+            r = await self.client.post(
+                url, headers=self.headers, json=_payload(inputs, params),
+                timeout=self.timeout or httpx.USE_CLIENT_DEFAULT, extensions={"trace": _atrace},
+            )
+            delay = _retry_delay(r, model, attempt, waited)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            waited, attempt = waited + delay, attempt + 1
+        _raise_for_status(r)
+        return r.json()
+
+    async def stream_generation(
+        self, model: str, inputs: str, params: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        """Yield generated text pieces as the API streams them ("stream": true, SSE).
+
+        Models/tasks without streaming answer with plain JSON; that answer is
+        yielded as a single piece, so callers need no separate fallback path.
+        """
+        url = f"{HF_API_BASE}/{model}"
+        payload = {**_payload(inputs, params), "stream": True}
+        waited, attempt = 0.0, 0
+        while True:
+            await asyncio.sleep(_throttle_wait(model))
+            _count("requests")
+            async with self.client.stream(
+                "POST", url, headers=self.headers, json=payload,
+                timeout=self.timeout or httpx.USE_CLIENT_DEFAULT, extensions={"trace": _atrace},
+            ) as r:
+                if r.status_code >= 400:
+                    await r.aread()
+                    delay = _retry_delay(r, model, attempt, waited)
+                    if delay is None:
+                        _raise_for_status(r)
+                else:
+                    if not r.headers.get("content-type", "").startswith("text/event-stream"):
+                        yield _parse_generation(json.loads(await r.aread()))
+                        return
+                    async for line in r.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = json.loads(line[5:].strip())
+                        if data.get("error"):
+                            raise RuntimeError(f"HuggingFace stream error: {data['error']}")
+                        token = data.get("token") or {}
+                        if token.get("text") and not token.get("special"):
+                            yield token["text"]
+                    return
+            # loading / rate limited before the first byte: wait and retry
+            await asyncio.sleep(delay)
+            waited, attempt = waited + delay, attempt + 1
+
+# --- warmup ----------------------------------------------------------------------
+
+def warmup_models(models: List[str]) -> None:
+    """Send a tiny request to each model so cold ones start loading before real traffic."""
+    hf = HFClient()
+    for model in models:
+        started = time.perf_counter()
         try:
-            r.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            detail = r.text[:500]
-            raise RuntimeError(f"HuggingFace API error {r.status_code}: {detail}") from e
-        data = r.json()
-        # Handle common response shapes
-        if isinstance(data, list) and data:
-            if isinstance(data[0], dict):
-                if "generated_text" in data[0]:
-                    return data[0]["generated_text"]
-                if "summary_text" in data[0]:
-                    return data[0]["summary_text"]
-        if isinstance(data, dict):
-            if "generated_text" in data:
-                return data["generated_text"]
-            if "summary_text" in data:
-                return data["summary_text"]
-        return str(data)
+            hf._post(model, "Hello.", None)
+            print(f"[hf_client] warmed up {model} in {time.perf_counter() - started:.1f}s", flush=True)
+        except Exception as e:
+            print(f"[hf_client] warmup of {model} failed: {e}", flush=True)
+
+def start_warmup() -> Optional[threading.Thread]:
+    """Warm HF_WARMUP_MODELS in a daemon thread (startup must not block on model loading)."""
+    models = [m.strip() for m in settings.hf_warmup_models.split(",") if m.strip()]
+    if not models or not settings.hf_api_token:
+        return None
+    t = threading.Thread(target=warmup_models, args=(models,), name="hf-warmup", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,100 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WS = re.compile(r"\s+")
+
+def _normalize(term: str) -> str:
+    return _WS.sub(" ", term.strip().strip('"').strip()).lower()
+
+def parse_keywords(keywords: Optional[Iterable[str]]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Split a keyword list into (include, exclude) terms.
+
+    '-term' excludes, quotes are optional around phrases ('"machine learning"').
+    Terms are lowercased with whitespace collapsed, de-duplicated and sorted so
+    equivalent lists share one compiled matcher.
+    """
+    include, exclude = set(), set()
+    for raw in keywords or []:
+        if not raw or not raw.strip():
+            continue
+        raw = raw.strip()
+        target = include
+        if raw.startswith("-") and len(raw) > 1:
+            target, raw = exclude, raw[1:]
+        term = _normalize(raw)
+        if term:
+            target.add(term)
+    return tuple(sorted(include)), tuple(sorted(exclude))
+
+def _trie_regex(terms: Iterable[str]) -> str:
+    # Prefix-factored alternation: hundreds of terms share branches, so the
+    # regex engine walks a trie instead of trying every keyword in turn.
+    trie: Dict[str, dict] = {}
+    for t in terms:
+        node = trie
+        for ch in t:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        end = "" in node
+        alts = [(r"\s+" if ch == " " else re.escape(ch)) + build(node[ch]) for ch in sorted(k for k in node if k)]
+        if not alts:
+            return ""
+        if end:
+            return "(?:" + "|".join(alts) + ")?"
+        if len(alts) == 1:
+            return alts[0]
+        return "(?:" + "|".join(alts) + ")"
+
+    return build(trie)
+
+def _compile(terms: Tuple[str, ...], whole_words: bool) -> Optional[re.Pattern]:
+    if not terms:
+        return None
+    pattern = _trie_regex(terms)
+    if whole_words:
+        pattern = r"(?<!\w)(?:" + pattern + r")(?!\w)"
+    return re.compile(pattern, re.IGNORECASE)
+
+class KeywordMatcher:
+    """Include/exclude keyword filter compiled into one regex per side."""
+
+    def __init__(self, include: Tuple[str, ...], exclude: Tuple[str, ...], whole_words: bool = False):
+        self.include = include
+        self.exclude = exclude
+        self.whole_words = whole_words
+        self._include_re = _compile(include, whole_words)
+        self._exclude_re = _compile(exclude, whole_words)
+
+    def _hits(self, regex: Optional[re.Pattern], text: str) -> List[str]:
+        if regex is None:
+            return []
+        seen: Dict[str, None] = {}
+        for m in regex.finditer(text):
+            seen.setdefault(_WS.sub(" ", m.group(0)).lower(), None)
+        return list(seen)
+
+    def match(self, text: str) -> Optional[List[str]]:
+        """Return the include terms found in text, or None if the text is rejected.
+
+        An exclude hit always rejects; with no include terms, anything not excluded passes.
+        """
+        if self._exclude_re is not None and self._exclude_re.search(text):
+            return None
+        if self._include_re is None:
+            return []
+        hits = self._hits(self._include_re, text)
+        return hits or None
+
+@lru_cache(maxsize=256)
+def _cached_matcher(include: Tuple[str, ...], exclude: Tuple[str, ...], whole_words: bool) -> KeywordMatcher:
+    return KeywordMatcher(include, exclude, whole_words)
+
+def get_matcher(keywords: Optional[Iterable[str]], whole_words: bool = False) -> Optional[KeywordMatcher]:
+    """Return a (cached) matcher for a keyword list, or None if the list is empty."""
+    include, exclude = parse_keywords(keywords)
+    if not include and not exclude:
+        return None
+    return _cached_matcher(include, exclude, whole_words)
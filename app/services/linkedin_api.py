@@ -1,9 +1,12 @@
 ﻿# app/services/linkedin_api.py
+import asyncio
 import httpx
+import threading
 import time
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional, AsyncIterator, Callable
 from urllib.parse import urlencode, quote
 from app.config import settings
+from app.services.linkedin_retry import engine as retry_engine, member_key
 import os
 
 # Verbose logging flag (dev only)
@@ -15,145 +18,221 @@ UGC_URL   = "https://api.linkedin.com/v2/ugcPosts"
 
 USERINFO_URL = "https://www.linkedin.com/oauth/openid/connect/userinfo"
 ME_URL = "https://api.linkedin.com/v2/me"
+REGISTER_UPLOAD_URL = "https://api.linkedin.com/v2/assets?action=registerUpload"
+ASSETS_URL = "https://api.linkedin.com/v2/assets"
 
-def get_person_id(access_token: str) -> str:
-    """Return the person id from /v2/me, or '' on failure."""
-    try:
-        with httpx.Client(timeout=httpx.Timeout(30, connect=5)) as c:
-            r = c.get(
-                ME_URL,
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"projection": "(id)"}
-            )
-            if r.status_code != 200:
-                log_request_id(r)
-                try:
-                    print("[get_person_id] fail:", r.status_code, r.text, flush=True)
-                except Exception:
-                    pass
-                return ""
-            data = r.json()
-            return str(data.get("id", "")) or ""
-    except Exception as e:
-        print(f"[get_person_id] error: {e}", flush=True)
-        return ""
+RESTLI_HEADERS = {"Content-Type": "application/json", "X-Restli-Protocol-Version": "2.0.0"}
+
+def _client_kwargs() -> Dict[str, Any]:
+    return {
+        "timeout": httpx.Timeout(settings.linkedin_timeout, connect=5),
+        "limits": httpx.Limits(
+            max_connections=settings.linkedin_max_connections,
+            max_keepalive_connections=settings.linkedin_max_connections,
+        ),
+        "headers": {"User-Agent": "LinkedIn-SaaS/1.0"},
+    }
+
+class LinkedInClient:
+    """Pooled HTTP client for every LinkedIn call (API, OAuth and media upload hosts).
+
+    One keep-alive pool per process saves a DNS lookup + TLS handshake per call.
+    Methods return the raw httpx.Response; the module-level helpers below keep
+    their historical return shapes on top of it. Every call goes through the
+    shared retry engine (backoff, Retry-After, per-app/per-member budgets).
+    The member budget is keyed on `member` (the author URN) when the caller
+    knows it, else on a hash of the token.
+    """
+
+    def __init__(self, client: Optional[httpx.Client] = None):
+        self.client = client or httpx.Client(**_client_kwargs())
+
+    @staticmethod
+    def auth(access_token: str, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {access_token}", **(extra or {})}
+
+    def request(self, method: str, url: str, member: Optional[str] = None, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        return retry_engine.send(self.client, method, url, member=member, idempotent=idempotent, **kwargs)
+
+    def me(self, access_token: str, projection: Optional[str] = "(id)") -> httpx.Response:
+        params = {"projection": projection} if projection else None
+        return self.request("GET", ME_URL, member=member_key(access_token), headers=self.auth(access_token), params=params, timeout=30)
+
+    def userinfo(self, access_token: str) -> httpx.Response:
+        return self.request("GET", USERINFO_URL, member=member_key(access_token), headers=self.auth(access_token))
+
+    def ugc_post(self, access_token: str, payload: Dict[str, Any], member: Optional[str] = None) -> httpx.Response:
+        return self.request("POST", UGC_URL, member=member or member_key(access_token), headers=self.auth(access_token, RESTLI_HEADERS), json=payload)
+
+    def register_upload(self, access_token: str, payload: Dict[str, Any], member: Optional[str] = None) -> httpx.Response:
+        return self.request(
+            "POST", REGISTER_UPLOAD_URL, member=member or member_key(access_token),
+            headers=self.auth(access_token, {"Content-Type": "application/json"}), json=payload,
+        )
+
+    def upload(self, upload_url: str, data: bytes) -> httpx.Response:
+        return self.request("PUT", upload_url, headers={"Content-Type": "application/octet-stream"}, content=data)
+
+    def close(self) -> None:
+        self.client.close()
+
+_client: Optional[LinkedInClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> LinkedInClient:
+    global _client
+    if _client is None or _client.client.is_closed:
+        with _client_lock:
+            if _client is None or _client.client.is_closed:
+                _client = LinkedInClient()
+    return _client
+
+def close_client() -> None:
+    """Close the shared pool (app shutdown)."""
+    global _client
+    with _client_lock:
+        c, _client = _client, None
+    if c is not None:
+        c.close()
+
+class AsyncLinkedInClient:
+    """Async twin of LinkedInClient for the publish routes; a request waiting on
+    LinkedIn costs a coroutine instead of a threadpool slot."""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client or httpx.AsyncClient(**_client_kwargs())
+
+    auth = staticmethod(LinkedInClient.auth)
+
+    async def request(self, method: str, url: str, member: Optional[str] = None, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        return await retry_engine.send_async(self.client, method, url, member=member, idempotent=idempotent, **kwargs)
+
+    async def userinfo(self, access_token: str) -> httpx.Response:
+        return await self.request("GET", USERINFO_URL, member=member_key(access_token), headers=self.auth(access_token))
+
+    async def ugc_post(self, access_token: str, payload: Dict[str, Any], member: Optional[str] = None) -> httpx.Response:
+        return await self.request("POST", UGC_URL, member=member or member_key(access_token), headers=self.auth(access_token, RESTLI_HEADERS), json=payload)
+
+    async def register_upload(self, access_token: str, payload: Dict[str, Any], member: Optional[str] = None) -> httpx.Response:
+        return await self.request(
+            "POST", REGISTER_UPLOAD_URL, member=member or member_key(access_token),
+            headers=self.auth(access_token, {"Content-Type": "application/json"}), json=payload,
+        )
+
+    async def asset(self, access_token: str, asset_urn: str, member: Optional[str] = None) -> httpx.Response:
+        asset_id = asset_urn.rsplit(":", 1)[-1]
+        return await self.request("GET", f"{ASSETS_URL}/{asset_id}", member=member or member_key(access_token), headers=self.auth(access_token))
+
+    async def upload(self, upload_url: str, data: bytes) -> httpx.Response:
+        return await self.request("PUT", upload_url, headers={"Content-Type": "application/octet-stream"}, content=data)
+
+    async def upload_stream(self, upload_url: str, chunks: AsyncIterator[bytes], length: Optional[int] = None) -> httpx.Response:
+        headers = {"Content-Type": "application/octet-stream"}
+        if length is not None:
+            headers["Content-Length"] = str(length)  # otherwise sent chunked
+        # a consumed stream cannot be replayed, so this skips the retry engine
+        return await self.client.put(upload_url, headers=headers, content=chunks)
 
+    async def download(self, url: str) -> bytes:
+        r = await self.client.get(url, follow_redirects=True)
+        r.raise_for_status()
+        return r.content
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+_async_client: Optional[AsyncLinkedInClient] = None
+
+def get_async_client() -> AsyncLinkedInClient:
+    global _async_client
+    if _async_client is None or _async_client.client.is_closed:
+        with _client_lock:
+            if _async_client is None or _async_client.client.is_closed:
+                _async_client = AsyncLinkedInClient()
+    return _async_client
+
+async def close_async_client() -> None:
+    global _async_client
+    with _client_lock:
+        c, _async_client = _async_client, None
+    if c is not None:
+        await c.close()
 
 def get_person_id_with_response(access_token: str) -> tuple:
-    """Return (person_id, status_code, text). person_id is '' on failure."""
+    """Return (person_id, status_code, text) from /v2/me. person_id is '' on failure."""
     try:
-        with httpx.Client(timeout=httpx.Timeout(30, connect=5)) as c:
-            r = c.get(
-                ME_URL,
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"projection": "(id)"}
-            )
-            status = r.status_code
-            text = r.text
-            if status != 200:
-                log_request_id(r)
-                try:
-                    print("[get_person_id_with_response] fail:", status, text, flush=True)
-                except Exception:
-                    pass
-                return "", status, text
-            data = r.json()
-            return str(data.get("id", "")) or "", status, text
+        r = get_client().me(access_token)
+        status, text = r.status_code, r.text
+        if status != 200:
+            log_request_id(r)
+            print("[get_person_id] fail:", status, text, flush=True)
+            return "", status, text
+        # LinkedIn returns {"id": "123456789"} (string of digits)
+        return str(r.json().get("id", "")) or "", status, text
     except Exception as e:
-        print(f"[get_person_id_with_response] error: {e}", flush=True)
+        print(f"[get_person_id] error: {e}", flush=True)
         return "", 0, str(e)
 
+def get_person_id(access_token: str) -> str:
+    """Return the person id from /v2/me, or '' on failure."""
+    return get_person_id_with_response(access_token)[0]
+
+# kept for older callers
+me_id = get_person_id
 
 def get_me_raw(access_token: str) -> dict:
     """Return LinkedIn /v2/me raw response: {status, headers, text, json (if parseable)}"""
     try:
-        with httpx.Client(timeout=httpx.Timeout(30, connect=5)) as c:
-            r = c.get(ME_URL, headers={"Authorization": f"Bearer {access_token}"})
-            log_request_id(r)
-            out = {
-                "status": r.status_code,
-                "headers": {k: v for k, v in r.headers.items()},
-                "text": r.text,
-                "json": None,
-            }
-            try:
-                out["json"] = r.json()
-            except Exception:
-                out["json"] = None
-            return out
+        r = get_client().me(access_token, projection=None)
+        log_request_id(r)
+        out = {
+            "status": r.status_code,
+            "headers": {k: v for k, v in r.headers.items()},
+            "text": r.text,
+            "json": None,
+        }
+        try:
+            out["json"] = r.json()
+        except Exception:
+            out["json"] = None
+        return out
     except Exception as e:
         print(f"[get_me_raw] error: {e}", flush=True)
         return {"status": 0, "headers": {}, "text": str(e), "json": None}
 
-def me_id(access_token: str) -> str:
-    """Return the person id from /v2/me, or '' on failure."""
-    try:
-        with httpx.Client(timeout=httpx.Timeout(30, connect=5)) as c:
-            r = c.get(
-                ME_URL,
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"projection": "(id)"}
-            )
-            if r.status_code != 200:
-                log_request_id(r)
-                try:
-                    print("[me_id] fail:", r.status_code, r.text, flush=True)
-                except Exception:
-                    pass
-                return ""
-            data = r.json()
-            # LinkedIn returns {"id": "123456789"} (string of digits)
-            return str(data.get("id", "")) or ""
-    except Exception as e:
-        print(f"[me_id] error: {e}", flush=True)
-        return ""
-
 def userinfo_sub(access_token: str) -> str:
     try:
-        with httpx.Client(timeout=60) as c:
-            r = c.get(USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"})
-            if r.status_code != 200:
-                print(f"[userinfo_sub] non-200: {r.status_code} {r.text}", flush=True)
-                return ""
-            data = r.json()
-            sub = data.get("sub", "")
-            if not sub:
-                print(f"[userinfo_sub] no 'sub' in payload: {data}", flush=True)
-            return sub
+        r = get_client().userinfo(access_token)
+        if r.status_code != 200:
+            print(f"[userinfo_sub] non-200: {r.status_code} {r.text}", flush=True)
+            return ""
+        data = r.json()
+        sub = data.get("sub", "")
+        if not sub:
+            print(f"[userinfo_sub] no 'sub' in payload: {data}", flush=True)
+        return sub
     except Exception as e:
         print(f"[userinfo_sub] error: {e}", flush=True)
         return ""
 
 # Create an article share (OG link)
-def post_article_share(access_token: str, author_urn: str, url: str, text: str = "") -> tuple:
-    payload = {
+def ugc_payload(author_urn: str, text: str, category: str = "NONE", media: Optional[list] = None) -> Dict[str, Any]:
+    """Body for POST /v2/ugcPosts (shared by the sync and async publish paths)."""
+    content: Dict[str, Any] = {
+        "shareCommentary": {"text": text},
+        "shareMediaCategory": category,
+    }
+    if media:
+        content["media"] = media
+    return {
         "author": author_urn,
         "lifecycleState": "PUBLISHED",
-        "specificContent": {
-            "com.linkedin.ugc.ShareContent": {
-                "shareCommentary": {"text": text},
-                "shareMediaCategory": "ARTICLE",
-                "media": [{"status": "READY", "originalUrl": url}]
-            }
-        },
+        "specificContent": {"com.linkedin.ugc.ShareContent": content},
         "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
     }
-    with httpx.Client(timeout=60) as c:
-        r = c.post(
-            UGC_URL,
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json",
-                "X-Restli-Protocol-Version": "2.0.0",
-            },
-            json=payload,
-        )
-        return r.status_code in (201, 202), r
 
-# Register image upload
-def register_image_upload(access_token: str, author_urn: str) -> dict:
-    register_url = "https://api.linkedin.com/v2/assets?action=registerUpload"
-    payload = {
+def register_upload_payload(author_urn: str) -> Dict[str, Any]:
+    return {
         "registerUploadRequest": {
             "owner": author_urn,
             "recipes": ["urn:li:digitalmediaRecipe:feedshare-image"],
@@ -163,67 +242,171 @@ def register_image_upload(access_token: str, author_urn: str) -> dict:
             }]
         }
     }
-    with httpx.Client(timeout=60) as c:
-        r = c.post(
-            register_url,
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json",
-            },
-            json=payload,
-        )
-        r.raise_for_status()
-        return r.json()
+
+def post_article_share(access_token: str, author_urn: str, url: str, text: str = "") -> tuple:
+    payload = ugc_payload(author_urn, text, "ARTICLE", [{"status": "READY", "originalUrl": url}])
+    r = get_client().ugc_post(access_token, payload, member=author_urn)
+    return r.status_code in (201, 202), r
+
+# Register image upload
+def register_image_upload(access_token: str, author_urn: str) -> dict:
+    r = get_client().register_upload(access_token, register_upload_payload(author_urn), member=author_urn)
+    r.raise_for_status()
+    return r.json()
 
 # Upload image asset
 def upload_image_asset(upload_url: str, image_bytes: bytes) -> bool:
-    headers = {"Content-Type": "application/octet-stream"}
-    with httpx.Client(timeout=60) as c:
-        r = c.put(upload_url, headers=headers, content=image_bytes)
-        return r.status_code in (201, 202)
+    r = get_client().upload(upload_url, image_bytes)
+    return r.status_code in (201, 202)
 
 # Create image share post
 def post_image_share(access_token: str, author_urn: str, asset_urn: str, text: str = "") -> tuple:
-    payload = {
-        "author": author_urn,
-        "lifecycleState": "PUBLISHED",
-        "specificContent": {
-            "com.linkedin.ugc.ShareContent": {
-                "shareCommentary": {"text": text},
-                "shareMediaCategory": "IMAGE",
-                "media": [{"status": "READY", "media": asset_urn}]
-            }
-        },
-        "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
-    }
-    with httpx.Client(timeout=60) as c:
-        r = c.post(
-            UGC_URL,
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json",
-                "X-Restli-Protocol-Version": "2.0.0",
-            },
-            json=payload,
-        )
-        return r.status_code in (201, 202), r
-# Exchange refresh_token for new access token
-def exchange_refresh_for_token(refresh_token: str) -> dict:
-    data = {
-        "grant_type": "refresh_token",
-        "refresh_token": refresh_token,
-        "client_id": settings.linkedin_client_id,
-        "client_secret": settings.linkedin_client_secret,
-    }
-    with httpx.Client(timeout=httpx.Timeout(30, connect=5)) as c:
-        r = c.post(
-            TOKEN_URL,
-            data=data,
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
-        r.raise_for_status()
-        return r.json()
+    payload = ugc_payload(author_urn, text, "IMAGE", [{"status": "READY", "media": asset_urn}])
+    r = get_client().ugc_post(access_token, payload, member=author_urn)
+    return r.status_code in (201, 202), r
+
+# --- async publish path (used by the /linkedin routes) ---
+async def userinfo_sub_async(access_token: str) -> str:
+    try:
+        r = await get_async_client().userinfo(access_token)
+        if r.status_code != 200:
+            print(f"[userinfo_sub] non-200: {r.status_code} {r.text}", flush=True)
+            return ""
+        return r.json().get("sub", "")
+    except Exception as e:
+        print(f"[userinfo_sub] error: {e}", flush=True)
+        return ""
+
+async def post_text_async(access_token: str, author_urn: str, text: str) -> Tuple[bool, Any]:
+    try:
+        r = await get_async_client().ugc_post(access_token, ugc_payload(author_urn, text), member=author_urn)
+        log_request_id(r)
+        if r.status_code in (201, 202):
+            return True, r
+        print("[post_text] error:", r.status_code, r.text, flush=True)
+        error_info = {"status": r.status_code, "body": r.text}
+        try:
+            err_json = r.json()
+            error_info["serviceErrorCode"] = err_json.get("serviceErrorCode")
+            error_info["message"] = err_json.get("message")
+        except Exception:
+            pass
+        return False, error_info
+    except Exception as e:
+        print("[post_text] error:", e, flush=True)
+        return False, {"exception": str(e)}
+
+async def post_article_share_async(access_token: str, author_urn: str, url: str, text: str = "") -> tuple:
+    payload = ugc_payload(author_urn, text, "ARTICLE", [{"status": "READY", "originalUrl": url}])
+    r = await get_async_client().ugc_post(access_token, payload, member=author_urn)
+    return r.status_code in (201, 202), r
+
+async def register_image_upload_async(access_token: str, author_urn: str) -> dict:
+    r = await get_async_client().register_upload(access_token, register_upload_payload(author_urn), member=author_urn)
+    r.raise_for_status()
+    return r.json()
+
+async def upload_image_asset_async(upload_url: str, image_bytes: bytes) -> bool:
+    r = await get_async_client().upload(upload_url, image_bytes)
+    return r.status_code in (201, 202)
+
+class ImageTooLarge(ValueError):
+    pass
+
+class ImageDownloadError(Exception):
+    pass
+
+def upload_target(reg: dict) -> Tuple[str, str]:
+    """(upload_url, asset_urn) from a registerUpload response."""
+    value = reg["value"]
+    return value["uploadMechanism"]["com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"]["uploadUrl"], value["asset"]
+
+async def iter_capped(chunks: AsyncIterator[bytes], limit: int,
+                      on_chunk: Optional[Callable[[bytes], None]] = None) -> AsyncIterator[bytes]:
+    """Pass chunks through (showing each to `on_chunk`, e.g. a hasher), raising ImageTooLarge past `limit` bytes."""
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > limit:
+            raise ImageTooLarge(f"image exceeds {limit} bytes")
+        if on_chunk is not None:
+            on_chunk(chunk)
+        yield chunk
 
+async def upload_image_stream_async(access_token: str, author_urn: str, chunks: AsyncIterator[bytes],
+                                    length: Optional[int] = None, reg_task: Optional[asyncio.Task] = None,
+                                    on_chunk: Optional[Callable[[bytes], None]] = None) -> str:
+    """Register an image asset and pipe `chunks` into its upload URL; returns the asset URN.
+
+    Pass an already-started registration as `reg_task` to overlap it with
+    whatever produces the chunks. Memory stays at one chunk however large the image.
+    """
+    limit = settings.linkedin_image_max_bytes
+    if length is not None and length > limit:
+        raise ImageTooLarge(f"image is {length} bytes; limit is {limit}")
+    if reg_task is None:
+        reg_task = asyncio.ensure_future(register_image_upload_async(access_token, author_urn))
+    upload_url, asset_urn = upload_target(await reg_task)
+    r = await get_async_client().upload_stream(upload_url, iter_capped(chunks, limit, on_chunk), length)
+    if r.status_code not in (200, 201, 202):
+        log_request_id(r)
+        raise httpx.HTTPStatusError(f"LinkedIn image upload failed ({r.status_code})", request=r.request, response=r)
+    return asset_urn
+
+async def upload_image_from_url_async(access_token: str, author_urn: str, image_url: str,
+                                      on_chunk: Optional[Callable[[bytes], None]] = None) -> str:
+    """Stream `image_url` straight into a LinkedIn upload; registration runs while the download starts."""
+    reg_task = asyncio.ensure_future(register_image_upload_async(access_token, author_urn))
+    try:
+        async with get_async_client().client.stream("GET", image_url, follow_redirects=True) as r:
+            if r.status_code != 200:
+                raise ImageDownloadError(f"image_url returned {r.status_code}")
+            declared = r.headers.get("content-length")
+            # only trust the length when the bytes arrive as sent (no content-encoding)
+            length = int(declared) if declared and declared.isdigit() and "content-encoding" not in r.headers else None
+            chunks = r.aiter_bytes(settings.linkedin_upload_chunk_size)
+            return await upload_image_stream_async(access_token, author_urn, chunks, length, reg_task, on_chunk)
+    finally:
+        if not reg_task.done():
+            reg_task.cancel()
+        elif not reg_task.cancelled():
+            reg_task.exception()  # mark retrieved; the download error is the one that matters
+
+async def post_image_share_async(access_token: str, author_urn: str, asset_urn: str, text: str = "") -> tuple:
+    return await post_images_share_async(access_token, author_urn, [asset_urn], text)
+
+async def post_images_share_async(access_token: str, author_urn: str, asset_urns: list, text: str = "") -> tuple:
+    """One UGC post carrying every asset (in order) as an image."""
+    payload = ugc_payload(author_urn, text, "IMAGE", [{"status": "READY", "media": a} for a in asset_urns])
+    r = await get_async_client().ugc_post(access_token, payload, member=author_urn)
+    return r.status_code in (201, 202), r
+
+class AssetNotReady(Exception):
+    pass
+
+async def asset_status_async(access_token: str, asset_urn: str, member: Optional[str] = None) -> Optional[str]:
+    """Processing status of an image asset (AVAILABLE, PROCESSING, ...); None if LinkedIn no longer has it."""
+    r = await get_async_client().asset(access_token, asset_urn, member=member)
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    recipes = r.json().get("recipes") or [{}]
+    return recipes[0].get("status") or ""
+
+async def wait_asset_ready_async(access_token: str, asset_urn: str, timeout: float, member: Optional[str] = None) -> None:
+    """Poll the asset until it is AVAILABLE; AssetNotReady on failure, disappearance or timeout."""
+    deadline = time.monotonic() + timeout
+    interval = 0.5
+    while True:
+        status = await asset_status_async(access_token, asset_urn, member)
+        if status == "AVAILABLE":
+            return
+        if status is None or status in ("PROCESSING_FAILED", "CLIENT_ERROR", "INCOMPLETE"):
+            raise AssetNotReady(f"{asset_urn} is {status or 'gone'}")
+        if time.monotonic() + interval > deadline:
+            raise AssetNotReady(f"{asset_urn} still {status} after {timeout:.0f}s")
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, 4.0)
 
 # Helper: log request id if present in LinkedIn response
 def log_request_id(resp):
@@ -231,31 +414,16 @@ def log_request_id(resp):
     if req_id:
         print(f"[LinkedIn] request id: {req_id}", flush=True)
 
-# Helper: retry logic for LinkedIn API
+# Helper: OAuth token calls; safe to repeat, so 5xx/timeouts are retried too
 def linkedin_request_with_retry(method, url, **kwargs):
-    max_attempts = 4
-    backoff = 2
-    for attempt in range(1, max_attempts + 1):
-        try:
-            with httpx.Client(timeout=httpx.Timeout(30, connect=5)) as c:
-                resp = c.request(method, url, **kwargs)
-            log_request_id(resp)
-            if resp.status_code in (429, 500, 502, 503, 504):
-                print(f"[LinkedIn] {url} attempt {attempt} got {resp.status_code}, retrying...", flush=True)
-                if attempt < max_attempts:
-                    time.sleep(backoff * attempt)
-                    continue
-            return resp
-        except httpx.RequestError as e:
-            print(f"[LinkedIn] Request error: {e}", flush=True)
-            if attempt < max_attempts:
-                time.sleep(backoff * attempt)
-                continue
-            raise
-    raise Exception(f"LinkedIn API failed after {max_attempts} attempts")
-
-from typing import Optional
+    resp = get_client().request(method, url, idempotent=True, timeout=httpx.Timeout(30, connect=5), **kwargs)
+    log_request_id(resp)
+    return resp
 
+async def linkedin_request_with_retry_async(method, url, **kwargs):
+    resp = await get_async_client().request(method, url, idempotent=True, timeout=httpx.Timeout(30, connect=5), **kwargs)
+    log_request_id(resp)
+    return resp
 
 def auth_url(state: str, scopes: Optional[str] = None) -> str:
     """Return the authorization url. If scopes is provided use that, otherwise use settings.linkedin_scopes."""
@@ -307,85 +475,81 @@ def exchange_refresh_for_token(refresh_token: str) -> Dict[str, Any]:
     resp.raise_for_status()
     return resp.json()
 
-def post_text(access_token: str, author_urn: str, text: str) -> Tuple[bool, Any]:
+async def exchange_refresh_for_token_async(refresh_token: str) -> Dict[str, Any]:
     payload = {
-        "author": author_urn,
-        "lifecycleState": "PUBLISHED",
-        "specificContent": {
-            "com.linkedin.ugc.ShareContent": {
-                "shareCommentary": {"text": text},
-                "shareMediaCategory": "NONE",
-            }
-        },
-        "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token,
+        "client_id": settings.linkedin_client_id,
+        "client_secret": settings.linkedin_client_secret,
     }
+    resp = await linkedin_request_with_retry_async(
+        "POST", TOKEN_URL,
+        data=payload,
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+def post_text(access_token: str, author_urn: str, text: str) -> Tuple[bool, Any]:
+    payload = ugc_payload(author_urn, text)
     try:
-        with httpx.Client(timeout=60) as c:
-            r = c.post(
-                UGC_URL,
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Content-Type": "application/json",
-                    "X-Restli-Protocol-Version": "2.0.0",
-                },
-                json=payload,
-            )
-            # Basic logs (kept)
-            print("[post_text] status:", r.status_code, flush=True)
-            print("[post_text] request json:", payload, flush=True)
-            print("[post_text] response text:", r.text, flush=True)
-            log_request_id(r)
+        r = get_client().ugc_post(access_token, payload, member=author_urn)
+        # Basic logs (kept)
+        print("[post_text] status:", r.status_code, flush=True)
+        print("[post_text] request json:", payload, flush=True)
+        print("[post_text] response text:", r.text, flush=True)
+        log_request_id(r)
 
-            # Verbose: print request headers, response headers when enabled
-            if VERBOSE_LINKEDIN_LOG:
+        # Verbose: print request headers, response headers when enabled
+        if VERBOSE_LINKEDIN_LOG:
+            try:
+                verbose_out = {
+                    "request_headers": {
+                        "Authorization": f"Bearer {access_token}",
+                        "Content-Type": "application/json",
+                        "X-Restli-Protocol-Version": "2.0.0",
+                    },
+                    "request_json": payload,
+                    "response_status": r.status_code,
+                    "response_headers": dict(r.headers),
+                    "response_text": r.text,
+                }
                 try:
-                    verbose_out = {
-                        "request_headers": {
-                            "Authorization": f"Bearer {access_token}",
-                            "Content-Type": "application/json",
-                            "X-Restli-Protocol-Version": "2.0.0",
-                        },
-                        "request_json": payload,
-                        "response_status": r.status_code,
-                        "response_headers": dict(r.headers),
-                        "response_text": r.text,
-                    }
-                    try:
-                        with open('/tmp/linkedin_verbose.log', 'a') as f:
-                            f.write("--- POST_TEXT VERBOSE ---\n")
-                            f.write(str(verbose_out) + "\n")
-                    except Exception:
-                        pass
+                    with open('/tmp/linkedin_verbose.log', 'a') as f:
+                        f.write("--- POST_TEXT VERBOSE ---\n")
+                        f.write(str(verbose_out) + "\n")
                 except Exception:
                     pass
-            # Additionally, when verbose enabled, print request headers/body and response headers to stdout
-            if VERBOSE_LINKEDIN_LOG:
-                try:
-                    req = getattr(r, 'request', None)
-                    if req is not None:
-                        try:
-                            req_body = req.content.decode('utf-8') if isinstance(req.content, (bytes, bytearray)) else str(req.content)
-                        except Exception:
-                            req_body = str(req.content)
-                        print('[post_text][VERBOSE] Outgoing request headers:', dict(req.headers), flush=True)
-                        print('[post_text][VERBOSE] Outgoing request body:', req_body, flush=True)
-                    print('[post_text][VERBOSE] Response headers:', dict(r.headers), flush=True)
-                except Exception as e:
-                    print('[post_text][VERBOSE] error printing verbose info:', e, flush=True)
-            if r.status_code in (201, 202):
-                return True, r
-            # Bubble up error details for 4xx/5xx
-            error_info = {
-                "status": r.status_code,
-                "body": r.text
-            }
-            try:
-                err_json = r.json()
-                error_info["serviceErrorCode"] = err_json.get("serviceErrorCode")
-                error_info["message"] = err_json.get("message")
             except Exception:
                 pass
-            return False, error_info
+        # Additionally, when verbose enabled, print request headers/body and response headers to stdout
+        if VERBOSE_LINKEDIN_LOG:
+            try:
+                req = getattr(r, 'request', None)
+                if req is not None:
+                    try:
+                        req_body = req.content.decode('utf-8') if isinstance(req.content, (bytes, bytearray)) else str(req.content)
+                    except Exception:
+                        req_body = str(req.content)
+                    print('[post_text][VERBOSE] Outgoing request headers:', dict(req.headers), flush=True)
+                    print('[post_text][VERBOSE] Outgoing request body:', req_body, flush=True)
+                print('[post_text][VERBOSE] Response headers:', dict(r.headers), flush=True)
+            except Exception as e:
+                print('[post_text][VERBOSE] error printing verbose info:', e, flush=True)
+        if r.status_code in (201, 202):
+            return True, r
+        # Bubble up error details for 4xx/5xx
+        error_info = {
+            "status": r.status_code,
+            "body": r.text
+        }
+        try:
+            err_json = r.json()
+            error_info["serviceErrorCode"] = err_json.get("serviceErrorCode")
+            error_info["message"] = err_json.get("message")
+        except Exception:
+            pass
+        return False, error_info
     except Exception as e:
         print("[post_text] error:", e, flush=True)
         return False, {"exception": str(e)}
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional
+import httpx
+from app.config import settings
+from app.services.rate_limit import BucketRegistry, TokenBucket, retry_after_seconds
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+def member_key(access_token: str) -> str:
+    """Fallback budget key when the caller doesn't know the member (author URN) behind a token.
+
+    A member's tokens hash differently, so callers that do know the member pass
+    it instead; the raw token never lands in memory maps.
+    """
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:16]
+
+def rate_limit_reset_seconds(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds until the quota resets when X-RateLimit-Remaining says it is used up.
+
+    X-RateLimit-Reset may be delta-seconds or an epoch timestamp.
+    """
+    remaining = headers.get("x-ratelimit-remaining")
+    reset = headers.get("x-ratelimit-reset")
+    if remaining is None or reset is None:
+        return None
+    try:
+        if float(remaining) > 0:
+            return None
+        value = float(reset)
+    except ValueError:
+        return None
+    if value > 1e9:
+        value -= time.time() if now is None else now
+    return max(0.0, value)
+
+class RetryEngine:
+    """Retry + client-side rate budgets shared by every LinkedIn call.
+
+    Every call first takes a token from the app-wide bucket, and calls made on
+    behalf of a member from that member's bucket too, so bursts are smoothed before
+    LinkedIn answers 429. Retries use full-jitter exponential backoff unless the
+    server says how long to wait (Retry-After / X-RateLimit-Reset); a 429 or an
+    exhausted quota also drains the member's bucket so concurrent calls back
+    off together. Non-idempotent calls (POST) are only retried when LinkedIn
+    cannot have acted on them: a 429 or a failed connect.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base: float = 0.5,
+        cap: float = 8.0,
+        max_wait: float = 30.0,
+        app_rate: float = 5.0,
+        app_burst: float = 50.0,
+        member_rate: float = 0.5,
+        member_burst: float = 10.0,
+        rand: Callable[[], float] = random.random,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base = base
+        self.cap = cap
+        self.max_wait = max_wait
+        self.app = TokenBucket(app_rate, app_burst)
+        self.members = BucketRegistry(member_rate, member_burst)
+        self.rand = rand
+        self._stats: Dict[str, int] = {"requests": 0, "retries": 0, "throttled": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def throttle_wait(self, member: Optional[str]) -> float:
+        # every call counts against the app budget; only member-less ones skip the member bucket
+        wait = self.app.reserve()
+        if member is not None:
+            wait = max(wait, self.members.get(member).reserve())
+        if wait > 0:
+            self._count("throttled")
+        return wait
+
+    def backoff(self, attempt: int) -> float:
+        return self.rand() * min(self.cap, self.base * 2 ** attempt)
+
+    def retry_delay(
+        self,
+        outcome: Any,
+        attempt: int,
+        waited: float,
+        member: Optional[str],
+        idempotent: bool,
+    ) -> Optional[float]:
+        """Seconds to wait before the next attempt for a response/exception; None to stop."""
+        delay = None
+        if isinstance(outcome, httpx.Response):
+            hinted = rate_limit_reset_seconds(outcome.headers)
+            if hinted is not None and member is not None:
+                self.members.get(member).penalize(hinted)  # quota used up: slow down before the 429s
+            if outcome.status_code not in RETRY_STATUSES:
+                return None
+            if outcome.status_code != 429 and not idempotent:
+                return None
+            server = retry_after_seconds(outcome.headers)
+            delay = server if server is not None else hinted
+            if outcome.status_code == 429:
+                self._count("rate_limited")
+                if delay is None:
+                    delay = self.backoff(attempt)
+                if member is not None:
+                    self.members.get(member).penalize(delay)
+        elif isinstance(outcome, httpx.RequestError):
+            if not idempotent and not isinstance(outcome, (httpx.ConnectError, httpx.ConnectTimeout)):
+                return None
+        else:
+            return None
+        if attempt + 1 >= self.max_attempts:
+            return None
+        if delay is None:
+            delay = self.backoff(attempt)
+        remaining = self.max_wait - waited
+        if remaining <= 0 or delay > remaining:
+            return None
+        self._count("retries")
+        return delay
+
+    @staticmethod
+    def _describe(outcome: Any) -> str:
+        return str(outcome.status_code) if isinstance(outcome, httpx.Response) else type(outcome).__name__
+
+    def send(self, client: httpx.Client, method: str, url: str, member: Optional[str] = None,
+             idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        waited, attempt = 0.0, 0
+        while True:
+            time.sleep(self.throttle_wait(member))
+            self._count("requests")
+            try:
+                outcome: Any = client.request(method, url, **kwargs)
+            except httpx.RequestError as e:
+                outcome = e
+            delay = self.retry_delay(outcome, attempt, waited, member, idempotent)
+            if delay is None:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+            print(f"[LinkedIn] {method} {url} attempt {attempt + 1} got {self._describe(outcome)}, retrying in {delay:.1f}s", flush=True)
+            time.sleep(delay)
+            waited, attempt = waited + delay, attempt + 1
+
+    async def send_async(self, client: httpx.AsyncClient, method: str, url: str, member: Optional[str] = None,
+                         idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        waited, attempt = 0.0, 0
+        while True:
+            await asyncio.sleep(self.throttle_wait(member))
+            self._count("requests")
+            try:
+                outcome: Any = await client.request(method, url, **kwargs)
+            except httpx.RequestError as e:
+                outcome = e
+            delay = self.retry_delay(outcome, attempt, waited, member, idempotent)
+            if delay is None:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+            print(f"[LinkedIn] {method} {url} attempt {attempt + 1} got {self._describe(outcome)}, retrying in {delay:.1f}s", flush=True)
+            await asyncio.sleep(delay)
+            waited, attempt = waited + delay, attempt + 1
+
+engine = RetryEngine(
+    max_attempts=settings.linkedin_retry_attempts,
+    base=settings.linkedin_retry_base,
+    cap=settings.linkedin_retry_cap,
+    max_wait=settings.linkedin_max_wait,
+    app_rate=settings.linkedin_app_rate_per_minute / 60.0,
+    app_burst=settings.linkedin_app_burst,
+    member_rate=settings.linkedin_member_rate_per_minute / 60.0,
+    member_burst=settings.linkedin_member_burst,
+)
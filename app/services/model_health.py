@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class ModelHealth:
+    """Latency/error EWMAs and circuit-breaker state for one model."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None  # seconds, EWMA over successes
+        self.recent: deque = deque(maxlen=64)  # raw latencies for percentiles
+        self.error_rate = 0.0  # EWMA of 0/1 outcomes
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.probe_started = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+
+    def expected_cost(self, prior_latency: float) -> float:
+        # untried models are assumed to take prior_latency: a fallback only gets
+        # live traffic once the models ahead of it are slower than that or failing.
+        # errors waste a full call
+        latency = prior_latency if self.latency is None else self.latency
+        return latency / max(1.0 - self.error_rate, 0.1)
+
+class HealthRegistry:
+    """Per-model health used to order and short-circuit fallback candidates.
+
+    A circuit opens after `failure_threshold` consecutive failures. After
+    `cooldown` seconds it goes half-open and lets exactly one probe through:
+    success closes it, failure re-opens it for another cooldown. A probe that
+    ends without an outcome (cancelled) is handed back with `release`; one that
+    is never heard from again expires after `probe_timeout` seconds. Models
+    without measurements are ranked as if they took `prior_latency` seconds.
+    """
+
+    def __init__(self, alpha: float = 0.3, failure_threshold: int = 3, cooldown: float = 60.0,
+                 clock=time.monotonic, prior_latency: float = 5.0, probe_timeout: float = 120.0):
+        self.alpha = alpha
+        self.probe_timeout = probe_timeout
+        self.prior_latency = prior_latency
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.clock = clock
+        self._models: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, model: str) -> ModelHealth:
+        h = self._models.get(model)
+        if h is None:
+            h = self._models[model] = ModelHealth()
+        return h
+
+    def _refresh(self, h: ModelHealth) -> None:
+        if h.state == OPEN and self.clock() - h.opened_at >= self.cooldown:
+            h.state = HALF_OPEN
+            h.probing = False
+
+    def order(self, models: List[str]) -> List[str]:
+        """Available models by expected latency (config order breaks ties), open circuits last."""
+        with self._lock:
+            ranked = []
+            for pos, m in enumerate(models):
+                h = self._get(m)
+                self._refresh(h)
+                ranked.append((h.state == OPEN, h.expected_cost(self.prior_latency), pos, m))
+        return [m for *_, m in sorted(ranked)]
+
+    def allow(self, model: str) -> bool:
+        with self._lock:
+            h = self._get(model)
+            self._refresh(h)
+            if h.state == CLOSED:
+                return True
+            if h.state == HALF_OPEN:
+                now = self.clock()
+                if not h.probing or now - h.probe_started >= self.probe_timeout:
+                    h.probing, h.probe_started = True, now
+                    return True
+            return False
+
+    def release(self, model: str) -> None:
+        """Hand back a half-open probe whose call ended with neither success nor failure."""
+        with self._lock:
+            h = self._models.get(model)
+            if h is not None and h.state == HALF_OPEN:
+                h.probing = False
+
+    def record_success(self, model: str, latency: float) -> None:
+        with self._lock:
+            h = self._get(model)
+            h.latency = latency if h.latency is None else self.alpha * latency + (1 - self.alpha) * h.latency
+            h.recent.append(latency)
+            h.error_rate = (1 - self.alpha) * h.error_rate
+            h.consecutive_failures = 0
+            h.state, h.probing = CLOSED, False
+            h.successes += 1
+            h.last_success_at = time.time()
+
+    def record_failure(self, model: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            h = self._get(model)
+            h.error_rate = self.alpha + (1 - self.alpha) * h.error_rate
+            h.consecutive_failures += 1
+            h.failures += 1
+            h.last_error = (error or "")[:200] or None
+            if h.state == HALF_OPEN or h.consecutive_failures >= self.failure_threshold:
+                h.state, h.probing = OPEN, False
+                h.opened_at = self.clock()
+
+    def latency_percentile(self, model: str, q: float) -> Optional[float]:
+        """q-quantile (0..1) of the model's recent successful latencies, None without history."""
+        with self._lock:
+            h = self._models.get(model)
+            if h is None or not h.recent:
+                return None
+            xs = sorted(h.recent)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def snapshot(self, models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            names = models if models is not None else list(self._models)
+            out = []
+            for m in names:
+                h = self._get(m)
+                self._refresh(h)
+                out.append({
+                    "model": m,
+                    "state": h.state,
+                    "latency_ms": round(h.latency * 1000, 1) if h.latency is not None else None,
+                    "error_rate": round(h.error_rate, 3),
+                    "consecutive_failures": h.consecutive_failures,
+                    "successes": h.successes,
+                    "failures": h.failures,
+                    "last_error": h.last_error,
+                    "last_success_at": h.last_success_at,
+                })
+        return out
+
+rewrite_health = HealthRegistry(
+    alpha=settings.model_latency_alpha,
+    failure_threshold=settings.model_failure_threshold,
+    cooldown=settings.model_cooldown,
+    prior_latency=settings.rewrite_hedge_default_delay,
+    probe_timeout=settings.model_probe_timeout,
+)
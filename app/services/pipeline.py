@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.services.summarize import summarize_text
+from app.services.rewrite import rewrite_linkedin
+from app.services import dedup
+from app.db import crud
+
+def run_post_and_save(
+    db: Session,
+    data: Dict[str, Any],
+    near_duplicates: str = "flag",
+    on_stage: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Summarize, rewrite and store one article + post.
+
+    data has the PipelineIn fields (url as a string). on_stage is called with
+    'summarizing', 'rewriting' and 'saving' before each stage starts.
+    """
+    stage = on_stage or (lambda name: None)
+    url, title, text = data["url"], data["title"], data["text"]
+    tone = data.get("tone") or "professional"
+    # near-duplicate check first: a skipped copy costs no summarize/rewrite calls
+    dup = dedup.check_article(url, title, text)
+    if dup and near_duplicates == "skip":
+        return {"status": "near_duplicate", **dup}
+    stage("summarizing")
+    summary = summarize_text(text, max_length=data.get("max_length") or 160, min_length=data.get("min_length") or 60)
+    stage("rewriting")
+    post = rewrite_linkedin(summary, tone=tone)
+    stage("saving")
+    # save article (idempotent by url)
+    if not crud.get_article_by_url(db, url):
+        crud.create_article(db, {
+            "title": title, "summary": summary, "url": url,
+            "published": data.get("published"), "source": data.get("source"),
+        })
+        dedup.remember_article(url, title, summary)
+    p = crud.create_post(db, draft=post, tone=tone, article_url=url)
+    return {"summary": summary, "post": post, "post_id": p.id, **(dup or {})}
+
+def _generate(data: Dict[str, Any]) -> Tuple[str, str]:
+    summary = summarize_text(data["text"], max_length=data.get("max_length") or 160, min_length=data.get("min_length") or 60)
+    return summary, rewrite_linkedin(summary, tone=data.get("tone") or "professional")
+
+def iter_batch(
+    db: Session,
+    items: List[Dict[str, Any]],
+    near_duplicates: str = "flag",
+    concurrency: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Run the pipeline over many articles, yielding progress events.
+
+    Events: {"type": "screened"} once urls already stored (or repeated in the batch,
+    or near-duplicates with 'skip') are set aside, one {"type": "progress"} per
+    generated item, then {"type": "done", "counts", "items"} after every article
+    and post is written in a single transaction.
+    """
+    results: List[Dict[str, Any]] = [{"index": i, "url": it["url"]} for i, it in enumerate(items)]
+    existing = crud.existing_article_urls(db, list({it["url"] for it in items}))
+    deduper = dedup.BatchDeduper()
+    seen = set()
+    todo: List[int] = []
+    for i, it in enumerate(items):
+        url = it["url"]
+        if url in seen:
+            results[i]["status"] = "duplicate_in_batch"
+            continue
+        seen.add(url)
+        if url in existing:
+            results[i]["status"] = "exists"
+            continue
+        dup = deduper.check({"url": url, "title": it.get("title"), "summary": it.get("text")})
+        if dup:
+            results[i].update(dup)
+            if near_duplicates == "skip":
+                results[i]["status"] = "near_duplicate"
+                continue
+        todo.append(i)
+    yield {"type": "screened", "total": len(items), "to_process": len(todo)}
+
+    # concurrent summarize calls coalesce in the HF micro-batcher and share the pooled client
+    workers = max(1, min(concurrency or settings.pipeline_batch_concurrency, len(todo) or 1))
+    generated: List[int] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline-batch") as pool:
+        futures = {pool.submit(_generate, items[i]): i for i in todo}
+        for n, fut in enumerate(as_completed(futures), 1):
+            i = futures[fut]
+            try:
+                results[i]["summary"], results[i]["post"] = fut.result()
+                results[i]["status"] = "generated"
+                generated.append(i)
+            except Exception as e:
+                results[i]["status"] = "failed"
+                results[i]["error"] = str(e)[:500]
+            yield {"type": "progress", "done": n, "total": len(todo), "index": i, "url": results[i]["url"], "status": results[i]["status"]}
+
+    generated.sort()
+    if generated:
+        rows = [{
+            "title": items[i].get("title"), "summary": results[i]["summary"], "url": items[i]["url"],
+            "published": items[i].get("published"), "source": items[i].get("source"),
+        } for i in generated]
+        try:
+            created, raced = crud.bulk_upsert_articles(db, rows, commit=False)
+            # a concurrent writer may have stored some urls meanwhile: no second post for those
+            fresh = [i for i in generated if items[i]["url"] in created]
+            post_ids = crud.bulk_create_posts(db, [{
+                "draft": results[i]["post"], "tone": items[i].get("tone") or "professional", "article_url": items[i]["url"],
+            } for i in fresh], commit=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for i in generated:
+                results[i].update(status="failed", error=f"save failed: {e}"[:500])
+        else:
+            for i in generated:
+                if items[i]["url"] in raced:
+                    results[i].update(status="exists", article_id=raced[items[i]["url"]])
+            for i, post_id in zip(fresh, post_ids):
+                results[i].update(status="saved", article_id=created[items[i]["url"]], post_id=post_id)
+                dedup.remember_article(items[i]["url"], items[i].get("title") or "", results[i]["summary"])
+
+    counts: Dict[str, int] = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    yield {"type": "done", "counts": counts, "items": results}
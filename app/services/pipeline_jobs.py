@@ -0,0 +1,134 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from app.config import settings
+from app.db.base import SessionLocal
+from app.db import crud_jobs
+from app.services.pipeline import run_post_and_save
+
+class JobCancelled(Exception):
+    pass
+
+class QueueFull(Exception):
+    pass
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class JobRunner:
+    """Runs post_and_save jobs on a bounded worker pool.
+
+    State and per-stage timings are written to pipeline_jobs after every stage
+    change, so status reads never touch the workers. Queued jobs cancel at once;
+    running jobs stop at the next stage boundary (a remote inference already in
+    flight is allowed to finish and its result is dropped).
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pipeline-job")
+        self._futures: Dict[str, Future] = {}
+        self._cancelled: set = set()
+        self._lock = threading.Lock()
+
+    def submit(self, request: Dict[str, Any], near_duplicates: str = "flag") -> Dict[str, Any]:
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                raise QueueFull(f"{len(self._futures)} jobs pending")
+        db = SessionLocal()
+        try:
+            job = crud_jobs.create_job(db, {**request, "near_duplicates": near_duplicates})
+            out = crud_jobs.job_to_dict(job)
+        finally:
+            db.close()
+        with self._lock:
+            fut = self._pool.submit(self._run, job.id, request, near_duplicates, time.perf_counter())
+            self._futures[job.id] = fut
+        fut.add_done_callback(lambda f, job_id=job.id: self._forget(job_id))
+        return out
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            job = crud_jobs.get_job(db, job_id)
+            if job is None:
+                return None
+            if job.status not in crud_jobs.ACTIVE:
+                return crud_jobs.job_to_dict(job)  # already finished
+            with self._lock:
+                fut = self._futures.get(job_id)
+                if fut is not None:
+                    self._cancelled.add(job_id)  # _forget drops it once the future is done
+            if fut is not None and fut.cancel():
+                job = crud_jobs.update_job(db, job_id, status="cancelled", cancel_requested=True, finished_at=_now())
+            else:
+                job = crud_jobs.update_job(db, job_id, cancel_requested=True)
+            return crud_jobs.job_to_dict(job)
+        finally:
+            db.close()
+
+    def _run(self, job_id: str, request: Dict[str, Any], near_duplicates: str, submitted: float) -> None:
+        stage_ms: Dict[str, float] = {"queued": round((time.perf_counter() - submitted) * 1000, 1)}
+        current = {"name": None, "t": time.perf_counter()}
+        db = SessionLocal()
+
+        def close_stage() -> None:
+            if current["name"]:
+                stage_ms[current["name"]] = round((time.perf_counter() - current["t"]) * 1000, 1)
+
+        def on_stage(name: str) -> None:
+            close_stage()
+            with self._lock:
+                if job_id in self._cancelled:
+                    raise JobCancelled()
+            current["name"], current["t"] = name, time.perf_counter()
+            # separate session: the pipeline's own session may be mid-transaction
+            s = SessionLocal()
+            try:
+                crud_jobs.update_job(s, job_id, status=name, stage_ms=stage_ms)
+            finally:
+                s.close()
+
+        try:
+            crud_jobs.update_job(db, job_id, started_at=_now(), stage_ms=stage_ms)
+            result = run_post_and_save(db, request, near_duplicates, on_stage=on_stage)
+            close_stage()
+            status = "skipped" if result.get("status") == "near_duplicate" else "saved"
+            crud_jobs.update_job(db, job_id, status=status, result=result, stage_ms=stage_ms, finished_at=_now())
+        except JobCancelled:
+            db.rollback()
+            crud_jobs.update_job(db, job_id, status="cancelled", stage_ms=stage_ms, finished_at=_now())
+        except Exception as e:
+            close_stage()
+            db.rollback()
+            print(f"[pipeline_jobs] {job_id} failed: {e}", flush=True)
+            crud_jobs.update_job(db, job_id, status="failed", error=str(e)[:2000], stage_ms=stage_ms, finished_at=_now())
+        finally:
+            db.close()
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+def get_runner() -> JobRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner(settings.pipeline_job_workers, settings.pipeline_job_max_pending)
+    return _runner
+
+def recover_jobs() -> None:
+    db = SessionLocal()
+    try:
+        ids = crud_jobs.fail_interrupted_jobs(db)
+    finally:
+        db.close()
+    if ids:
+        print(f"[pipeline_jobs] marked {len(ids)} interrupted job(s) as failed", flush=True)
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Mapping, Optional
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`.
+
+    reserve() takes a token now and returns how long the caller must wait before
+    using it, so sync and async callers share one bucket and sleep their own way.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take `tokens` (possibly going into debt) and return the wait in seconds."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(self.clock())
+            self.tokens -= tokens
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, seconds: float) -> None:
+        """Drain the bucket so reservations made in the next `seconds` wait it out (server said slow down)."""
+        if self.rate <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            self._refill(self.clock())
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+class BucketRegistry:
+    """Lazily created token buckets keyed by name (model id, member id, ...)."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            return b
+
+def retry_after_seconds(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), None if absent/invalid."""
+    raw = headers.get("retry-after")
+    if not raw:
+        return None
+    raw = raw.strip()
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(raw).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
@@ -1,14 +1,24 @@
-﻿import os
+﻿import asyncio
+import os
+import threading
+import time
 from textwrap import dedent
-from typing import List
-from app.services.hf_client import HFClient
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import httpx
+from app.services.hf_client import AsyncHFClient, HFClient, new_async_http_client
+from app.services.gen_cache import cache_key, get_cache
+from app.services.model_health import rewrite_health
+from app.services.summarize import summarize_text
 from app.config import settings
 
 BASE_STYLE = '''You are a professional LinkedIn ghostwriter.
 Rewrite the input into a concise, insightful LinkedIn post.
 Keep it under 120-180 words, avoid hype, add 1-3 tasteful hashtags at the end.'''
+PARAMS = {"max_new_tokens": 140, "temperature": 0.7, "top_p": 0.95}
 
-def _truncate(text: str, max_chars: int = 3500) -> str:
+MAX_DRAFT_CHARS = 3500
+
+def _truncate(text: str, max_chars: int = MAX_DRAFT_CHARS) -> str:
     return text[:max_chars]
 
 def _candidates_from_env() -> List[str]:
@@ -27,16 +37,256 @@ def _build_prompt(text: str, tone: str) -> str:
     Output:
     ''').strip()
 
-def rewrite_linkedin(post_draft: str, tone: str = "professional") -> str:
-    prompt = _build_prompt(post_draft, tone)
-    params = {"max_new_tokens": 140, "temperature": 0.7, "top_p": 0.95}
-    hf = HFClient()
+class _HedgeBudget:
+    """Token bucket: every rewrite call earns `ratio` hedge tokens, capped at `burst`."""
+
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self.stats["calls"] += 1
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.stats["hedged"] += 1
+                return True
+            self.stats["budget_denied"] += 1
+            return False
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self.stats)
+            out["tokens"] = round(self.tokens, 2)
+        out["win_ratio"] = round(out["hedge_wins"] / out["hedged"], 3) if out["hedged"] else None
+        return out
+
+hedge_budget = _HedgeBudget(settings.rewrite_hedge_budget)
+# Hedged rewrites run as tasks on one background event loop, so any number can be
+# in flight and a losing request is really cancelled (its connection dropped).
+_hedge_loop: Optional[asyncio.AbstractEventLoop] = None
+_hedge_loop_lock = threading.Lock()
+_hedge_http: Optional[httpx.AsyncClient] = None
+
+def _get_hedge_loop() -> asyncio.AbstractEventLoop:
+    global _hedge_loop
+    if _hedge_loop is None:
+        with _hedge_loop_lock:
+            if _hedge_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="rewrite-hedge", daemon=True).start()
+                _hedge_loop = loop
+    return _hedge_loop
+
+def _hedge_hf() -> AsyncHFClient:
+    # only called on the hedge loop: the pool's connections belong to that loop
+    global _hedge_http
+    if _hedge_http is None or _hedge_http.is_closed:
+        _hedge_http = new_async_http_client()
+    return AsyncHFClient(client=_hedge_http)
+
+async def close_hedge_client() -> None:
+    """Close the hedge loop's HTTP pool (app shutdown)."""
+    global _hedge_http
+    loop, client = _hedge_loop, _hedge_http
+    _hedge_http = None
+    if loop is not None and client is not None:
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+
+def hedge_stats() -> Dict[str, Any]:
+    return {"enabled": settings.rewrite_hedge_enabled, **hedge_budget.snapshot()}
+
+def _generate(hf: HFClient, model: str, prompt: str, params: Dict[str, Any]) -> str:
+    # records health for every call, including hedges that end up discarded
+    started = time.perf_counter()
+    try:
+        out = hf.text_generation(model, prompt, params=params, use_cache=False)
+    except Exception as e:
+        rewrite_health.record_failure(model, str(e))
+        raise
+    rewrite_health.record_success(model, time.perf_counter() - started)
+    return out
+
+async def _agenerate(hf: AsyncHFClient, model: str, prompt: str, params: Dict[str, Any]) -> str:
+    started = time.perf_counter()
+    try:
+        out = await hf.text_generation(model, prompt, params=params, use_cache=False)
+    except asyncio.CancelledError:
+        # a cancelled loser has no outcome: record nothing, but free a half-open probe
+        rewrite_health.release(model)
+        raise
+    except Exception as e:
+        rewrite_health.record_failure(model, str(e))
+        raise
+    rewrite_health.record_success(model, time.perf_counter() - started)
+    return out
+
+def _hedge_delay(model: str) -> float:
+    p = rewrite_health.latency_percentile(model, settings.rewrite_hedge_percentile)
+    return p if p is not None else settings.rewrite_hedge_default_delay
 
-    errors = []
-    for model in _candidates_from_env():
+def _sequential(hf: HFClient, models: List[str], prompt: str, params: Dict[str, Any], errors: List[str]) -> Optional[str]:
+    for model in models:
+        if not rewrite_health.allow(model):
+            errors.append(f"{model}: circuit open")
+            continue
         try:
-            return hf.text_generation(model, prompt, params=params)
+            return _generate(hf, model, prompt, params)
         except Exception as e:
             errors.append(f"{model}: {e}")
-            continue
+    return None
+
+async def _hedged(models: List[str], prompt: str, params: Dict[str, Any], errors: List[str]) -> Optional[str]:
+    """Start the best candidate; if it is slower than its usual p-th percentile, also
+    start the next one (budget permitting). First good answer wins and the other
+    requests are cancelled.
+
+    Runs on the hedge loop: every call starts the moment it is launched, so the
+    hedge timer measures the model, not a queue.
+    """
+    hf = _hedge_hf()
+    queue = list(models)
+    pending: Dict[asyncio.Task, str] = {}
+    hedges: set = set()
+
+    def launch(hedge: bool) -> bool:
+        while queue:
+            model = queue.pop(0)
+            if not rewrite_health.allow(model):
+                errors.append(f"{model}: circuit open")
+                continue
+            task = asyncio.ensure_future(_agenerate(hf, model, prompt, params))
+            pending[task] = model
+            if hedge:
+                hedges.add(task)
+            return True
+        return False
+
+    hedge_budget.earn()
+    launch(hedge=False)
+    can_hedge = True
+    try:
+        while pending:
+            newest = list(pending.values())[-1]
+            timeout = _hedge_delay(newest) if can_hedge and queue else None
+            done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # stalled past the percentile: hedge once budget allows
+                can_hedge = hedge_budget.spend() and launch(hedge=True)
+                continue
+            for task in done:
+                model = pending.pop(task)
+                if task.exception() is None:
+                    if task in hedges:
+                        hedge_budget.count("hedge_wins")
+                    return task.result()
+                errors.append(f"{model}: {task.exception()}")
+            if not pending:
+                launch(hedge=False)  # plain fallback after a failure
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+def _prepare(post_draft: str, tone: str, use_cache: bool) -> Tuple[str, List[str], Optional[str]]:
+    """Return (prompt, candidate models in health order, cached answer or None)."""
+    if settings.summarize_chunked and len(post_draft.strip()) > MAX_DRAFT_CHARS:
+        # condense long drafts (map-reduce) instead of cutting them off
+        try:
+            post_draft = summarize_text(post_draft, max_length=300, min_length=80, use_cache=use_cache)
+        except Exception as e:
+            # the rewrite models may still be fine: fall back to the old truncation
+            print(f"[rewrite] condensing long draft failed, truncating instead: {e}", flush=True)
+            post_draft = _truncate(post_draft)
+    prompt = _build_prompt(post_draft, tone)
+    models = rewrite_health.order(_candidates_from_env())
+    # cache first, so hits never skew the latency figures
+    cache = get_cache()
+    if cache is not None and use_cache:
+        for model in models:
+            hit = cache.get(cache_key(model, prompt, PARAMS))
+            if hit is not None:
+                return prompt, models, hit
+    return prompt, models, None
+
+def rewrite_linkedin(post_draft: str, tone: str = "professional", use_cache: bool = True, hedge: Optional[bool] = None) -> str:
+    prompt, models, hit = _prepare(post_draft, tone, use_cache)
+    if hit is not None:
+        return hit
+    errors: List[str] = []
+    hedge = settings.rewrite_hedge_enabled if hedge is None else hedge
+    if hedge and len(models) > 1:
+        job = _hedged(models, prompt, dict(PARAMS), errors)
+        out = asyncio.run_coroutine_threadsafe(job, _get_hedge_loop()).result()
+    else:
+        out = _sequential(HFClient(), models, prompt, dict(PARAMS), errors)
+    if out is not None:
+        return out
     raise RuntimeError("All rewrite models failed. Tried -> " + " | ".join(errors))
+
+async def stream_rewrite(post_draft: str, tone: str = "professional", use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """Stream a rewrite as {"type": "token", "text"} events, then {"type": "done", "post", "model"}.
+
+    Falls through the candidates like rewrite_linkedin until one produces its
+    first token; once text has been sent a failure ends the stream with an
+    {"type": "error"} event instead of switching model mid-post.
+    """
+    try:
+        prompt, models, hit = await asyncio.to_thread(_prepare, post_draft, tone, use_cache)
+    except Exception as e:  # the 200 headers are already out: report in-band
+        yield {"type": "error", "detail": str(e)}
+        return
+    if hit is not None:
+        yield {"type": "token", "text": hit}
+        yield {"type": "done", "post": hit, "model": None, "cached": True}
+        return
+    try:
+        hf = AsyncHFClient()
+    except RuntimeError as e:  # missing token: the response has already started
+        yield {"type": "error", "detail": str(e)}
+        return
+    errors: List[str] = []
+    for model in models:
+        if not rewrite_health.allow(model):
+            errors.append(f"{model}: circuit open")
+            continue
+        started = time.perf_counter()
+        pieces: List[str] = []
+        recorded = False
+        try:
+            try:
+                async for text in hf.stream_generation(model, prompt, params=dict(PARAMS)):
+                    pieces.append(text)
+                    yield {"type": "token", "text": text}
+            except Exception as e:
+                recorded = True
+                rewrite_health.record_failure(model, str(e))
+                if pieces:
+                    yield {"type": "error", "detail": f"{model}: {e}"}
+                    return
+                errors.append(f"{model}: {e}")
+                continue
+            recorded = True
+            rewrite_health.record_success(model, time.perf_counter() - started)
+        finally:
+            if not recorded:
+                # client went away mid-stream (GeneratorExit/CancelledError): free a half-open probe
+                rewrite_health.release(model)
+        post = "".join(pieces)
+        cache = get_cache()
+        if cache is not None:
+            cache.set(cache_key(model, prompt, PARAMS), post)
+        yield {"type": "done", "post": post, "model": model, "cached": False}
+        return
+    yield {"type": "error", "detail": "All rewrite models failed. Tried -> " + " | ".join(errors)}
@@ -1,7 +1,21 @@
-﻿import feedparser
-from typing import List, Dict, Any, Optional
+﻿import asyncio
+import hashlib
+import heapq
+import time
+import feedparser
+import httpx
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterator, Tuple
 from datetime import datetime
 from time import mktime
+from app.config import settings
+from app.db.base import SessionLocal
+from app.db import crud_feeds
+from app.services.keyword_match import get_matcher
+from app.services.dedup import BatchDeduper, annotate_items
+
+USER_AGENT = "LinkedIn-SaaS-RSS/1.0"
 
 def _parse_time(entry) -> Optional[str]:
     # Return ISO 8601 string if available
@@ -13,31 +27,265 @@ def _parse_time(entry) -> Optional[str]:
             return None
     return None
 
-def fetch_rss(feed_url: str, keywords: Optional[List[str]] = None, limit: int = 10) -> List[Dict[str, Any]]:
-    feed = feedparser.parse(feed_url)
-    results: List[Dict[str, Any]] = []
+def _entries_from_feed(feed, feed_url: str) -> List[Dict[str, Any]]:
+    # Normalise every entry once; keyword filtering/limits are applied per request
+    entries: List[Dict[str, Any]] = []
     if not getattr(feed, "entries", None):
-        return results
+        return entries
 
-    kws = [k.lower() for k in (keywords or []) if k]
-    for entry in feed.entries[:limit]:
-        title = getattr(entry, "title", "")
-        summary = getattr(entry, "summary", "") or getattr(entry, "description", "")
-        link = getattr(entry, "link", "")
-        published_iso = _parse_time(entry)
-        source = getattr(feed, "feed", {}).get("title") or feed_url
-
-        # keyword filter (title + summary)
-        if kws:
-            text = f"{title} {summary}".lower()
-            if not any(k in text for k in kws):
-                continue
-
-        results.append({
-            "title": title,
-            "summary": summary,
-            "url": link,
-            "published": published_iso,
+    source = getattr(feed, "feed", {}).get("title") or feed_url
+    for entry in feed.entries:
+        entries.append({
+            "title": getattr(entry, "title", ""),
+            "summary": getattr(entry, "summary", "") or getattr(entry, "description", ""),
+            "url": getattr(entry, "link", ""),
+            "published": _parse_time(entry),
             "source": source
         })
+    return entries
+
+def _select(
+    entries: List[Dict[str, Any]],
+    keywords: Optional[List[str]],
+    limit: int,
+    whole_words: bool = False,
+) -> List[Dict[str, Any]]:
+    matcher = get_matcher(keywords, whole_words=whole_words)
+    results: List[Dict[str, Any]] = []
+    for item in entries[:limit]:
+        # keyword filter (title + summary)
+        if matcher is None:
+            results.append(dict(item))
+            continue
+        hits = matcher.match(f"{item['title']} {item['summary']}")
+        if hits is None:
+            continue
+        results.append({**item, "matched": hits})
     return results
+
+class FeedStateStore:
+    """Persistent per-feed cache: ETag, Last-Modified, body hash and parsed entries."""
+
+    def load(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            return crud_feeds.get_feed_states(db, urls)
+        finally:
+            db.close()
+
+    def save(self, states: List[Dict[str, Any]]) -> None:
+        # cache only: a failed write costs a conditional GET next time, never the fetch
+        db = SessionLocal()
+        try:
+            crud_feeds.save_feed_states(db, states)
+        except Exception as e:
+            print(f"[feed_state] saving {len(states)} feed state(s) failed: {e}", flush=True)
+        finally:
+            db.close()
+
+_default_store = FeedStateStore()
+
+def _conditional_headers(state: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if state and state.get("entries"):
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+def _resolve(feed_url: str, r: httpx.Response, state: Optional[Dict[str, Any]]):
+    """Return (entries, cache_status, state_to_save_or_None) for a feed response.
+
+    cache_status is 'not_modified' (304), 'unchanged' (same body hash) or 'miss' (parsed).
+    Parsing only happens on a miss.
+    """
+    if r.status_code == 304 and state:
+        return state["entries"], "not_modified", None
+    r.raise_for_status()
+    body_hash = hashlib.sha256(r.content).hexdigest()
+    new_state = {
+        "url": feed_url,
+        "etag": r.headers.get("etag"),
+        "last_modified": r.headers.get("last-modified"),
+        "body_hash": body_hash,
+    }
+    if state and state.get("body_hash") == body_hash:
+        new_state["entries"] = state["entries"]
+        # only persist if the validators moved
+        changed = (new_state["etag"], new_state["last_modified"]) != (state.get("etag"), state.get("last_modified"))
+        return state["entries"], "unchanged", new_state if changed else None
+    new_state["entries"] = _entries_from_feed(feedparser.parse(r.content), feed_url)
+    return new_state["entries"], "miss", new_state
+
+def fetch_rss(
+    feed_url: str,
+    keywords: Optional[List[str]] = None,
+    limit: int = 10,
+    store: Optional[FeedStateStore] = None,
+    whole_words: bool = False,
+) -> List[Dict[str, Any]]:
+    store = store or _default_store
+    state = store.load([feed_url]).get(feed_url)
+    try:
+        with httpx.Client(timeout=settings.rss_fetch_timeout, follow_redirects=True, headers={"User-Agent": USER_AGENT}) as c:
+            r = c.get(feed_url, headers=_conditional_headers(state))
+        entries, _, new_state = _resolve(feed_url, r, state)
+    except Exception as e:
+        # feedparser-style leniency: fall back to the last good copy, else nothing
+        print(f"[fetch_rss] {feed_url} failed: {e}", flush=True)
+        return _select(state["entries"], keywords, limit, whole_words) if state else []
+    if new_state:
+        store.save([new_state])
+    return _select(entries, keywords, limit, whole_words)
+
+async def _fetch_one(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    feed_url: str,
+    keywords: Optional[List[str]],
+    limit: int,
+    timeout: float,
+    state: Optional[Dict[str, Any]],
+    updates: List[Dict[str, Any]],
+    whole_words: bool = False,
+) -> Dict[str, Any]:
+    async with sem:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"url": feed_url, "status": "ok", "cache": None, "count": 0, "items": [], "error": None}
+        try:
+            r = await asyncio.wait_for(client.get(feed_url, headers=_conditional_headers(state)), timeout=timeout)
+            # hashing/parsing is CPU-bound; keep it off the event loop
+            entries, result["cache"], new_state = await asyncio.to_thread(_resolve, feed_url, r, state)
+            if new_state:
+                updates.append(new_state)
+            items = _select(entries, keywords, limit, whole_words)
+            result["items"] = items
+            result["count"] = len(items)
+        except asyncio.TimeoutError:
+            result["status"] = "timeout"
+            result["error"] = f"no response within {timeout:g}s"
+        except httpx.HTTPStatusError as e:
+            result["status"] = "error"
+            result["error"] = f"HTTP {e.response.status_code}"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e) or e.__class__.__name__
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+@asynccontextmanager
+async def _feed_client(client: Optional[httpx.AsyncClient], concurrency: int, timeout: float):
+    if client is not None:
+        yield client
+        return
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+        limits=limits,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+    ) as c:
+        yield c
+
+async def _iter_feeds(
+    feed_urls: List[str],
+    keywords: Optional[List[str]],
+    limit: int,
+    concurrency: Optional[int],
+    timeout: Optional[float],
+    client: Optional[httpx.AsyncClient],
+    store: Optional[FeedStateStore],
+    whole_words: bool,
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    # Yields (input index, result) in completion order
+    concurrency = max(1, concurrency or settings.rss_fetch_concurrency)
+    timeout = timeout or settings.rss_fetch_timeout
+    store = store or _default_store
+    sem = asyncio.Semaphore(concurrency)
+    states = await asyncio.to_thread(store.load, feed_urls)
+    updates: List[Dict[str, Any]] = []
+
+    async def _indexed(i: int, c: httpx.AsyncClient, u: str) -> Tuple[int, Dict[str, Any]]:
+        return i, await _fetch_one(c, sem, u, keywords, limit, timeout, states.get(u), updates, whole_words)
+
+    async with _feed_client(client, concurrency, timeout) as c:
+        tasks = [asyncio.create_task(_indexed(i, c, u)) for i, u in enumerate(feed_urls)]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for t in tasks:
+                t.cancel()
+            if updates:
+                # one transaction for every feed that changed
+                await asyncio.to_thread(store.save, list(updates))
+
+async def fetch_feeds(
+    feed_urls: List[str],
+    keywords: Optional[List[str]] = None,
+    limit: int = 10,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    store: Optional[FeedStateStore] = None,
+    whole_words: bool = False,
+) -> List[Dict[str, Any]]:
+    """Fetch many feeds concurrently.
+
+    Returns one result per URL (in input order) with status ('ok', 'error', 'timeout'),
+    cache ('not_modified', 'unchanged', 'miss'), elapsed_ms and the parsed items.
+    A failing feed never fails the whole batch. Keyword filtering uses the compiled
+    matcher from keyword_match ('-term' excludes). Requests are conditional on the
+    stored ETag/Last-Modified, so unchanged feeds cost one round trip and no parsing.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(feed_urls)
+    async for i, res in _iter_feeds(feed_urls, keywords, limit, concurrency, timeout, client, store, whole_words):
+        results[i] = res
+    return results  # type: ignore[return-value]
+
+def _published_key(item: Dict[str, Any]) -> str:
+    return item.get("published") or ""
+
+def merge_newest_first(per_feed: List[List[Dict[str, Any]]], total_limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """k-way merge of per-feed item lists, newest first, stopping after total_limit items."""
+    streams = [sorted(items, key=_published_key, reverse=True) for items in per_feed if items]
+    merged = heapq.merge(*streams, key=_published_key, reverse=True)
+    return islice(merged, total_limit) if total_limit else merged
+
+async def stream_feeds(
+    feed_urls: List[str],
+    keywords: Optional[List[str]] = None,
+    limit: int = 10,
+    total_limit: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    store: Optional[FeedStateStore] = None,
+    whole_words: bool = False,
+    near_duplicates: str = "off",
+) -> AsyncIterator[Dict[str, Any]]:
+    """Stream fetch events for NDJSON output.
+
+    Emits {"type": "feed", ...} as soon as each feed finishes, followed right away
+    by that feed's items ({"type": "item", ...}, newest first within the feed),
+    then a final {"type": "done"}. Items come in feed completion order, not merged
+    newest first across feeds: the first ones go out when the fastest feed answers,
+    and a feed's items are dropped once sent. After total_limit items only feed
+    events follow. near_duplicates ('off', 'flag', 'skip') runs items through the
+    dedup index, across all feeds.
+    """
+    deduper = None
+    if near_duplicates != "off":
+        # building it loads the index from the DB on first use; keep that off the event loop
+        deduper = await asyncio.to_thread(BatchDeduper)
+    count = 0
+    async for _, res in _iter_feeds(feed_urls, keywords, limit, concurrency, timeout, client, store, whole_words):
+        items = sorted(res.pop("items"), key=_published_key, reverse=True)
+        yield {"type": "feed", **res}
+        for item in annotate_items(items, near_duplicates, deduper):
+            if total_limit and count >= total_limit:
+                break
+            count += 1
+            yield {"type": "item", **item}
+    yield {"type": "done", "count": count, "feeds": len(feed_urls)}
@@ -1,13 +1,132 @@
-﻿from app.services.hf_client import HFClient
+﻿import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from app.services.hf_client import HFClient
+from app.services.gen_cache import cache_key, get_cache
+from app.services.batcher import get_batcher
+from app.services.summarizer_backends import SummarizerBackend, is_local, local_backend
 from app.config import settings
 
-def summarize_text(text: str, max_length: int = 180, min_length: int = 60) -> str:
-    prompt = text.strip()
+_PARAGRAPHS = re.compile(r"\n\s*\n")
+_SENTENCES = re.compile(r"(?<=[.!?])\s+")
+
+def _pieces(text: str, max_chars: int) -> List[str]:
+    # paragraphs, then sentences, then whitespace cuts for anything still too long
+    out: List[str] = []
+    for para in _PARAGRAPHS.split(text):
+        para = " ".join(para.split())
+        if not para:
+            continue
+        if len(para) <= max_chars:
+            out.append(para)
+            continue
+        for sent in _SENTENCES.split(para):
+            while len(sent) > max_chars:
+                cut = sent.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                out.append(sent[:cut])
+                sent = sent[cut:].lstrip()
+            if sent:
+                out.append(sent)
+    return out
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """Pack paragraphs/sentences into chunks of at most max_chars.
+
+    Boundaries are content-defined: besides the size limit, a chunk also ends
+    after a piece whose hash hits 1 in 4 (once the chunk is a quarter full). An
+    edit therefore only moves the boundaries around it, and the other chunks keep
+    their cached summaries.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in _pieces(text, max_chars):
+        if current and size + 1 + len(piece) > max_chars:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + (1 if size else 0)
+        if size >= max_chars // 4 and hashlib.blake2b(piece.encode("utf-8"), digest_size=1).digest()[0] % 4 == 0:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def _summarize_one(model: str, prompt: str, max_length: int, min_length: int, use_cache: bool) -> str:
     params = {
         "max_length": max_length,
         "min_length": min_length,
         "do_sample": False
     }
-    hf = HFClient()
-    out = hf.text_generation(settings.summarizer_model, prompt, params=params)
-    return out
+    if not settings.hf_batch_enabled:
+        return HFClient().text_generation(model, prompt, params=params, use_cache=use_cache)
+    # cache hits return at once; misses wait briefly to share one batched request
+    cache = get_cache()
+    if cache is not None and use_cache:
+        hit = cache.get(cache_key(model, prompt, params))
+        if hit is not None:
+            return hit
+    return get_batcher().submit(model, prompt, params)
+
+def _map_reduce(model: str, prompt: str, max_length: int, min_length: int, use_cache: bool, chunked: bool) -> str:
+    """Input over SUMMARIZER_MAX_INPUT_CHARS is map-reduced.
+
+    Map: chunks are summarized in parallel (each cached on its own text, and
+    coalesced by the micro-batcher). Reduce: the joined partial summaries are
+    summarized again, recursing while they are still over budget.
+    """
+    budget = settings.summarizer_max_input_chars
+    if not chunked or len(prompt) <= budget:
+        return _summarize_one(model, prompt, max_length, min_length, use_cache)
+    chunks = split_into_chunks(prompt, budget)
+    chunk_min = min(min_length, 30)  # keep partials short so the reduce step fits
+    workers = max(1, min(len(chunks), settings.summarize_chunk_concurrency))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summarize-chunk") as pool:
+        partials = list(pool.map(lambda c: _summarize_one(model, c, max_length, chunk_min, use_cache), chunks))
+    combined = "\n\n".join(p.strip() for p in partials if p and p.strip())
+    if len(combined) >= len(prompt):
+        combined = combined[:budget]  # partials didn't shrink: don't recurse forever
+    return _map_reduce(model, combined, max_length, min_length, use_cache, chunked)
+
+class HFSummarizer(SummarizerBackend):
+    """HF inference API model (cached, micro-batched, map-reduce for long input)."""
+
+    def __init__(self, model: str):
+        self.name = model
+
+    def summarize(
+        self, text: str, max_length: int = 180, min_length: int = 60, use_cache: bool = True, chunked: Optional[bool] = None,
+    ) -> str:
+        chunked = settings.summarize_chunked if chunked is None else chunked
+        return _map_reduce(self.name, text.strip(), max_length, min_length, use_cache, chunked)
+
+def get_backend(name: Optional[str] = None) -> SummarizerBackend:
+    """'local:<name>' picks a built-in local summarizer, anything else is an HF model id."""
+    name = (name or settings.summarizer_model).strip()
+    return local_backend(name) if is_local(name) else HFSummarizer(name)
+
+def summarize_text(
+    text: str,
+    max_length: int = 180,
+    min_length: int = 60,
+    use_cache: bool = True,
+    chunked: Optional[bool] = None,
+    backend: Optional[str] = None,
+) -> str:
+    """Summarize with `backend` (default SUMMARIZER_MODEL).
+
+    If the backend fails and SUMMARIZER_FALLBACK names another backend
+    (e.g. local:textrank), the summary comes from that one instead.
+    """
+    impl = get_backend(backend)
+    try:
+        return impl.summarize(text, max_length, min_length, use_cache, chunked)
+    except Exception as e:
+        fallback = settings.summarizer_fallback
+        if not fallback or fallback == impl.name:
+            raise
+        print(f"[summarize] {impl.name} failed ({e}); using {fallback}", flush=True)
+        return get_backend(fallback).summarize(text, max_length, min_length, use_cache, chunked)
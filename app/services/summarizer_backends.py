@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
+
+LOCAL_PREFIX = "local:"
+
+class SummarizerBackend(ABC):
+    """One way of turning text into a summary. max/min_length are in model tokens.
+
+    Backends that have no cache or input budget ignore use_cache/chunked.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def summarize(
+        self, text: str, max_length: int = 180, min_length: int = 60, use_cache: bool = True, chunked: Optional[bool] = None,
+    ) -> str:
+        ...
+
+class TextRankSummarizer(SummarizerBackend):
+    """Local extractive summary (TF-IDF + TextRank); no network, milliseconds per article."""
+
+    name = "local:textrank"
+
+    def summarize(
+        self, text: str, max_length: int = 180, min_length: int = 60, use_cache: bool = True, chunked: Optional[bool] = None,
+    ) -> str:
+        from app.services.textrank import textrank_summary
+        # ~0.75 English words per subword token
+        return textrank_summary(text, max_words=int(max_length * 0.75), min_words=int(min_length * 0.75))
+
+_LOCAL: Dict[str, Callable[[], SummarizerBackend]] = {
+    "textrank": TextRankSummarizer,
+}
+
+def is_local(name: str) -> bool:
+    return name.startswith(LOCAL_PREFIX)
+
+def local_backend(name: str) -> SummarizerBackend:
+    key = name[len(LOCAL_PREFIX):] if is_local(name) else name
+    factory = _LOCAL.get(key)
+    if factory is None:
+        raise ValueError(f"Unknown local summarizer {name!r}; available: {', '.join(LOCAL_PREFIX + k for k in _LOCAL)}")
+    return factory()
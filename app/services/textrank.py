@@ -0,0 +1,68 @@
+import re
+from typing import List
+import numpy as np
+
+_SENTENCES = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by for from has have he her his i in is it its of on or our she "
+    "that the their they this to was we were which who will with you your not than then there these "
+    "those so if into about after over also more most can could would should said says".split()
+)
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCES.split(" ".join(text.split())) if s.strip()]
+
+def _tfidf(sentences: List[str]) -> np.ndarray:
+    tokens = [[w for w in _WORD.findall(s.lower()) if w not in _STOPWORDS] for s in sentences]
+    vocab = {w: i for i, w in enumerate(sorted({w for ts in tokens for w in ts}))}
+    tf = np.zeros((len(sentences), max(len(vocab), 1)))
+    for row, ts in enumerate(tokens):
+        for w in ts:
+            tf[row, vocab[w]] += 1
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + df)) + 1
+    m = np.log1p(tf) * idf
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.where(norms == 0, 1, norms)
+
+def rank_sentences(sentences: List[str], damping: float = 0.85, iterations: int = 50) -> np.ndarray:
+    """TextRank scores: PageRank over the TF-IDF cosine-similarity graph."""
+    n = len(sentences)
+    if n == 1:
+        return np.ones(1)
+    vecs = _tfidf(sentences)
+    sim = vecs @ vecs.T
+    np.fill_diagonal(sim, 0)
+    out = sim.sum(axis=1, keepdims=True)
+    # sentences sharing no terms with anything link uniformly
+    trans = np.where(out > 0, sim / np.where(out == 0, 1, out), 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        new = (1 - damping) / n + damping * (trans.T @ scores)
+        if np.abs(new - scores).sum() < 1e-6:
+            return new
+        scores = new
+    return scores
+
+def textrank_summary(text: str, max_words: int = 135, min_words: int = 45) -> str:
+    """Extractive summary: the best-ranked sentences, in document order, within max_words.
+
+    Keeps adding sentences in rank order until at least min_words are covered,
+    skipping ones that would overshoot max_words.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+    scores = rank_sentences(sentences)
+    lengths = [len(s.split()) for s in sentences]
+    picked: List[int] = []
+    total = 0
+    for i in np.argsort(-scores, kind="stable"):
+        if total + lengths[i] > max_words and picked:
+            if total >= min_words:
+                break
+            continue
+        picked.append(int(i))
+        total += lengths[i]
+    return " ".join(sentences[i] for i in sorted(picked))
@@ -0,0 +1,4 @@
+-- migration to add seen_urls_json to feeds (entry urls from the last poll, used to
+-- count new entries in feeds that carry no dates)
+
+ALTER TABLE feeds ADD COLUMN seen_urls_json TEXT;
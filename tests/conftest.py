@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import models
+
+
+@pytest.fixture
+def Session():
+    """sessionmaker over a fresh in-memory SQLite database with every table created.
+
+    StaticPool + check_same_thread=False: one shared connection, usable from worker threads.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(Session):
+    session = Session()
+    yield session
+    session.close()
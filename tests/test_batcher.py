@@ -0,0 +1,67 @@
+import json
+import threading
+import httpx
+import pytest
+
+from app.services import gen_cache
+from app.services.batcher import MicroBatcher
+from app.services.gen_cache import GenerationCache
+from app.services.hf_client import HFClient
+
+
+def _run_concurrently(fn, args_list):
+    out = [None] * len(args_list)
+
+    def worker(i, args):
+        out[i] = fn(*args)
+
+    threads = [threading.Thread(target=worker, args=(i, a)) for i, a in enumerate(args_list)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+def test_concurrent_calls_share_one_batch():
+    calls = []
+
+    def call(model, inputs, params):
+        calls.append(list(inputs))
+        return [i.upper() for i in inputs]
+
+    b = MicroBatcher(call, window=0.5, max_items=4)
+    out = _run_concurrently(b.submit, [("m", f"t{i}", {"p": 1}) for i in range(4)])
+    assert out == ["T0", "T1", "T2", "T3"]
+    assert len(calls) == 1 and sorted(calls[0]) == ["t0", "t1", "t2", "t3"]
+    assert b.stats()["largest"] == 4
+
+
+def test_different_params_are_not_mixed_and_errors_reach_every_caller():
+    def call(model, inputs, params):
+        if params["p"] == 2:
+            raise RuntimeError("boom")
+        return inputs
+
+    b = MicroBatcher(call, window=0.05, max_items=8)
+    assert b.submit("m", "a", {"p": 1}) == "a"
+    with pytest.raises(RuntimeError):
+        b.submit("m", "a", {"p": 2})
+    assert b.stats()["batches"] == 2
+
+
+def test_hf_batch_sends_list_inputs_and_skips_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen_cache, "_cache", GenerationCache(str(tmp_path / "g.db"), 60, 8, 100))
+    sent = []
+
+    def handler(request):
+        inputs = json.loads(request.content)["inputs"]
+        sent.append(inputs)
+        if isinstance(inputs, list):
+            return httpx.Response(200, json=[{"summary_text": f"s:{i}"} for i in inputs])
+        return httpx.Response(200, json=[{"summary_text": f"s:{inputs}"}])
+
+    c = HFClient(api_token="t", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    assert c.text_generation_batch("m", ["a", "b"]) == ["s:a", "s:b"]
+    assert c.text_generation_batch("m", ["a", "c"]) == ["s:a", "s:c"]
+    assert sent == [["a", "b"], "c"]
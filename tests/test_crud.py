@@ -0,0 +1,78 @@
+from app.db import crud, models
+
+
+def _row(i):
+    return {"title": f"t{i}", "summary": f"s{i}", "url": f"https://x.example/{i}", "published": None, "source": "x"}
+
+
+def test_bulk_upsert_reports_new_and_existing_rows(db):
+    first = crud.create_article(db, _row(0))
+    created, existing = crud.bulk_upsert_articles(db, [_row(0), _row(1), _row(2), _row(1)])
+    assert existing == {"https://x.example/0": first.id}
+    assert set(created) == {"https://x.example/1", "https://x.example/2"}
+    assert db.query(models.Article).count() == 3
+
+
+def test_bulk_upsert_chunks_large_batches(db, monkeypatch):
+    monkeypatch.setattr(crud, "BULK_CHUNK", 7)
+    created, existing = crud.bulk_upsert_articles(db, [_row(i) for i in range(30)])
+    assert len(created) == 30 and existing == {}
+    created, existing = crud.bulk_upsert_articles(db, [_row(i) for i in range(25, 40)])
+    assert len(created) == 10 and len(existing) == 5
+
+
+def test_keyset_pages_cover_every_row_once_with_projection(db):
+    crud.bulk_upsert_articles(db, [dict(_row(i), source="a" if i % 2 else "b") for i in range(11)])
+    seen, cursor = [], None
+    while True:
+        rows, cursor = crud.page_articles(db, limit=4, cursor=cursor, fields=("id", "title"))
+        assert all(set(r) == {"id", "title"} for r in rows)
+        seen += [r["id"] for r in rows]
+        if not cursor:
+            break
+    assert seen == sorted(seen, reverse=True) and len(set(seen)) == 11
+
+    rows, cursor = crud.page_articles(db, limit=50, source="a", fields=("id", "source"))
+    assert cursor is None and {r["source"] for r in rows} == {"a"} and len(rows) == 5
+
+
+def test_asset_cache_upserts_and_expires(db):
+    from app.db import crud_assets
+
+    crud_assets.save_asset(db, "urn:li:person:a", "h1", "urn:li:digitalmediaAsset:1", ttl=60)
+    crud_assets.save_asset(db, "urn:li:person:a", "h1", "urn:li:digitalmediaAsset:2", ttl=60)
+    assert crud_assets.get_asset(db, "urn:li:person:a", "h1").asset_urn == "urn:li:digitalmediaAsset:2"
+    assert crud_assets.get_asset(db, "urn:li:person:b", "h1") is None  # assets are per author
+
+    crud_assets.save_asset(db, "urn:li:person:a", "h2", "urn:li:digitalmediaAsset:3", ttl=-1)
+    assert crud_assets.get_asset(db, "urn:li:person:a", "h2") is None
+    assert db.query(models.LinkedInAsset).count() == 1
+
+
+def test_asset_cache_compares_aware_expiry_in_utc_and_survives_failed_saves(db, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy.exc import IntegrityError
+    from app.db import crud_assets
+
+    row = crud_assets.save_asset(db, "urn:li:person:a", "h1", "urn:li:digitalmediaAsset:1", ttl=60)
+    # aware value (as Postgres returns it) a minute in the past, but hours ahead on the wall clock
+    row.expires_at = datetime.now(timezone(timedelta(hours=5))) - timedelta(minutes=1)
+    assert crud_assets.get_asset(db, "urn:li:person:a", "h1") is None
+
+    def conflict():
+        raise IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed"))
+
+    monkeypatch.setattr(db, "commit", conflict)
+    assert crud_assets.save_asset(db, "urn:li:person:a", "h2", "urn:li:digitalmediaAsset:2", ttl=60) is None
+
+
+def test_feed_state_save_upserts_by_url(db, Session):
+    from app.db import crud_feeds
+
+    other = Session()
+    crud_feeds.save_feed_states(db, [{"url": "https://f.example/rss", "etag": "a", "entries": [{"title": "t"}]}])
+    # a second writer that never saw the row must update it, not hit the unique index
+    crud_feeds.save_feed_states(other, [{"url": "https://f.example/rss", "etag": "b"}, {"url": "https://g.example/rss"}])
+    states = crud_feeds.get_feed_states(db, ["https://f.example/rss", "https://g.example/rss"])
+    assert states["https://f.example/rss"]["etag"] == "b" and states["https://f.example/rss"]["entries"] == []
+    assert db.query(models.FeedState).count() == 2
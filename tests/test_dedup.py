@@ -0,0 +1,42 @@
+from app.services import dedup
+from app.services.dedup import NearDupIndex, signature, similarity
+
+A = ("OpenAI releases new GPT model for developers",
+     "The company announced on Tuesday a new model aimed at developers with lower prices and faster responses.")
+A_COPY = ("OpenAI releases new GPT model for developers - TechCrunch",
+          "The company announced Tuesday a new model aimed at developers with lower prices and faster responses.")
+OTHER = ("Tomato gardening in winter", "How to keep your plants alive when it is cold outside.")
+
+
+def test_signature_similarity_separates_copies_from_unrelated():
+    assert similarity(signature(*A), signature(*A_COPY)) >= 0.8
+    assert similarity(signature(*A), signature(*OTHER)) < 0.2
+    assert signature(*A) == signature(*A)  # stable, seed-independent of the process
+
+
+def test_index_finds_neighbours_at_or_above_threshold_only():
+    idx = NearDupIndex(threshold=0.7)
+    idx.add("a", signature(*A))
+    key, sim = idx.find(signature(*A_COPY))
+    assert key == "a" and sim >= 0.7
+    assert idx.find(signature(*OTHER)) is None
+    assert len(idx) == 1
+
+
+def test_annotate_items_flags_or_skips(monkeypatch):
+    stored = NearDupIndex(0.7)
+    stored.add("https://stored.example/other", signature(*OTHER))
+    monkeypatch.setattr(dedup, "_index", stored)
+    items = [
+        {"url": "https://a.example/1", "title": A[0], "summary": A[1]},
+        {"url": "https://b.example/1?utm=x", "title": A_COPY[0], "summary": A_COPY[1]},
+        {"url": "https://c.example/garden", "title": OTHER[0], "summary": OTHER[1]},
+    ]
+    flagged = list(dedup.annotate_items(items, "flag"))
+    assert "near_duplicate_of" not in flagged[0]
+    assert flagged[1]["near_duplicate_of"] == "https://a.example/1"
+    assert flagged[2]["near_duplicate_of"] == "https://stored.example/other"
+
+    kept = list(dedup.annotate_items(items, "skip"))
+    assert [i["url"] for i in kept] == ["https://a.example/1"]
+    assert list(dedup.annotate_items(items, "off")) == items
@@ -0,0 +1,36 @@
+from app.config import settings
+from app.services.feed_poller import next_interval
+
+
+def test_busy_feed_converges_to_short_interval():
+    interval, rate = 3600, 0.0
+    for _ in range(10):
+        # six new entries every poll
+        interval, rate = next_interval(interval, rate, 6, interval)
+    assert interval == settings.feed_min_interval
+
+
+def test_quiet_feed_backs_off_but_stays_bounded():
+    interval, rate = 1800, 2.0
+    seen = []
+    for _ in range(30):
+        interval, rate = next_interval(interval, rate, 0, interval)
+        seen.append(interval)
+    assert seen == sorted(seen)  # only ever backs off
+    assert seen[0] <= 3600       # at most 2x per poll
+    assert seen[-1] == settings.feed_max_interval
+
+
+def test_steady_feed_keeps_its_interval():
+    interval, rate = next_interval(3600, 0.0, 1, 3600)
+    assert (interval, rate) == (3600, 1.0)
+
+
+def test_undated_entries_count_as_new_by_url():
+    from app.services.feed_poller import count_new
+
+    items = [{"url": "https://ex.com/3", "published": None}, {"url": "https://ex.com/2", "published": None}]
+    assert count_new(items, ["https://ex.com/2", "https://ex.com/1"], None) == 1
+    # rows from before urls were recorded still compare by date
+    dated = [{"url": "https://ex.com/b", "published": "2024-05-02"}, {"url": "https://ex.com/a", "published": "2024-05-01"}]
+    assert count_new(dated, None, "2024-05-01") == 1
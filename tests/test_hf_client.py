@@ -0,0 +1,144 @@
+import asyncio
+import json
+import httpx
+import pytest
+
+from app.services import gen_cache, hf_client
+from app.services.gen_cache import GenerationCache, cache_key
+from app.services.hf_client import HFClient, AsyncHFClient
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path, monkeypatch):
+    cache = GenerationCache(str(tmp_path / "gen.db"), ttl=60, memory_items=2, max_rows=100)
+    monkeypatch.setattr(gen_cache, "_cache", cache)
+    return cache
+
+
+def _handler(request):
+    return httpx.Response(200, json=[{"summary_text": "short"}])
+
+
+def test_sync_client_parses_and_counts_requests():
+    before = hf_client.pool_stats()["requests"]
+    c = HFClient(api_token="t", client=httpx.Client(transport=httpx.MockTransport(_handler)))
+    assert c.text_generation("m", "long text") == "short"
+    assert c.text_generation("m", "long text", use_cache=False) == "short"
+    assert hf_client.pool_stats()["requests"] == before + 2
+
+
+def test_generation_cache_hits_skip_the_api(fresh_cache):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json=[{"generated_text": f"v{len(calls)}"}])
+
+    c = HFClient(api_token="t", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    assert c.text_generation("m", "x", {"temperature": 0.2}) == "v1"
+    assert c.text_generation("m", "x", {"temperature": 0.2}) == "v1"
+    assert c.text_generation("m", "x", {"temperature": 0.3}) == "v2"
+    # bypass refreshes the stored value
+    assert c.text_generation("m", "x", {"temperature": 0.2}, use_cache=False) == "v3"
+    assert c.text_generation("m", "x", {"temperature": 0.2}) == "v3"
+    assert len(calls) == 3
+    stats = fresh_cache.stats()
+    assert stats["memory_hits"] == 2 and stats["misses"] == 2
+
+
+def test_generation_cache_disk_tier_and_ttl(tmp_path, monkeypatch):
+    path = str(tmp_path / "g.db")
+    k = cache_key("m", "x", None)
+    GenerationCache(path, ttl=60, memory_items=1, max_rows=10).set(k, "stored")
+    reopened = GenerationCache(path, ttl=60, memory_items=1, max_rows=10)
+    assert reopened.get(k) == "stored"
+    assert reopened.stats()["disk_hits"] == 1
+
+    clock = [1000.0]
+    monkeypatch.setattr(gen_cache.time, "time", lambda: clock[0])
+    c = GenerationCache(str(tmp_path / "ttl.db"), ttl=10, memory_items=4, max_rows=10)
+    c.set(k, "v")
+    clock[0] += 11
+    assert c.get(k) is None
+
+
+def test_async_client_parses_generated_text():
+    async def handler(request):
+        return httpx.Response(200, json={"generated_text": "post"})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as ac:
+            return await AsyncHFClient(api_token="t", client=ac).text_generation("m", "x")
+
+    assert asyncio.run(run()) == "post"
+
+
+def test_shared_pool_is_reused_and_closed():
+    a = hf_client.get_http_client()
+    assert hf_client.get_http_client() is a
+    asyncio.run(hf_client.close_http_clients())
+    assert a.is_closed
+    assert hf_client.get_http_client() is not a
+
+
+def test_stream_generation_yields_tokens_and_falls_back_to_json():
+    sse = (
+        'data:{"token":{"text":"Hello","special":false}}\n\n'
+        'data:{"token":{"text":" world","special":false}}\n\n'
+        'data:{"token":{"text":"</s>","special":true},"generated_text":"Hello world"}\n\n'
+    )
+
+    async def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        if request.url.path.endswith("/streams"):
+            return httpx.Response(200, text=sse, headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json=[{"generated_text": "whole answer"}])
+
+    async def run(model):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as ac:
+            return [t async for t in AsyncHFClient(api_token="t", client=ac).stream_generation(model, "x")]
+
+    assert asyncio.run(run("streams")) == ["Hello", " world"]
+    assert asyncio.run(run("plain")) == ["whole answer"]
+
+
+def test_loading_and_rate_limit_answers_are_retried_within_bound(monkeypatch):
+    slept = []
+    monkeypatch.setattr(hf_client.time, "sleep", slept.append)
+    answers = [
+        httpx.Response(503, json={"error": "Model m is currently loading", "estimated_time": 12.5}),
+        httpx.Response(429, headers={"Retry-After": "3"}, json={"error": "rate limited"}),
+        httpx.Response(200, json=[{"generated_text": "ok"}]),
+    ]
+    c = HFClient(api_token="t", client=httpx.Client(transport=httpx.MockTransport(lambda r: answers.pop(0))))
+    assert c.text_generation("loader", "x", use_cache=False) == "ok"
+    assert [s for s in slept if s][:2] == [12.5, 3.0]
+
+
+def test_loading_gives_up_after_max_wait(monkeypatch):
+    monkeypatch.setattr(hf_client.time, "sleep", lambda s: None)
+    monkeypatch.setattr(hf_client.settings, "hf_max_wait", 20)
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(503, json={"error": "loading", "estimated_time": 15})
+
+    c = HFClient(api_token="t", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    with pytest.raises(RuntimeError, match="503"):
+        c.text_generation("cold", "x", use_cache=False)
+    assert len(calls) == 3  # waits 15 + 5, then the budget is spent
+
+
+def test_token_bucket_spacing_and_retry_after_date():
+    from app.services.rate_limit import TokenBucket, retry_after_seconds
+
+    now = [0.0]
+    b = TokenBucket(rate=2.0, capacity=2, clock=lambda: now[0])
+    assert [b.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    now[0] = 10.0
+    assert b.reserve() == 0.0
+    b.penalize(4)
+    assert b.reserve() == 4.0
+    assert retry_after_seconds({"retry-after": "Wed, 21 Oct 2015 07:28:10 GMT"}, now=1445412480.0) == 10.0
+    assert retry_after_seconds({}) is None
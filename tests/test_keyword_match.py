@@ -0,0 +1,35 @@
+from app.services.keyword_match import get_matcher, parse_keywords
+
+
+def test_parse_keywords_splits_include_and_exclude():
+    include, exclude = parse_keywords(["AI", ' "Machine   Learning" ', "-Crypto", "", "ai"])
+    assert include == ("ai", "machine learning")
+    assert exclude == ("crypto",)
+
+
+def test_whole_word_phrase_and_exclude_matching():
+    m = get_matcher(["ai", "machine learning", "chip", "-crypto"], whole_words=True)
+    assert m.match("Maintain the air filter") is None
+    assert m.match("New AI chip announced") == ["ai", "chip"]
+    assert m.match("Machine\nlearning at scale") == ["machine learning"]
+    assert m.match("AI meets crypto") is None
+
+
+def test_substring_mode_and_exclude_only():
+    assert get_matcher(["chip"]).match("chipset news") == ["chip"]
+    assert get_matcher(["ai"]).match("OpenAI ships AI-powered tools") == ["ai"]  # substring is the default
+    only_exclude = get_matcher(["-sponsored"])
+    assert only_exclude.match("plain article") == []
+    assert only_exclude.match("Sponsored content") is None
+
+
+def test_matcher_is_cached_per_keyword_set():
+    assert get_matcher(["b", "a"]) is get_matcher(["A", "b"])
+    assert get_matcher([]) is None
+
+
+def test_many_terms_share_one_regex():
+    terms = [f"term{i}" for i in range(500)] + ["-spam"]
+    m = get_matcher(terms, whole_words=True)
+    assert m.match("only term42 here") == ["term42"]
+    assert m.match("term4200") is None
@@ -0,0 +1,335 @@
+import asyncio
+import json
+import httpx
+import pytest
+from app.services import linkedin_api
+from app.services.linkedin_api import LinkedInClient
+from app.services.linkedin_retry import RetryEngine
+
+
+def _install(monkeypatch, handler):
+    seen = []
+
+    def record(request):
+        seen.append(request)
+        return handler(request)
+
+    monkeypatch.setattr(linkedin_api, "_client", LinkedInClient(httpx.Client(transport=httpx.MockTransport(record))))
+    return seen
+
+
+def test_me_helpers_share_one_client(monkeypatch):
+    seen = _install(monkeypatch, lambda r: httpx.Response(200, json={"id": "abc123"}))
+    assert linkedin_api.get_person_id("tok") == "abc123"
+    assert linkedin_api.me_id("tok") == "abc123"
+    assert linkedin_api.get_person_id_with_response("tok")[:2] == ("abc123", 200)
+    assert linkedin_api.get_me_raw("tok")["json"] == {"id": "abc123"}
+    assert all(r.headers["authorization"] == "Bearer tok" for r in seen)
+    assert seen[0].url.params["projection"] == "(id)" and "projection" not in seen[-1].url.params
+
+
+def test_post_text_sends_restli_headers(monkeypatch):
+    seen = _install(monkeypatch, lambda r: httpx.Response(201, headers={"x-restli-id": "urn:li:share:1"}))
+    ok, r = linkedin_api.post_text("tok", "urn:li:person:x", "hello")
+    assert ok
+    assert seen[0].headers["x-restli-protocol-version"] == "2.0.0"
+    assert json.loads(seen[0].content)["specificContent"]["com.linkedin.ugc.ShareContent"]["shareCommentary"]["text"] == "hello"
+
+
+def test_shared_client_is_reused_and_closed(monkeypatch):
+    monkeypatch.setattr(linkedin_api, "_client", None)
+    c = linkedin_api.get_client()
+    assert linkedin_api.get_client() is c
+    linkedin_api.close_client()
+    assert c.client.is_closed
+    assert linkedin_api.get_client() is not c
+    linkedin_api.close_client()
+
+
+def _install_async(monkeypatch, handler):
+    seen = []
+
+    async def record(request):
+        seen.append(request)
+        return handler(request)
+
+    client = linkedin_api.AsyncLinkedInClient(httpx.AsyncClient(transport=httpx.MockTransport(record)))
+    monkeypatch.setattr(linkedin_api, "_async_client", client)
+    monkeypatch.setattr(linkedin_api, "retry_engine", RetryEngine(app_rate=0, member_rate=0))
+    return seen
+
+
+def test_async_helpers_use_shared_async_client(monkeypatch):
+    def handler(request):
+        if request.url.path == "/v2/assets":
+            return httpx.Response(200, json={"value": {"asset": "urn:li:digitalmediaAsset:1"}})
+        return httpx.Response(201)
+
+    seen = _install_async(monkeypatch, handler)
+
+    async def run():
+        reg = await linkedin_api.register_image_upload_async("tok", "urn:li:person:x")
+        ok, _ = await linkedin_api.post_image_share_async("tok", "urn:li:person:x", reg["value"]["asset"], "hi")
+        return ok
+
+    assert asyncio.run(run())
+    body = json.loads(seen[1].content)["specificContent"]["com.linkedin.ugc.ShareContent"]
+    assert body["shareMediaCategory"] == "IMAGE" and body["media"][0]["media"] == "urn:li:digitalmediaAsset:1"
+
+
+def test_member_budget_is_keyed_on_the_author_not_the_token(monkeypatch):
+    from app.services.linkedin_retry import member_key
+
+    _install_async(monkeypatch, lambda r: httpx.Response(201))
+    eng = RetryEngine(app_rate=0, member_rate=1.0, member_burst=10)
+    monkeypatch.setattr(linkedin_api, "retry_engine", eng)
+
+    async def run():
+        # two tokens (e.g. before and after a refresh) for the same member draw on one bucket
+        await linkedin_api.post_text_async("tok-old", "urn:li:person:x", "a")
+        await linkedin_api.post_text_async("tok-new", "urn:li:person:x", "b")
+        await linkedin_api.userinfo_sub_async("tok-new")  # member unknown yet: token hash
+
+    asyncio.run(run())
+    assert set(eng.members._buckets) == {"urn:li:person:x", member_key("tok-new")}
+
+
+@pytest.fixture
+def publish_client(Session, monkeypatch):
+    """TestClient for the /linkedin routes with a token on file, an in-memory DB and id_token sub 'abc'."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.db import crud_tokens, token_crypto
+    from app.deps import get_db
+    from app.routers import linkedin_publish
+
+    def override_db():
+        s = Session()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    class FakeToken:
+        access_token_encrypted = "enc"
+        id_token_encrypted = "enc-id"
+        expires_at = None
+
+    async def fake_decode(id_token, **kwargs):
+        return {"sub": "abc"}
+
+    monkeypatch.setattr(crud_tokens, "get_latest_token", lambda db, user_id: FakeToken())
+    monkeypatch.setattr(crud_tokens, "is_token_expiring", lambda tok: False)
+    monkeypatch.setattr(token_crypto, "decrypt_token", lambda enc: "plain")
+    monkeypatch.setattr(linkedin_publish, "decode_linkedin_id_token", fake_decode)
+    app.dependency_overrides[get_db] = override_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def test_publish_route_awaits_id_token_decode(publish_client, monkeypatch):
+    posted = {}
+
+    async def fake_post(access_token, author_urn, text):
+        posted.update(author=author_urn, text=text)
+        return True, httpx.Response(201, text="ok")
+
+    monkeypatch.setattr(linkedin_api, "post_text_async", fake_post)
+    resp = publish_client.post("/linkedin/post", json={"user_id": 1, "text": "hello"})
+    assert resp.status_code == 200, resp.text
+    assert posted == {"author": "urn:li:person:abc", "text": "hello"}
+
+
+def test_whoami_awaits_id_token_decode(publish_client, monkeypatch):
+    from app.routers import auth_linkedin
+
+    async def fake_decode(id_token, **kwargs):
+        return {"sub": "abc"}
+
+    monkeypatch.setattr(auth_linkedin, "decode_linkedin_id_token", fake_decode)
+    resp = publish_client.get("/auth/linkedin/debug/whoami", params={"user_id": 1})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["openid_sub"] == "abc"
+
+
+def _upload_handler(uploads, image=b""):
+    async def chunks():
+        for i in range(0, len(image), 1000):
+            yield image[i:i + 1000]
+
+    def handler(request):
+        if request.url.host == "img.example":
+            return httpx.Response(200, headers={"content-length": str(len(image))}, content=chunks())
+        if request.url.path.startswith("/v2/assets/"):
+            return httpx.Response(200, json={"recipes": [{"status": "AVAILABLE"}]})
+        if request.url.path == "/v2/assets":
+            return httpx.Response(200, json={"value": {
+                "asset": "urn:li:digitalmediaAsset:9",
+                "uploadMechanism": {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {"uploadUrl": "https://up.example/u"}},
+            }})
+        if request.url.host == "up.example":
+            uploads.append(request)
+            return httpx.Response(201)
+        return httpx.Response(201, text="posted")
+
+    return handler
+
+
+def test_url_image_is_piped_to_the_upload_url(monkeypatch):
+    image = bytes(range(256)) * 40
+    uploads = []
+    _install_async(monkeypatch, _upload_handler(uploads, image))
+
+    async def run():
+        asset = await linkedin_api.upload_image_from_url_async("tok", "urn:li:person:x", "https://img.example/a.png")
+        await uploads[0].aread()
+        return asset
+
+    assert asyncio.run(run()) == "urn:li:digitalmediaAsset:9"
+    assert uploads[0].content == image
+    assert uploads[0].headers["content-length"] == str(len(image))
+
+
+def test_url_image_over_the_cap_is_rejected(monkeypatch):
+    uploads = []
+    _install_async(monkeypatch, _upload_handler(uploads, b"x" * 5000))
+    monkeypatch.setattr(linkedin_api.settings, "linkedin_image_max_bytes", 4096)
+
+    with pytest.raises(linkedin_api.ImageTooLarge):
+        asyncio.run(linkedin_api.upload_image_from_url_async("tok", "urn:li:person:x", "https://img.example/a.png"))
+    assert uploads == []
+
+
+def test_multipart_image_upload_route(publish_client, monkeypatch):
+    uploads = []
+    seen = _install_async(monkeypatch, _upload_handler(uploads))
+    monkeypatch.setattr(linkedin_api.settings, "linkedin_upload_chunk_size", 512)
+
+    resp = publish_client.post(
+        "/linkedin/post/image/upload",
+        data={"user_id": "1", "text": "look"},
+        files={"image": ("a.png", b"\x89PNG" + b"0" * 2000, "image/png")},
+    )
+    assert resp.status_code == 200, resp.text
+    assert uploads[0].headers["content-length"] == "2004"
+    share = json.loads(seen[-1].content)["specificContent"]["com.linkedin.ugc.ShareContent"]
+    assert share["media"][0]["media"] == "urn:li:digitalmediaAsset:9" and share["shareCommentary"]["text"] == "look"
+
+
+def test_repeat_image_post_reuses_the_cached_asset(publish_client, monkeypatch):
+    import base64
+    uploads = []
+    seen = _install_async(monkeypatch, _upload_handler(uploads))
+    body = {"user_id": 1, "text": "brand", "image_base64": base64.b64encode(b"logo-bytes").decode()}
+
+    first = publish_client.post("/linkedin/post/image", json=body)
+    second = publish_client.post("/linkedin/post/image", json=body)
+    assert first.json()["asset_cached"] is False and second.json()["asset_cached"] is True
+    assert len(uploads) == 1
+    assert [r.url.path for r in seen].count("/v2/assets") == 1
+    assert [r.url.path for r in seen].count("/v2/ugcPosts") == 2
+
+
+def test_stale_cached_asset_is_uploaded_again(publish_client, Session, monkeypatch):
+    import base64, hashlib
+    from app.db import crud_assets
+
+    uploads = []
+    fresh = _upload_handler(uploads)
+
+    def handler(request):
+        if request.url.path == "/v2/assets/old":
+            return httpx.Response(404)
+        return fresh(request)
+
+    _install_async(monkeypatch, handler)
+    db = Session()
+    crud_assets.save_asset(db, "urn:li:person:abc", hashlib.sha256(b"img").hexdigest(), "urn:li:digitalmediaAsset:old", ttl=60)
+
+    resp = publish_client.post("/linkedin/post/image", json={"user_id": 1, "image_base64": base64.b64encode(b"img").decode()})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["asset"] == "urn:li:digitalmediaAsset:9" and len(uploads) == 1
+    db.expire_all()
+    assert crud_assets.get_asset(db, "urn:li:person:abc", hashlib.sha256(b"img").hexdigest()).asset_urn == "urn:li:digitalmediaAsset:9"
+    db.close()
+
+
+def test_rejected_post_keeps_a_live_cached_asset(publish_client, Session, monkeypatch):
+    import base64, hashlib
+    from app.db import crud_assets
+
+    uploads = []
+    fresh = _upload_handler(uploads)
+
+    def handler(request):
+        if request.url.path == "/v2/ugcPosts":
+            return httpx.Response(422, text="duplicate content")
+        return fresh(request)
+
+    _install_async(monkeypatch, handler)
+    db = Session()
+    digest = hashlib.sha256(b"img").hexdigest()
+    crud_assets.save_asset(db, "urn:li:person:abc", digest, "urn:li:digitalmediaAsset:1", ttl=60)
+
+    resp = publish_client.post("/linkedin/post/image", json={"user_id": 1, "image_base64": base64.b64encode(b"img").decode()})
+    assert resp.status_code == 502 and uploads == []
+    assert crud_assets.get_asset(db, "urn:li:person:abc", digest) is not None
+    db.close()
+
+
+def test_multi_image_post_uploads_concurrently_and_posts_once(publish_client, monkeypatch):
+    import base64
+    monkeypatch.setattr(linkedin_api.settings, "linkedin_upload_concurrency", 2)
+    state = {"registered": 0, "in_flight": 0, "peak": 0}
+    seen = []
+
+    async def handler(request):
+        seen.append(request)
+        if request.url.path == "/v2/assets" and request.method == "POST":
+            state["registered"] += 1
+            n = state["registered"]
+            return httpx.Response(200, json={"value": {
+                "asset": f"urn:li:digitalmediaAsset:a{n}",
+                "uploadMechanism": {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {"uploadUrl": f"https://up.example/{n}"}},
+            }})
+        if request.url.host == "up.example":
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.02)
+            state["in_flight"] -= 1
+            return httpx.Response(201)
+        if request.url.path.startswith("/v2/assets/"):
+            return httpx.Response(200, json={"recipes": [{"status": "AVAILABLE"}]})
+        return httpx.Response(201, text="posted")
+
+    client = linkedin_api.AsyncLinkedInClient(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(linkedin_api, "_async_client", client)
+    monkeypatch.setattr(linkedin_api, "retry_engine", RetryEngine(app_rate=0, member_rate=0))
+    images = [{"image_base64": base64.b64encode(f"img{i}".encode()).decode()} for i in range(5)]
+
+    resp = publish_client.post("/linkedin/post/images", json={"user_id": 1, "text": "five", "images": images})
+    assert resp.status_code == 200, resp.text
+    assert state["peak"] == 2
+    posts = [r for r in seen if r.url.path == "/v2/ugcPosts"]
+    assert len(posts) == 1
+    media = json.loads(posts[0].content)["specificContent"]["com.linkedin.ugc.ShareContent"]["media"]
+    assert len(media) == 5 and [m["media"] for m in media] == resp.json()["assets"]
+
+    too_many = publish_client.post("/linkedin/post/images", json={"user_id": 1, "images": images * 2})
+    assert too_many.status_code == 422
+
+
+def test_wait_asset_ready_polls_until_available(monkeypatch):
+    statuses = iter(["PROCESSING", "PROCESSING", "AVAILABLE", "PROCESSING_FAILED"])
+    _install_async(monkeypatch, lambda r: httpx.Response(200, json={"recipes": [{"status": next(statuses)}]}))
+    slept = []
+
+    async def fake_sleep(s):
+        slept.append(s)
+
+    monkeypatch.setattr(linkedin_api.asyncio, "sleep", fake_sleep)
+
+    asyncio.run(linkedin_api.wait_asset_ready_async("tok", "urn:li:digitalmediaAsset:1", timeout=30))
+    assert [s for s in slept if s] == [0.5, 1.0]
+    with pytest.raises(linkedin_api.AssetNotReady):
+        asyncio.run(linkedin_api.wait_asset_ready_async("tok", "urn:li:digitalmediaAsset:1", timeout=30))
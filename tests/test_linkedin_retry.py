@@ -0,0 +1,109 @@
+import asyncio
+import httpx
+import pytest
+
+from app.services import linkedin_retry
+from app.services.linkedin_retry import RetryEngine, rate_limit_reset_seconds
+
+
+def _client(statuses, seen=None, headers=None):
+    codes = iter(statuses)
+
+    def handler(request):
+        if seen is not None:
+            seen.append(request.method)
+        return httpx.Response(next(codes), headers=headers or {})
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture
+def slept(monkeypatch):
+    out = []
+    monkeypatch.setattr(linkedin_retry.time, "sleep", lambda s: out.append(s) if s else None)
+    return out
+
+
+def test_429_honours_retry_after_and_drains_member_bucket(slept):
+    eng = RetryEngine(member_rate=1.0, member_burst=5, rand=lambda: 1.0)
+    codes = iter([429, 201])
+    client = httpx.Client(transport=httpx.MockTransport(
+        lambda r: httpx.Response(next(codes), headers={"Retry-After": "3"})
+    ))
+    r = eng.send(client, "POST", "https://api.linkedin.com/v2/ugcPosts", member="m1")
+    assert r.status_code == 201
+    # the retry itself waits out Retry-After via the member bucket's debt
+    assert slept and slept[0] == pytest.approx(3, abs=0.1)
+    assert eng.stats()["rate_limited"] == 1
+    assert eng.members.get("m1").reserve() > 2  # other calls for this member back off too
+
+
+def test_post_is_not_retried_on_5xx_but_get_is(slept):
+    eng = RetryEngine(rand=lambda: 0.5, base=1, app_rate=0, member_rate=0)
+    seen = []
+    r = eng.send(_client([503, 201], seen), "POST", "https://api.linkedin.com/v2/ugcPosts", member="m")
+    assert r.status_code == 503 and seen == ["POST"]
+
+    r = eng.send(_client([503, 502, 200]), "GET", "https://api.linkedin.com/v2/me", member="m")
+    assert r.status_code == 200
+    assert slept == [0.5, 1.0]  # full jitter over base * 2**attempt
+
+
+def test_gives_up_after_max_attempts_and_reraises_request_errors(slept):
+    eng = RetryEngine(max_attempts=3, rand=lambda: 0.1, app_rate=0, member_rate=0)
+    assert eng.send(_client([500] * 5), "GET", "https://x").status_code == 500
+    assert len(slept) == 2
+
+    calls = []
+
+    def boom(request):
+        calls.append(1)
+        raise httpx.ReadTimeout("slow", request=request)
+
+    client = httpx.Client(transport=httpx.MockTransport(boom))
+    with pytest.raises(httpx.ReadTimeout):
+        eng.send(client, "POST", "https://x")  # may have reached LinkedIn: no retry
+    assert calls == [1]
+
+
+def test_exhausted_quota_headers_slow_down_before_429():
+    assert rate_limit_reset_seconds({"x-ratelimit-remaining": "0", "x-ratelimit-reset": "12"}) == 12
+    assert rate_limit_reset_seconds({"x-ratelimit-remaining": "0", "x-ratelimit-reset": "1000000050"}, now=1000000000) == 50
+    assert rate_limit_reset_seconds({"x-ratelimit-remaining": "4", "x-ratelimit-reset": "12"}) is None
+
+    eng = RetryEngine(member_rate=1.0, member_burst=10)
+    headers = {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "5"}
+    r = eng.send(_client([200], headers=headers), "GET", "https://x", member="m")
+    assert r.status_code == 200
+    assert eng.members.get("m").reserve() >= 4
+
+
+def test_async_send_sleeps_on_the_loop(monkeypatch):
+    slept = []
+
+    async def fake_sleep(s):
+        slept.append(s)
+
+    monkeypatch.setattr(linkedin_retry.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(linkedin_retry.time, "sleep", lambda s: pytest.fail("blocking sleep on the event loop"))
+    codes = iter([429, 201])
+
+    async def handler(request):
+        return httpx.Response(next(codes), headers={"Retry-After": "2"})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as ac:
+            eng = RetryEngine(app_rate=0, member_rate=0)
+            return await eng.send_async(ac, "POST", "https://x", member="m")
+
+    assert asyncio.run(run()).status_code == 201
+    assert 2 in slept
+
+
+def test_calls_without_a_member_still_use_the_app_budget(slept):
+    eng = RetryEngine(app_rate=1.0, app_burst=1, member_rate=0)
+    client = _client([200, 200])
+    eng.send(client, "PUT", "https://up.example/u")  # e.g. an upload: no member
+    eng.send(client, "GET", "https://x")
+    assert slept and slept[0] == pytest.approx(1, abs=0.1)
+    assert eng.stats()["throttled"] == 1
@@ -0,0 +1,59 @@
+from app.services.model_health import HealthRegistry
+
+
+def _registry():
+    clock = [0.0]
+    return HealthRegistry(alpha=0.5, failure_threshold=2, cooldown=10, clock=lambda: clock[0]), clock
+
+
+def test_order_by_expected_latency_untried_at_prior():
+    reg, _ = _registry()
+    reg.record_success("slow", 8.0)
+    reg.record_success("fast", 0.2)
+    # "new" is assumed to take the 5s prior: ahead of a slow model, behind a fast one
+    assert reg.order(["slow", "fast", "new"]) == ["fast", "new", "slow"]
+
+
+def test_cold_start_keeps_config_order_until_preferred_is_slow():
+    reg, _ = _registry()
+    models = ["preferred", "fallback", "summarizer"]
+    assert reg.order(models) == models
+    for _ in range(4):
+        reg.record_success(reg.order(models)[0], 1.0)
+    assert reg.order(models)[0] == "preferred"
+    reg.record_success("preferred", 20.0)
+    assert reg.order(models)[0] == "fallback"
+
+
+def test_circuit_opens_half_opens_and_closes():
+    reg, clock = _registry()
+    reg.record_failure("m", "503")
+    assert reg.allow("m")
+    reg.record_failure("m", "503")
+    assert not reg.allow("m")
+    assert reg.order(["m", "other"]) == ["other", "m"]
+
+    clock[0] = 11
+    assert reg.allow("m")  # one probe
+    assert not reg.allow("m")
+    reg.record_failure("m")
+    assert not reg.allow("m")  # re-opened
+
+    clock[0] = 22
+    assert reg.allow("m")
+    reg.record_success("m", 0.5)
+    assert reg.snapshot(["m"])[0]["state"] == "closed"
+    assert reg.allow("m") and reg.allow("m")
+
+
+def test_lost_probe_is_released_or_expires():
+    clock = [0.0]
+    reg = HealthRegistry(failure_threshold=1, cooldown=10, probe_timeout=30, clock=lambda: clock[0])
+    reg.record_failure("m")
+    clock[0] = 11
+    assert reg.allow("m") and not reg.allow("m")
+    reg.release("m")  # probe cancelled without an outcome
+    assert reg.allow("m") and not reg.allow("m")
+
+    clock[0] = 41  # never heard back: the probe expires
+    assert reg.allow("m")
@@ -0,0 +1,46 @@
+import pytest
+from app.db import crud, models
+from app.services import dedup, pipeline
+
+
+@pytest.fixture(autouse=True)
+def near_dup_index(monkeypatch):
+    monkeypatch.setattr(dedup, "_index", dedup.NearDupIndex(0.7))
+
+
+def _item(n, text=None):
+    return {"title": f"Story {n}", "url": f"https://ex.com/{n}", "text": text or f"unique body text number {n} " * 3}
+
+
+def test_batch_skips_known_urls_and_saves_in_one_go(db, monkeypatch):
+    crud.create_article(db, {"title": "old", "url": "https://ex.com/0", "summary": "old"})
+
+    def fake_generate(data):
+        if data["url"].endswith("/3"):
+            raise RuntimeError("model down")
+        return f"sum {data['url']}", f"post {data['url']}"
+
+    monkeypatch.setattr(pipeline, "_generate", fake_generate)
+    commits = []
+    monkeypatch.setattr(db, "commit", lambda orig=db.commit: (commits.append(1), orig())[1])
+
+    items = [_item(0), _item(1), _item(2), _item(1), _item(3)]
+    events = list(pipeline.iter_batch(db, items, concurrency=2))
+    assert events[0] == {"type": "screened", "total": 5, "to_process": 3}
+    assert [e["type"] for e in events[1:4]] == ["progress"] * 3
+    done = events[-1]
+    assert [r["status"] for r in done["items"]] == ["exists", "saved", "saved", "duplicate_in_batch", "failed"]
+    assert done["counts"]["saved"] == 2
+    assert len(commits) == 1
+    posts = {p.article_url: p.draft for p in db.query(models.Post)}
+    assert posts == {"https://ex.com/1": "post https://ex.com/1", "https://ex.com/2": "post https://ex.com/2"}
+    assert done["items"][1]["post_id"] in {p.id for p in db.query(models.Post)}
+
+
+def test_batch_near_duplicates_skip_before_inference(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(pipeline, "_generate", lambda data: calls.append(data["url"]) or ("s", "p"))
+    text = "central bank raises interest rates by half a point to fight inflation"
+    done = list(pipeline.iter_batch(db, [_item(1, text), _item(2, text + " today")], near_duplicates="skip"))[-1]
+    assert [r["status"] for r in done["items"]] == ["saved", "near_duplicate"]
+    assert calls == ["https://ex.com/1"]
@@ -0,0 +1,69 @@
+import threading
+import time
+import pytest
+from app.db import crud_jobs
+from app.services import pipeline_jobs
+
+
+@pytest.fixture
+def runner(Session, monkeypatch):
+    monkeypatch.setattr(pipeline_jobs, "SessionLocal", Session)
+    return pipeline_jobs.JobRunner(workers=1, max_pending=2)
+
+
+def _wait(Session, job_id, statuses=("saved", "failed", "cancelled", "skipped")):
+    for _ in range(200):
+        s = Session()
+        try:
+            job = crud_jobs.job_to_dict(crud_jobs.get_job(s, job_id))
+        finally:
+            s.close()
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job stuck in {job['status']}")
+
+
+def test_job_runs_stages_and_stores_result(runner, Session, monkeypatch):
+    def fake(db, data, near_duplicates, on_stage):
+        for name in ("summarizing", "rewriting", "saving"):
+            on_stage(name)
+        return {"summary": "s", "post": "p", "post_id": 1}
+
+    monkeypatch.setattr(pipeline_jobs, "run_post_and_save", fake)
+    job = runner.submit({"title": "t", "url": "https://x", "text": "body"})
+    assert job["status"] == "queued"
+    done = _wait(Session, job["job_id"])
+    assert done["status"] == "saved" and done["result"]["post"] == "p"
+    assert set(done["stage_ms"]) == {"queued", "summarizing", "rewriting", "saving"}
+
+
+def test_cancel_running_job_stops_at_next_stage_and_queue_is_bounded(runner, Session, monkeypatch):
+    gate = threading.Event()
+
+    def fake(db, data, near_duplicates, on_stage):
+        on_stage("summarizing")
+        gate.wait(2)
+        on_stage("rewriting")
+        return {}
+
+    monkeypatch.setattr(pipeline_jobs, "run_post_and_save", fake)
+    first = runner.submit({"url": "https://a"})
+    _wait(Session, first["job_id"], ("summarizing",))
+    second = runner.submit({"url": "https://b"})
+    with pytest.raises(pipeline_jobs.QueueFull):
+        runner.submit({"url": "https://c"})
+
+    assert runner.cancel(second["job_id"])["status"] == "cancelled"  # still queued
+    assert runner.cancel(first["job_id"])["cancel_requested"]
+    gate.set()
+    assert _wait(Session, first["job_id"])["status"] == "cancelled"
+
+
+def test_cancel_of_unknown_or_finished_jobs_leaves_no_flag(runner, Session, monkeypatch):
+    monkeypatch.setattr(pipeline_jobs, "run_post_and_save", lambda db, data, nd, on_stage: {})
+    job = runner.submit({"url": "https://a"})
+    _wait(Session, job["job_id"])
+    assert runner.cancel("no-such-job") is None
+    assert runner.cancel(job["job_id"])["status"] == "saved"
+    assert runner._cancelled == set()
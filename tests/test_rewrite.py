@@ -0,0 +1,155 @@
+import asyncio
+import time
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from app.services import gen_cache, hf_client, rewrite
+from app.services.hf_client import AsyncHFClient
+from app.services.model_health import HealthRegistry
+from app.services.rate_limit import BucketRegistry
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(gen_cache, "_cache", None)
+    monkeypatch.setattr(rewrite.settings, "gen_cache_enabled", False)
+    monkeypatch.setattr(rewrite.settings, "rewriter_model", "slow,fast")
+    monkeypatch.setattr(rewrite.settings, "rewrite_hedge_default_delay", 0.05)
+    monkeypatch.setattr(rewrite, "rewrite_health", HealthRegistry())
+    monkeypatch.setattr(rewrite, "hedge_budget", rewrite._HedgeBudget(ratio=1.0, burst=1.0))
+    monkeypatch.setattr(hf_client, "_buckets", BucketRegistry(0, 1))  # no client-side quota here
+    state = {"slow_delay": 2.0, "cancelled": []}
+
+    async def handler(request):
+        model = request.url.path.rsplit("/", 1)[-1]
+        if model == "slow":
+            try:
+                await asyncio.sleep(state["slow_delay"])
+            except asyncio.CancelledError:
+                state["cancelled"].append(model)
+                raise
+        return httpx.Response(200, json=[{"generated_text": model}])
+
+    # built lazily on the hedge loop, like the real pool
+    monkeypatch.setattr(rewrite, "_hedge_hf", lambda: AsyncHFClient(
+        api_token="t", client=httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+    yield state
+
+
+def test_hedge_wins_when_primary_stalls_and_loser_is_cancelled(hedging):
+    started = time.perf_counter()
+    assert rewrite.rewrite_linkedin("draft", hedge=True) == "fast"
+    assert time.perf_counter() - started < 1.0
+    stats = rewrite.hedge_stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    time.sleep(0.05)
+    assert hedging["cancelled"] == ["slow"]
+    assert rewrite.rewrite_health.snapshot(["slow"])[0]["failures"] == 0
+
+
+def test_no_hedge_without_budget(hedging, monkeypatch):
+    monkeypatch.setattr(rewrite, "hedge_budget", rewrite._HedgeBudget(ratio=0.0, burst=0.0))
+    hedging["slow_delay"] = 0.2
+    assert rewrite.rewrite_linkedin("draft", hedge=True) == "slow"
+    assert rewrite.hedge_stats()["budget_denied"] == 1
+
+
+def test_many_hedged_rewrites_run_at_once(hedging, monkeypatch):
+    # no worker cap: 20 concurrent callers all get their answer in about one slow call
+    monkeypatch.setattr(rewrite, "hedge_budget", rewrite._HedgeBudget(ratio=0.0, burst=0.0))
+    hedging["slow_delay"] = 0.3
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        outs = list(pool.map(lambda _: rewrite.rewrite_linkedin("draft", hedge=True), range(20)))
+    assert outs == ["slow"] * 20
+    assert time.perf_counter() - started < 2.0
+
+
+def test_stream_rewrite_skips_failing_model_before_first_token(monkeypatch):
+    monkeypatch.setattr(gen_cache, "_cache", None)
+    monkeypatch.setattr(rewrite.settings, "gen_cache_enabled", False)
+    monkeypatch.setattr(rewrite.settings, "rewriter_model", "broken,good")
+    monkeypatch.setattr(rewrite, "rewrite_health", HealthRegistry())
+
+    class FakeAsync:
+        async def stream_generation(self, model, prompt, params=None):
+            if model == "broken":
+                raise RuntimeError("HuggingFace API error 503")
+            for t in ("Hi", " there"):
+                yield t
+
+    monkeypatch.setattr(rewrite, "AsyncHFClient", FakeAsync)
+
+    async def collect():
+        return [e async for e in rewrite.stream_rewrite("draft")]
+
+    events = asyncio.run(collect())
+    assert [e["type"] for e in events] == ["token", "token", "done"]
+    assert events[-1]["post"] == "Hi there" and events[-1]["model"] == "good"
+
+
+def test_long_draft_falls_back_to_truncation_when_summarizer_fails(monkeypatch):
+    monkeypatch.setattr(gen_cache, "_cache", None)
+    monkeypatch.setattr(rewrite.settings, "gen_cache_enabled", False)
+    monkeypatch.setattr(rewrite.settings, "summarize_chunked", True)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("summarizer 503")
+
+    monkeypatch.setattr(rewrite, "summarize_text", broken)
+    prompt, models, hit = rewrite._prepare("word " * 2000, "professional", use_cache=False)
+    assert hit is None and "word word" in prompt
+
+
+def test_stream_rewrite_reports_prepare_errors_as_events(monkeypatch):
+    def broken(*args):
+        raise ValueError("Unknown local summarizer 'local:nope'")
+
+    monkeypatch.setattr(rewrite, "_prepare", broken)
+
+    async def collect():
+        return [e async for e in rewrite.stream_rewrite("draft")]
+
+    assert asyncio.run(collect()) == [{"type": "error", "detail": "Unknown local summarizer 'local:nope'"}]
+
+
+def test_cancelled_half_open_probe_is_released(hedging, monkeypatch):
+    reg = HealthRegistry(failure_threshold=1, cooldown=0)
+    monkeypatch.setattr(rewrite, "rewrite_health", reg)
+    reg.record_failure("slow")
+    assert reg.allow("slow")  # this call is the half-open probe
+
+    async def run():
+        task = asyncio.ensure_future(rewrite._agenerate(rewrite._hedge_hf(), "slow", "p", {}))
+        await asyncio.sleep(0.05)
+        task.cancel()  # e.g. the hedge won
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert reg.allow("slow")
+
+
+def test_stream_rewrite_releases_probe_when_client_disconnects(monkeypatch):
+    monkeypatch.setattr(gen_cache, "_cache", None)
+    monkeypatch.setattr(rewrite.settings, "gen_cache_enabled", False)
+    monkeypatch.setattr(rewrite.settings, "rewriter_model", "m")
+    reg = HealthRegistry(failure_threshold=1, cooldown=0)
+    monkeypatch.setattr(rewrite, "rewrite_health", reg)
+    reg.record_failure("m")  # half-open: the stream gets the only probe
+
+    class FakeAsync:
+        async def stream_generation(self, model, prompt, params=None):
+            for t in ("Hi", " there"):
+                yield t
+
+    monkeypatch.setattr(rewrite, "AsyncHFClient", FakeAsync)
+
+    async def first_token_then_hang_up():
+        stream = rewrite.stream_rewrite("draft")
+        assert (await stream.__anext__())["type"] == "token"
+        await stream.aclose()
+
+    asyncio.run(first_token_then_hang_up())
+    assert reg.allow("m")
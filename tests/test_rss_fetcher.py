@@ -0,0 +1,129 @@
+import asyncio
+import httpx
+
+from app.services.rss_fetcher import fetch_feeds, stream_feeds, merge_newest_first, FeedStateStore
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Demo Feed</title>
+<item><title>AI chips ship</title><link>https://example.com/a</link>
+<description>New accelerators</description><pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>
+<item><title>Gardening tips</title><link>https://example.com/b</link>
+<description>Tomatoes</description><pubDate>Sun, 05 Jan 2025 10:00:00 GMT</pubDate></item>
+</channel></rss>"""
+
+
+class MemoryStore(FeedStateStore):
+    def __init__(self):
+        self.rows = {}
+        self.saves = 0
+
+    def load(self, urls):
+        return {u: dict(self.rows[u]) for u in urls if u in self.rows}
+
+    def save(self, states):
+        self.saves += 1
+        for s in states:
+            self.rows[s["url"]] = dict(s)
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_fetch_feeds_returns_partial_results():
+    async def handler(request):
+        if request.url.host == "slow.example":
+            await asyncio.sleep(1)
+        if request.url.host == "down.example":
+            return httpx.Response(500)
+        return httpx.Response(200, content=RSS)
+
+    async def run():
+        async with _client(handler) as c:
+            return await fetch_feeds(
+                ["https://ok.example/feed", "https://down.example/feed", "https://slow.example/feed"],
+                timeout=0.2, client=c, store=MemoryStore(),
+            )
+
+    ok, down, slow = asyncio.run(run())
+    assert ok["status"] == "ok" and ok["count"] == 2
+    assert ok["items"][0]["source"] == "Demo Feed"
+    assert down["status"] == "error" and down["error"] == "HTTP 500"
+    assert slow["status"] == "timeout" and slow["items"] == []
+    assert all("elapsed_ms" in r for r in (ok, down, slow))
+
+
+def test_fetch_feeds_respects_concurrency_and_keywords():
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(request):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return httpx.Response(200, content=RSS)
+
+    async def run():
+        async with _client(handler) as c:
+            urls = [f"https://f{i}.example/rss" for i in range(6)]
+            return await fetch_feeds(urls, keywords=["chips"], concurrency=2, client=c, store=MemoryStore())
+
+    results = asyncio.run(run())
+    assert in_flight["max"] <= 2
+    assert [r["count"] for r in results] == [1] * 6
+
+
+def test_fetch_feeds_uses_conditional_get_and_body_hash():
+    store = MemoryStore()
+    seen = []
+
+    async def handler(request):
+        seen.append(dict(request.headers))
+        if request.url.host == "etag.example":
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, content=RSS, headers={"ETag": '"v1"'})
+        return httpx.Response(200, content=RSS)  # no validators: falls back to body hash
+
+    async def run():
+        async with _client(handler) as c:
+            return await fetch_feeds(["https://etag.example/rss", "https://plain.example/rss"], client=c, store=store)
+
+    first = asyncio.run(run())
+    assert [r["cache"] for r in first] == ["miss", "miss"]
+    assert store.saves == 1
+
+    second = asyncio.run(run())
+    assert [r["cache"] for r in second] == ["not_modified", "unchanged"]
+    assert [r["count"] for r in second] == [2, 2]
+    assert store.saves == 1  # nothing changed, nothing written
+    assert seen[-2].get("if-none-match") == '"v1"' or seen[-1].get("if-none-match") == '"v1"'
+
+
+def test_merge_newest_first_stops_at_total_limit():
+    a = [{"published": "2025-01-03"}, {"published": "2025-01-01"}]
+    b = [{"published": None}, {"published": "2025-01-02"}]
+    merged = list(merge_newest_first([a, [], b], total_limit=3))
+    assert [i["published"] for i in merged] == ["2025-01-03", "2025-01-02", "2025-01-01"]
+
+
+def test_stream_feeds_sends_each_feeds_items_as_it_finishes():
+    async def handler(request):
+        if request.url.host == "slow.example":
+            await asyncio.sleep(0.05)
+        return httpx.Response(200, content=RSS)
+
+    async def run():
+        async with _client(handler) as c:
+            return [e async for e in stream_feeds(
+                ["https://slow.example/rss", "https://fast.example/rss"],
+                total_limit=3, client=c, store=MemoryStore(),
+            )]
+
+    events = asyncio.run(run())
+    # the fast feed's items go out before the slow feed has answered; total_limit caps items only
+    assert [e["type"] for e in events] == ["feed", "item", "item", "feed", "item", "done"]
+    assert events[0]["url"] == "https://fast.example/rss"  # completion order
+    assert "items" not in events[0]
+    assert [e["published"] for e in events[1:3]] == sorted([e["published"] for e in events[1:3]], reverse=True)
+    assert events[-1]["count"] == 3
@@ -0,0 +1,85 @@
+import pytest
+from app.services import summarize
+from app.services.summarize import split_into_chunks
+
+
+def _article(n_paras=12):
+    return "\n\n".join(
+        " ".join(f"Paragraph {p} sentence {s} talks about topic {p * 7 + s}." for s in range(6))
+        for p in range(n_paras)
+    )
+
+
+def test_chunks_respect_budget_and_keep_all_text():
+    text = _article()
+    chunks = split_into_chunks(text, 600)
+    assert len(chunks) > 1
+    assert all(len(c) <= 600 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_edit_only_changes_nearby_chunks():
+    paras = _article(30).split("\n\n")
+    before = split_into_chunks("\n\n".join(paras), 600)
+    paras.insert(3, "A brand new paragraph was inserted here by the editor.")
+    after = split_into_chunks("\n\n".join(paras), 600)
+    # boundaries resynchronise after the edit instead of shifting every later chunk
+    assert len(set(before) & set(after)) >= len(before) - 2
+
+
+def test_long_text_is_map_reduced(monkeypatch):
+    calls = []
+
+    def fake_one(model, prompt, max_length, min_length, use_cache):
+        calls.append(prompt)
+        return f"summary of {len(prompt)} chars"
+
+    monkeypatch.setattr(summarize, "_summarize_one", fake_one)
+    monkeypatch.setattr(summarize.settings, "summarizer_max_input_chars", 600)
+    text = _article()
+    out = summarize.summarize_text(text, chunked=True)
+    n_chunks = len(split_into_chunks(text.strip(), 600))
+    assert len(calls) == n_chunks + 1  # map + one reduce
+    assert out.startswith("summary of")
+    assert summarize.summarize_text("short", chunked=True) == "summary of 5 chars"
+
+
+def test_textrank_keeps_central_sentences_in_order_within_budget():
+    from app.services.textrank import textrank_summary
+
+    text = (
+        "The central bank raised interest rates on Tuesday. "
+        "Rates rose by half a point as the bank fights inflation. "
+        "My cat enjoys sunny windowsills. "
+        "Economists expect the bank to keep raising rates while inflation stays high. "
+        "Inflation reached its highest level in a decade last month."
+    )
+    out = textrank_summary(text, max_words=30, min_words=10)
+    assert "cat" not in out
+    assert len(out.split()) <= 30
+    assert out.startswith("The central bank") or out.startswith("Rates rose")
+
+
+def test_local_backend_and_fallback(monkeypatch):
+    assert summarize.summarize_text("One sentence only.", backend="local:textrank") == "One sentence only."
+
+    def down(*a, **k):
+        raise RuntimeError("HuggingFace API error 503")
+
+    monkeypatch.setattr(summarize, "_summarize_one", down)
+    monkeypatch.setattr(summarize.settings, "summarizer_fallback", "local:textrank")
+    assert summarize.summarize_text("HF is down. The local model answers.") == "HF is down. The local model answers."
+    monkeypatch.setattr(summarize.settings, "summarizer_fallback", "")
+    with pytest.raises(RuntimeError):
+        summarize.summarize_text("HF is down.")
+    with pytest.raises(ValueError):
+        summarize.summarize_text("x", backend="local:nope")
+
+
+def test_backends_share_one_signature():
+    from app.services.summarizer_backends import SummarizerBackend, local_backend
+
+    with pytest.raises(TypeError):
+        SummarizerBackend()  # abstract
+    # local backends accept (and ignore) the same cache/chunking arguments as HF models
+    assert local_backend("local:textrank").summarize("One sentence only.", 180, 60, False, True) == "One sentence only."